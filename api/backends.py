@@ -0,0 +1,232 @@
+"""
+Inference backends for the detection server
+
+A backend loads a weights file into a detector: a callable that takes a list
+of PIL images and returns one (xyxy, conf, cls) array triple per image, in
+that image's pixel coordinates. Everything after that (box conversion,
+rendering, encoding, caching) is shared, so the backends are interchangeable:
+
+  - ultralytics: the PyTorch model through ultralytics (imported lazily)
+  - onnx:        ONNX Runtime on the exported model (no torch needed to serve)
+  - onnx-int8:   ONNX Runtime on the INT8 model built by api/quantize.py
+  - pool:        the shared inference process pool (api/inference_pool.py);
+                 this process only decodes and renders
+  - mock:        fixed synthetic boxes after a configurable synthetic latency,
+                 for capacity-testing the HTTP/decode/render/encode pipeline
+                 without any model cost
+
+The mock latency is drawn per batch from MOCK_LATENCY (milliseconds):
+"0" (default), "fixed:20", "uniform:10,30", "normal:20,5", "lognormal:20,0.5"
+(median, sigma) or "exponential:20" (mean), plus MOCK_LATENCY_PER_IMAGE_MS for
+every image in the batch. The sleep holds the inference worker like a real
+forward pass would.
+"""
+
+import importlib.util
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from cache import model_version
+from onnx_backend import ONNX_AVAILABLE, BoxArrays, OnnxDetector, export_onnx, int8_path_for
+from postprocess import boxes_to_arrays
+
+# Backend settings (overridable via environment)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "ultralytics").lower()
+BACKEND_FALLBACK = os.getenv("BACKEND_FALLBACK", "").lower()  # e.g. "mock": serve anyway if the model cannot load
+MOCK_LATENCY = os.getenv("MOCK_LATENCY", "0")
+MOCK_LATENCY_PER_IMAGE_MS = float(os.getenv("MOCK_LATENCY_PER_IMAGE_MS", "0"))
+MOCK_SEED = os.getenv("MOCK_SEED")
+
+# Class names of the spacecraft model (used by the mock backend)
+SPACECRAFT_LABELS = ["fire extinguisher", "toolbox", "oxygen tank"]
+
+# Mock boxes as fractions of the image: (x, y, width, height), class, confidence
+MOCK_BOXES = [
+    ((0.1, 0.2, 0.15, 0.2), 0, 0.85),   # fire extinguisher
+    ((0.6, 0.3, 0.2, 0.15), 1, 0.92),   # toolbox
+    ((0.3, 0.6, 0.12, 0.25), 2, 0.78),  # oxygen tank
+]
+
+Loader = Callable[[str], Tuple[Any, Dict[str, Any]]]
+
+
+def model_info(
+    model_name: str, model_path: str, backend: str, version: str, imgsz: int, names: Dict[int, str]
+) -> Dict[str, Any]:
+    """The /info description of a loaded model"""
+    return {
+        "model_name": model_name,
+        "model_path": model_path,
+        "model_version": version,
+        "backend": backend,
+        "input_shape": [1, 3, imgsz, imgsz],
+        "num_classes": len(names),
+        "labels": list(names.values()),
+    }
+
+
+class UltralyticsDetector:
+    """PyTorch YOLO through ultralytics, returning plain box arrays"""
+
+    def __init__(self, model_path: str):
+        import_started = time.perf_counter()
+        from ultralytics import YOLO
+
+        self.framework_import_s = time.perf_counter() - import_started
+        # Kept as .model so the registry can count the parameters
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+        self.imgsz = 640
+
+    def __call__(self, images: List[Image.Image]) -> List[BoxArrays]:
+        return [boxes_to_arrays(result.boxes) for result in self.model(images)]
+
+
+class LatencyDistribution:
+    """Synthetic inference latency per batch, in seconds"""
+
+    def __init__(self, spec: str = MOCK_LATENCY, per_image_ms: float = MOCK_LATENCY_PER_IMAGE_MS, seed: Optional[str] = MOCK_SEED):
+        kind, _, params = spec.strip().lower().partition(":")
+        if not params:
+            # A bare number means a fixed latency
+            kind, params = "fixed", kind or "0"
+        self.kind = kind
+        self.params = [float(value) for value in params.split(",")]
+        self.per_image_ms = per_image_ms
+        self.spec = spec
+        self._rng = np.random.default_rng(int(seed) if seed is not None else None)
+        # Generator objects are not thread-safe
+        self._lock = threading.Lock()
+        samplers = {
+            "fixed": lambda: self.params[0],
+            "uniform": lambda: self._rng.uniform(self.params[0], self.params[1]),
+            "normal": lambda: self._rng.normal(self.params[0], self.params[1]),
+            "lognormal": lambda: self.params[0] * np.exp(self._rng.normal(0.0, self.params[1])),
+            "exponential": lambda: self._rng.exponential(self.params[0]),
+        }
+        if kind not in samplers:
+            raise ValueError(f"Unknown latency distribution {kind!r}, expected one of {sorted(samplers)}")
+        self._sample = samplers[kind]
+
+    def sample(self, batch_size: int) -> float:
+        with self._lock:
+            base_ms = self._sample()
+        return max(0.0, base_ms + self.per_image_ms * batch_size) / 1000.0
+
+
+class MockDetector:
+    """Fixed synthetic detections after a synthetic latency (no model at all)"""
+
+    def __init__(self, latency: Optional[LatencyDistribution] = None):
+        self.latency = latency or LatencyDistribution()
+        self.names = dict(enumerate(SPACECRAFT_LABELS))
+        self.imgsz = 640
+        fractions = np.array([box for box, _, _ in MOCK_BOXES], dtype=np.float32)
+        # x, y, w, h -> x1, y1, x2, y2 as fractions of the image size
+        self._xyxy = np.concatenate([fractions[:, :2], fractions[:, :2] + fractions[:, 2:]], axis=1)
+        self._cls = np.array([cls for _, cls, _ in MOCK_BOXES], dtype=np.int64)
+        self._conf = np.array([conf for _, _, conf in MOCK_BOXES], dtype=np.float32)
+
+    def __call__(self, images: List[Image.Image]) -> List[BoxArrays]:
+        delay = self.latency.sample(len(images))
+        if delay > 0:
+            time.sleep(delay)
+        outputs = []
+        for image in images:
+            scale = np.array(image.size * 2, dtype=np.float32)
+            outputs.append((self._xyxy * scale, self._conf.copy(), self._cls.copy()))
+        return outputs
+
+
+def onnx_model_path(model_path: str, int8: bool = False) -> str:
+    """ONNX file for the backend (FP32 export or the prebuilt INT8 model)"""
+    if int8:
+        int8_path = int8_path_for(model_path)
+        if not os.path.exists(int8_path):
+            raise FileNotFoundError(f"INT8 model not found at {int8_path}, run: python api/quantize.py build")
+        return int8_path
+    return export_onnx(model_path)
+
+
+def load_ultralytics(model_path: str):
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file not found at {model_path}")
+    print(f"🚀 Loading PyTorch model from {model_path} ({os.path.getsize(model_path) / (1024*1024):.1f} MB)...")
+    # torch and ultralytics are imported here, in the background loader, not at server import
+    detector = UltralyticsDetector(model_path)
+    info = model_info(
+        "YOLOv8 Spacecraft Detector", model_path, "ultralytics", model_version(model_path), detector.imgsz, detector.names
+    )
+    info["framework_import_s"] = round(detector.framework_import_s, 3)
+    return detector, info
+
+
+def load_onnx(model_path: str, int8: bool = False):
+    onnx_path = onnx_model_path(model_path, int8)
+    print(f"🚀 Loading ONNX Runtime model from {onnx_path}...")
+    detector = OnnxDetector(onnx_path)
+    backend = "onnx-int8" if int8 else "onnx"
+    info = model_info(
+        "YOLOv8 Spacecraft Detector (ONNX Runtime)", onnx_path, backend, model_version(onnx_path), detector.imgsz, detector.names
+    )
+    return detector, info
+
+
+def load_mock(model_path: str):
+    detector = MockDetector()
+    print(f"🎭 Using mock backend (latency {detector.latency.spec} ms + {detector.latency.per_image_ms} ms/image)")
+    # The latency settings are part of the version so cached results never mix configurations
+    version = f"mock:{detector.latency.spec}:{detector.latency.per_image_ms}"
+    return detector, model_info("YOLOv8 Spacecraft Detector (Mock)", model_path, "mock", version, detector.imgsz, detector.names)
+
+
+def load_pool(model_path: str):
+    from inference_pool import PoolDetector
+
+    detector = PoolDetector(model_path)
+    print(f"🔗 Using the inference pool at {detector.address} ({detector.info['pool']['workers']} processes)")
+    info = dict(detector.info)
+    # Same version as the pool's own backend, so cache keys match across HTTP processes
+    info["backend"] = f"pool:{info['backend']}"
+    return detector, info
+
+
+BACKENDS: Dict[str, Loader] = {
+    "ultralytics": load_ultralytics,
+    "onnx": load_onnx,
+    "onnx-int8": lambda model_path: load_onnx(model_path, int8=True),
+    "pool": load_pool,
+    "mock": load_mock,
+}
+
+
+def backend_available(backend: str) -> bool:
+    """Whether the backend's runtime is installed (without importing it)"""
+    if backend == "ultralytics":
+        return importlib.util.find_spec("ultralytics") is not None
+    if backend in ("onnx", "onnx-int8"):
+        return ONNX_AVAILABLE
+    return backend in BACKENDS
+
+
+def load_detector(model_path: str, backend: str = INFERENCE_BACKEND, fallback: str = BACKEND_FALLBACK):
+    """Load one model with the given backend; returns (detector, model_info)"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}, expected one of {sorted(BACKENDS)}")
+    try:
+        if not backend_available(backend):
+            raise RuntimeError(f"{backend} backend not installed")
+        detector, info = BACKENDS[backend](model_path)
+    except Exception as e:
+        if not fallback or fallback == backend:
+            raise
+        print(f"⚠️ Could not load {model_path} with {backend} ({e}), falling back to {fallback}")
+        detector, info = BACKENDS[fallback](model_path)
+    print("✅ Model loaded successfully")
+    print(f"📋 Model info: {info}")
+    return detector, info
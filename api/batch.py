@@ -0,0 +1,175 @@
+"""
+Batch detection over many images in one request
+
+Accepts either a multipart upload with any number of image files or a single
+zip / tar(.gz) archive, and streams one NDJSON line per image back as soon as
+that image is done, followed by a summary line. Only a bounded window of
+images is in flight at a time; inside that window the requests reach the
+model's micro-batcher together and run as batched forward passes. Memory
+therefore stays flat no matter how many images the batch has:
+
+  - multipart files are spooled to disk by the form parser and read one by
+    one; the parser receives the whole upload before the first image is
+    processed, so large batches should be sent as an archive
+  - archives are spooled to a temporary file and read member by member
+"""
+
+import asyncio
+import os
+import tarfile
+import time
+import zipfile
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request
+
+from batching import BATCH_MAX_SIZE
+from image_io import read_file
+from video import ndjson_line
+
+# Batch settings (overridable via environment)
+# Images in flight per batch request: two micro-batches, so the next one fills while one runs
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(2 * BATCH_MAX_SIZE)))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "64"))
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "10000"))
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
+
+ARCHIVE_CONTENT_TYPES = (
+    "application/zip",
+    "application/x-zip-compressed",
+    "application/x-tar",
+    "application/x-gtar",
+    "application/gzip",
+    "application/x-gzip",
+)
+
+BatchItem = Tuple[str, bytes]  # (filename, encoded image)
+DetectItemFn = Callable[[str, bytes], Awaitable[Dict[str, Any]]]
+
+
+def is_multipart(content_type: str) -> bool:
+    return content_type.startswith("multipart/form-data")
+
+
+def is_archive(content_type: str) -> bool:
+    return content_type.split(";")[0].strip().lower() in ARCHIVE_CONTENT_TYPES
+
+
+def is_image_name(name: str) -> bool:
+    """Image files only; skips directories and macOS resource forks"""
+    base = os.path.basename(name)
+    return not base.startswith(".") and "__MACOSX/" not in name and base.lower().endswith(IMAGE_EXTENSIONS)
+
+
+class ArchiveReader:
+    """Sequential reader over the image members of a zip or tar(.gz) file"""
+
+    def __init__(self, path: str):
+        self.zip: Optional[zipfile.ZipFile] = None
+        self.tar: Optional[tarfile.TarFile] = None
+        if zipfile.is_zipfile(path):
+            self.zip = zipfile.ZipFile(path)
+            self._names = iter([info.filename for info in self.zip.infolist() if not info.is_dir()])
+        else:
+            # Stream mode: members are read in order without building an index
+            self.tar = tarfile.open(path, mode="r|*")
+
+    def next_image(self) -> Optional[BatchItem]:
+        """Read the next image member (None at the end); runs in a worker thread"""
+        if self.zip is not None:
+            for name in self._names:
+                if is_image_name(name):
+                    return name, self.zip.read(name)
+            return None
+        member = self.tar.next()
+        while member is not None:
+            if member.isfile() and is_image_name(member.name):
+                return member.name, self.tar.extractfile(member).read()
+            member = self.tar.next()
+        return None
+
+    def close(self):
+        (self.zip or self.tar).close()
+
+
+async def iter_form_images(request: Request, stage_executors, max_files: int = BATCH_MAX_FILES) -> AsyncIterator[BatchItem]:
+    """Image files of a multipart upload, any field name"""
+    form = await request.form(max_files=max_files)
+    try:
+        for _, value in form.multi_items():
+            if isinstance(value, str):
+                continue
+            image_data = await stage_executors.run("read", read_file, value.file)
+            yield value.filename or "upload", image_data
+    finally:
+        await form.close()
+
+
+async def iter_archive_images(path: str, stage_executors) -> AsyncIterator[BatchItem]:
+    """Image members of a spooled archive (the endpoint removes the file in its response teardown)"""
+    reader = None
+    try:
+        reader = await stage_executors.run("open_archive", ArchiveReader, path)
+        while True:
+            item = await stage_executors.run("read", reader.next_image)
+            if item is None:
+                break
+            yield item
+    finally:
+        if reader is not None:
+            reader.close()
+
+
+async def detect_batch(items: AsyncIterator[BatchItem], detect_item: DetectItemFn, concurrency: int = BATCH_CONCURRENCY) -> AsyncIterator[bytes]:
+    """NDJSON lines for a batch, in completion order, with at most `concurrency` images in flight"""
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+    started = time.perf_counter()
+    submitted = succeeded = failed = 0
+    pending = set()
+
+    async def run(index: int, filename: str, image_data: bytes) -> Dict[str, Any]:
+        try:
+            return {"index": index, "filename": filename, **await detect_item(filename, image_data)}
+        except Exception as e:
+            return {"index": index, "filename": filename, "error": str(e)}
+
+    iterator = items.__aiter__()
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    filename, image_data = await iterator.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                except Exception as e:
+                    # Unreadable upload or archive: report it, then finish the images already in flight
+                    exhausted = True
+                    yield ndjson_line({"error": str(e)})
+                    break
+                pending.add(asyncio.ensure_future(run(submitted, filename, image_data)))
+                submitted += 1
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if "error" in result:
+                    failed += 1
+                else:
+                    succeeded += 1
+                yield ndjson_line(result)
+    finally:
+        # Only non-empty if the client went away: drop the images still in flight
+        for task in pending:
+            task.cancel()
+        await iterator.aclose()
+    yield ndjson_line({
+        "done": True,
+        "images": submitted,
+        "succeeded": succeeded,
+        "failed": failed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 2),
+    })
@@ -0,0 +1,140 @@
+"""
+Dynamic micro-batching for YOLO inference
+
+Requests that arrive within a short window are grouped and run through the
+model as a single batched forward pass, then each caller gets its own result
+back together with the batch size and queue wait it actually experienced.
+"""
+
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+# Batching settings (overridable via environment)
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+
+
+@dataclass
+class BatchStats:
+    """Per-request batching statistics"""
+    batch_size: int
+    queue_wait_ms: float
+    inference_ms: float
+
+
+class MicroBatcher:
+    """Collects single-image requests into batches for one model"""
+
+    def __init__(
+        self,
+        infer_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+        executor=None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.infer_batch = infer_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.executor = executor
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self):
+        """Start (or restart) the batching loop; requests already queued are kept for it"""
+        if self._worker is not None and not self._worker.done():
+            return
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            # A queue is bound to its event loop, so only a new loop gets a new one
+            if self._queue is not None:
+                while not self._queue.empty():
+                    fail(self._queue.get_nowait()[1], RuntimeError("Batcher moved to a new event loop"))
+            self._queue = asyncio.Queue()
+            self._loop = loop
+        self._worker = loop.create_task(self._run())
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a batch slot"""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def close(self):
+        """Stop the batching loop (safe to call from any thread)"""
+        worker = self._worker
+        if worker is not None and not worker.done():
+            worker.get_loop().call_soon_threadsafe(worker.cancel)
+
+    async def submit(self, item: Any) -> Tuple[Any, BatchStats]:
+        """Queue one input and wait for its result from a batched run"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self, batch: list):
+        """Wait for the first request, then fill the batch until full or the window closes"""
+        batch.append(await self._queue.get())
+        deadline = batch[0][2] + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Grab anything that is already waiting without extending the window
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+    async def _run(self):
+        """Batching loop: one batch in flight at a time, the next one forms meanwhile"""
+        batch = []
+        try:
+            await self._batches(batch)
+        finally:
+            # Stopped (close() or an unexpected error): nobody else would resolve these
+            for _, future, _ in batch:
+                fail(future, RuntimeError("Batcher stopped"))
+
+    async def _batches(self, batch: list):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch.clear()
+            await self._collect(batch)
+            items = [entry[0] for entry in batch]
+            started = time.perf_counter()
+
+            try:
+                outputs = await loop.run_in_executor(self.executor, self.infer_batch, items)
+                if len(outputs) != len(items):
+                    raise RuntimeError(f"Batch returned {len(outputs)} results for {len(items)} inputs")
+            except Exception as e:
+                for _, future, _ in batch:
+                    fail(future, e)
+                continue
+
+            inference_ms = (time.perf_counter() - started) * 1000.0
+            for (_, future, enqueued), output in zip(batch, outputs):
+                if future.done():
+                    # Caller went away (client disconnected / cancelled)
+                    continue
+                stats = BatchStats(
+                    batch_size=len(batch),
+                    queue_wait_ms=(started - enqueued) * 1000.0,
+                    inference_ms=inference_ms,
+                )
+                future.set_result((output, stats))
+
+
+def fail(future: asyncio.Future, error: BaseException):
+    """Fail a request future unless its caller already went away (thread-safe, the future may be on another loop)"""
+    loop = future.get_loop()
+    if not future.done() and not loop.is_closed():
+        loop.call_soon_threadsafe(lambda: future.done() or future.set_exception(error))
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+"""
+Offline bulk detection over a directory of images, without HTTP
+
+The image list is sharded across a pool of worker processes in chunks. Each
+worker loads the model once (same backends as the server, see
+api/backends.py) and keeps a few decode threads busy prefetching the images
+of its chunk while earlier images run through the model in batches.
+Detections go to one compact JSON-lines shard per worker:
+
+  {"image": "sub/dir/a.jpg", "size": [4000, 3000], "boxes": [[x1, y1, x2, y2, conf, cls], ...]}
+  {"image": "sub/dir/b.jpg", "error": "cannot identify image file"}
+
+Boxes are in original image pixels. The shards double as the manifest: a
+rerun with the same output directory skips every image that already has a
+row, so an interrupted backfill resumes where it stopped (failed images are
+retried and their old error rows dropped). manifest.json records the input,
+model and decode settings before the first image is processed, plus the
+summary of the last run. --render DIR also writes annotated JPEGs with the
+server's renderer.
+
+Reports overall images/s and, per worker, throughput, the share of time the
+model was busy and the share spent waiting for decodes.
+
+Usage:
+  python api/bulk.py INPUT_DIR --output runs/backfill [--workers 4] [--batch-size 8]
+                     [--backend onnx] [--render runs/backfill/images] [--limit N] [--json summary.json]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cache import model_version  # noqa: E402
+from image_io import DECODE_TARGET_SIZE, decode_for_inference, decode_image_bytes, downscale_for_inference  # noqa: E402
+
+MODEL_PATH = "public/models/best.pt"
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp", ".webp", ".tif", ".tiff")
+MANIFEST_NAME = "manifest.json"
+SHARD_PATTERN = "detections-*.jsonl"
+PROGRESS_INTERVAL_S = 5.0
+
+
+def list_images(input_dir: Path) -> List[str]:
+    """All images under input_dir (recursive), as sorted relative paths"""
+    paths = []
+    for root, dirs, files in os.walk(input_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_SUFFIXES) and not name.startswith("."):
+                paths.append(os.path.relpath(os.path.join(root, name), input_dir))
+    return paths
+
+
+def repair_shard(path: Path):
+    """Cut a partial last line left by an interrupted run, so appends start on a clean line"""
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+def iter_results(output_dir: Path) -> Iterator[Dict[str, Any]]:
+    """Every row written so far, across all shards"""
+    for shard in sorted(output_dir.glob(SHARD_PATTERN)):
+        with open(shard, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def completed_images(output_dir: Path) -> Set[str]:
+    """Images that already have detections (failed ones are retried)"""
+    for shard in output_dir.glob(SHARD_PATTERN):
+        repair_shard(shard)
+    return {row["image"] for row in iter_results(output_dir) if "error" not in row}
+
+
+def drop_error_rows(output_dir: Path, retried: Set[str]) -> int:
+    """Remove the error rows of images that are about to be retried, so each image ends with one row"""
+    dropped = 0
+    for shard in output_dir.glob(SHARD_PATTERN):
+        with open(shard, encoding="utf-8") as f:
+            lines = f.readlines()
+        kept = []
+        for line in lines:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "error" in row and row["image"] in retried:
+                dropped += 1
+            else:
+                kept.append(line)
+        if len(kept) != len(lines):
+            tmp_path = shard.with_suffix(".tmp")
+            tmp_path.write_text("".join(kept), encoding="utf-8")
+            os.replace(tmp_path, shard)
+    return dropped
+
+
+def check_manifest(output_dir: Path, manifest: Dict[str, Any]) -> Dict[str, Any]:
+    """Refuse to mix results from a different model or input into one output directory; returns the previous manifest"""
+    path = output_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    previous = json.loads(path.read_text())
+    for key in ("input_dir", "model_version", "backend", "decode_size"):
+        if previous.get(key) != manifest[key]:
+            raise SystemExit(
+                f"❌ {path} was written with {key}={previous.get(key)!r}, this run has {manifest[key]!r}; "
+                "use a new --output directory"
+            )
+    return previous
+
+
+def write_manifest(output_dir: Path, manifest: Dict[str, Any]):
+    """Replace manifest.json atomically"""
+    path = output_dir / MANIFEST_NAME
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2))
+    os.replace(tmp_path, path)
+
+
+class BulkWorker:
+    """One pool process: model, decode threads and its own output shard"""
+
+    def __init__(self, index: int, options: Dict[str, Any]):
+        from backends import load_detector
+        from renderer import AnnotationRenderer
+
+        self.index = index
+        self.input_dir = Path(options["input_dir"])
+        self.batch_size = options["batch_size"]
+        # Decoded images held at once: the batch being collected plus one in flight per decode thread
+        self.prefetch = options["batch_size"] + options["decode_threads"]
+        self.render_dir = Path(options["render"]) if options["render"] else None
+        self.detector, info = load_detector(options["model"], options["backend"])
+        self.renderer = AnnotationRenderer(info["labels"]) if self.render_dir else None
+        self.decode_pool = ThreadPoolExecutor(max_workers=options["decode_threads"], thread_name_prefix="decode")
+        shard = Path(options["output"]) / f"detections-{index:03d}.jsonl"
+        self.output = open(shard, "a", encoding="utf-8")
+
+    def load(self, rel_path: str):
+        """Read and decode one image (in a decode thread); returns (rel_path, image, scale, full image or error)"""
+        try:
+            image_data = (self.input_dir / rel_path).read_bytes()
+            if self.render_dir is not None:
+                # The annotated output needs full resolution anyway
+                full_image = decode_image_bytes(image_data)
+                image, scale = downscale_for_inference(full_image, DECODE_TARGET_SIZE)
+                return rel_path, image, scale, full_image
+            image, scale = decode_for_inference(image_data)
+            return rel_path, image, scale, None
+        except Exception as e:
+            return rel_path, None, None, e
+
+    def process(self, rel_paths: List[str]) -> Dict[str, Any]:
+        """Detect on one chunk; decodes run ahead of inference in a bounded window"""
+        started = time.perf_counter()
+        decode_wait_s = inference_s = write_s = 0.0
+        errors = 0
+        queued = iter(rel_paths)
+        pending = deque()
+
+        def refill():
+            # Only a window of decodes is in flight, so memory does not grow with the chunk size
+            while len(pending) < self.prefetch:
+                rel_path = next(queued, None)
+                if rel_path is None:
+                    return
+                pending.append(self.decode_pool.submit(self.load, rel_path))
+
+        refill()
+        while pending:
+            wait_started = time.perf_counter()
+            loaded = [pending.popleft().result() for _ in range(min(self.batch_size, len(pending)))]
+            decode_wait_s += time.perf_counter() - wait_started
+            # Next images decode while this batch runs through the model
+            refill()
+
+            rows = []
+            ready = []
+            for rel_path, image, scale, extra in loaded:
+                if image is None:
+                    rows.append({"image": rel_path, "error": str(extra)})
+                    errors += 1
+                else:
+                    ready.append((rel_path, image, scale, extra))
+
+            if ready:
+                inference_started = time.perf_counter()
+                outputs = self.detector([image for _, image, _, _ in ready])
+                inference_s += time.perf_counter() - inference_started
+
+                for (rel_path, image, scale, full_image), (xyxy, conf, cls) in zip(ready, outputs):
+                    # float64 so the rounded values serialize as short decimals
+                    boxes = np.asarray(xyxy, dtype=np.float64) * np.array(scale * 2)
+                    table = np.column_stack([np.round(boxes, 1), np.round(np.asarray(conf, dtype=np.float64), 4), cls]).tolist()
+                    rows.append({
+                        "image": rel_path,
+                        "size": [round(image.width * scale[0]), round(image.height * scale[1])],
+                        "boxes": [row[:5] + [int(row[5])] for row in table],
+                    })
+                    if full_image is not None:
+                        self.render(rel_path, full_image, table)
+
+            write_started = time.perf_counter()
+            self.output.write("".join(json.dumps(row, separators=(",", ":")) + "\n" for row in rows))
+            write_s += time.perf_counter() - write_started
+
+        # A chunk is only counted as done once its rows are on disk
+        self.output.flush()
+        return {
+            "worker": self.index,
+            "images": len(rel_paths),
+            "errors": errors,
+            "wall_s": time.perf_counter() - started,
+            "inference_s": inference_s,
+            "decode_wait_s": decode_wait_s,
+            "write_s": write_s,
+        }
+
+    def render(self, rel_path: str, image, table: List[List[float]]):
+        target = (self.render_dir / rel_path).with_suffix(".jpg")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        self.renderer.draw_boxes(image, table, in_place=True).save(target, format="JPEG", quality=90)
+
+
+# Per-process worker, created by the pool initializer
+_worker: Optional[BulkWorker] = None
+
+
+def init_worker(options: Dict[str, Any], counter):
+    """Pool initializer: pin thread counts, then load the model once for this process"""
+    global _worker
+    threads = str(options["threads_per_worker"])
+    # Must be set before torch / onnxruntime are imported, or every worker grabs every core
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "ONNX_INTRA_OP_THREADS"):
+        os.environ[name] = threads
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    _worker = BulkWorker(index, options)
+
+
+def process_chunk(rel_paths: List[str]) -> Dict[str, Any]:
+    return _worker.process(rel_paths)
+
+
+def summarize(results: List[Dict[str, Any]], elapsed_s: float, skipped: int) -> Dict[str, Any]:
+    """Overall throughput plus per-worker utilization"""
+    workers = {}
+    for result in results:
+        worker = workers.setdefault(result["worker"], {"images": 0, "errors": 0, "wall_s": 0.0, "inference_s": 0.0, "decode_wait_s": 0.0, "write_s": 0.0})
+        for key in worker:
+            worker[key] += result[key]
+    for worker in workers.values():
+        wall_s = max(worker["wall_s"], 1e-9)
+        worker["img_per_s"] = round(worker["images"] / wall_s, 2)
+        worker["inference_busy"] = round(worker["inference_s"] / wall_s, 3)
+        worker["decode_wait"] = round(worker["decode_wait_s"] / wall_s, 3)
+        # Share of the whole run this worker spent on chunks (the rest is model load and idle time)
+        worker["utilization"] = round(worker["wall_s"] / max(elapsed_s, 1e-9), 3)
+        for key in ("wall_s", "inference_s", "decode_wait_s", "write_s"):
+            worker[key] = round(worker[key], 3)
+    processed = sum(result["images"] for result in results)
+    return {
+        "images": processed,
+        "errors": sum(result["errors"] for result in results),
+        "skipped_already_done": skipped,
+        "elapsed_s": round(elapsed_s, 3),
+        "img_per_s": round(processed / max(elapsed_s, 1e-9), 2),
+        "workers": {str(index): workers[index] for index in sorted(workers)},
+    }
+
+
+def print_summary(summary: Dict[str, Any]):
+    print("=" * 72)
+    print(f"📊 {summary['images']} images in {summary['elapsed_s']:.1f} s "
+          f"({summary['errors']} errors, {summary['skipped_already_done']} already done)")
+    print(f"⚡ Throughput: {summary['img_per_s']} img/s")
+    print(f"{'worker':>8}{'images':>9}{'img/s':>9}{'utilization':>13}{'model busy':>12}{'decode wait':>13}")
+    for index, worker in summary["workers"].items():
+        print(f"{index:>8}{worker['images']:>9}{worker['img_per_s']:>9}{worker['utilization']:>13.0%}"
+              f"{worker['inference_busy']:>12.0%}{worker['decode_wait']:>13.0%}")
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_dir", help="Directory of images (searched recursively)")
+    parser.add_argument("--output", required=True, help="Directory for the detection shards and manifest")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--backend", default=os.getenv("INFERENCE_BACKEND", "ultralytics").lower())
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 2))
+    parser.add_argument("--threads-per-worker", type=int, help="Inference threads per worker (default: cores / workers)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Images per forward pass")
+    parser.add_argument("--chunk-size", type=int, default=64, help="Images per pool task")
+    parser.add_argument("--decode-threads", type=int, default=2, help="Prefetching decode threads per worker")
+    parser.add_argument("--render", help="Also write annotated JPEGs under this directory")
+    parser.add_argument("--limit", type=int, help="Process at most this many remaining images")
+    parser.add_argument("--json", help="Write the run summary as JSON")
+    args = parser.parse_args()
+
+    input_dir = Path(args.input_dir).resolve()
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {
+        "input_dir": str(input_dir),
+        "model": args.model,
+        "model_version": "mock" if args.backend == "mock" else model_version(args.model),
+        "backend": args.backend,
+        "decode_size": DECODE_TARGET_SIZE,
+        "format": {"boxes": ["x1", "y1", "x2", "y2", "confidence", "class_id"]},
+    }
+    previous = check_manifest(output_dir, manifest)
+    if "last_run" in previous:
+        manifest["last_run"] = previous["last_run"]
+    # Written before the first chunk, so even an interrupted first run is checked on resume
+    write_manifest(output_dir, manifest)
+
+    images = list_images(input_dir)
+    done = completed_images(output_dir)
+    remaining = [path for path in images if path not in done]
+    if args.limit:
+        remaining = remaining[:args.limit]
+    print(f"📂 {len(images)} images in {input_dir}, {len(done)} already done, {len(remaining)} to process")
+    if not remaining:
+        return
+    retried = drop_error_rows(output_dir, set(remaining))
+    if retried:
+        print(f"🔁 Retrying {retried} previously failed images")
+
+    workers = max(1, min(args.workers, len(remaining) // args.chunk_size + 1))
+    options = {
+        "input_dir": str(input_dir),
+        "output": str(output_dir),
+        "model": args.model,
+        "backend": args.backend,
+        "batch_size": args.batch_size,
+        "decode_threads": args.decode_threads,
+        "render": args.render,
+        "threads_per_worker": args.threads_per_worker or max(1, (os.cpu_count() or 1) // workers),
+    }
+    chunks = [remaining[i:i + args.chunk_size] for i in range(0, len(remaining), args.chunk_size)]
+    print(f"🚀 {workers} workers x {options['threads_per_worker']} threads, {len(chunks)} chunks of {args.chunk_size}")
+
+    # spawn: workers import torch / onnxruntime fresh with their own thread settings
+    context = multiprocessing.get_context("spawn")
+    counter = context.Value("i", 0)
+    started = time.perf_counter()
+    results = []
+    last_report = started
+    processed = 0
+    with context.Pool(workers, initializer=init_worker, initargs=(options, counter)) as pool:
+        for result in pool.imap_unordered(process_chunk, chunks):
+            results.append(result)
+            processed += result["images"]
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_INTERVAL_S or processed == len(remaining):
+                rate = processed / (now - started)
+                eta_s = (len(remaining) - processed) / rate if rate else 0.0
+                print(f"⏱️ {processed}/{len(remaining)} images, {rate:.1f} img/s, ETA {eta_s:.0f} s")
+                last_report = now
+
+    summary = summarize(results, time.perf_counter() - started, len(done))
+    print_summary(summary)
+    manifest["last_run"] = summary
+    write_manifest(output_dir, manifest)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 Summary written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Content-addressed cache for detection results
+
+Keys are a SHA-256 over the uploaded image bytes, the model version and the
+inference parameters, so identical resubmissions skip inference entirely.
+Entries live in a byte-bounded in-memory LRU and, optionally, in an on-disk
+tier under output_results/cache that survives restarts.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# Cache settings (overridable via environment)
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") == "1"
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_RENDERED = os.getenv("CACHE_RENDERED", "1") == "1"
+CACHE_DISK_DIR = os.getenv("CACHE_DISK_DIR", "")  # e.g. output_results/cache; empty disables the disk tier
+CACHE_DISK_MAX_BYTES = int(os.getenv("CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# Rough per-detection overhead of the in-memory representation
+DETECTION_SIZE_ESTIMATE = 160
+
+
+def model_version(model_path: str) -> str:
+    """Cheap model fingerprint from the weights file path, size and mtime"""
+    try:
+        stat = os.stat(model_path)
+    except OSError:
+        return f"{model_path}:missing"
+    return f"{model_path}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def file_size(path: str) -> int:
+    """Size of a file, 0 if it does not exist"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+@dataclass
+class CacheEntry:
+    """Cached detections (as plain dicts) and optionally the rendered image (default output options)"""
+    detections: List[Dict[str, Any]]
+    rendered: Optional[bytes] = None
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.detections) * DETECTION_SIZE_ESTIMATE + (len(self.rendered) if self.rendered else 0)
+
+
+class DetectionCache:
+    """Two-tier (memory LRU + optional disk) detection cache"""
+
+    def __init__(
+        self,
+        max_bytes: int = CACHE_MAX_BYTES,
+        disk_dir: str = CACHE_DISK_DIR,
+        disk_max_bytes: int = CACHE_DISK_MAX_BYTES,
+        cache_rendered: bool = CACHE_RENDERED,
+        rendered_suffix: str = ".jpg",
+    ):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir or None
+        self.disk_max_bytes = disk_max_bytes
+        self.cache_rendered = cache_rendered
+        self.rendered_suffix = rendered_suffix  # file suffix of the rendered image format on disk
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+        }
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_bytes = sum(entry.stat().st_size for entry in os.scandir(self.disk_dir) if entry.is_file())
+
+    @staticmethod
+    def make_key(image_data: bytes, version: str, params: Dict[str, Any]) -> str:
+        """Hash of image bytes + model version + inference parameters"""
+        digest = hashlib.sha256(image_data)
+        digest.update(b"\0" + version.encode("utf-8"))
+        digest.update(b"\0" + json.dumps(params, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Look up a key in memory, then on disk (promoting disk hits)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.counters["hits"] += 1
+                self.counters["memory_hits"] += 1
+                return entry
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["hits"] += 1
+            self.counters["disk_hits"] += 1
+            self._insert(key, entry)
+        return entry
+
+    def put(self, key: str, detections: List[Dict[str, Any]], rendered: Optional[bytes] = None):
+        """Store detections (and the rendered image if enabled)"""
+        entry = CacheEntry(detections=detections, rendered=rendered if self.cache_rendered else None)
+        with self._lock:
+            self._insert(key, entry)
+        self._write_disk(key, entry)
+
+    def set_rendered(self, key: str, rendered: bytes):
+        """Attach a rendered image to an existing entry"""
+        if not self.cache_rendered:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.rendered is not None:
+                return
+            self._bytes -= entry.nbytes
+            entry.rendered = rendered
+            self._bytes += entry.nbytes
+            self._evict()
+        self._write_disk(key, entry, rendered_only=True)
+
+    def _insert(self, key: str, entry: CacheEntry):
+        """Add or replace an entry in the memory tier (lock held)"""
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.nbytes
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until within the byte limit (lock held)"""
+        while self._entries and self._bytes > self.max_bytes:
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.nbytes
+            self.counters["evictions"] += 1
+
+    def _disk_paths(self, key: str):
+        return os.path.join(self.disk_dir, f"{key}.json"), os.path.join(self.disk_dir, f"{key}{self.rendered_suffix}")
+
+    def _read_disk(self, key: str) -> Optional[CacheEntry]:
+        """Load an entry from the disk tier, if enabled and present"""
+        if not self.disk_dir:
+            return None
+        json_path, rendered_path = self._disk_paths(key)
+        try:
+            with open(json_path, "r") as f:
+                detections = json.load(f)
+        except (OSError, ValueError):
+            return None
+        rendered = None
+        if self.cache_rendered and os.path.exists(rendered_path):
+            with open(rendered_path, "rb") as f:
+                rendered = f.read()
+        return CacheEntry(detections=detections, rendered=rendered)
+
+    def _write_disk(self, key: str, entry: CacheEntry, rendered_only: bool = False):
+        """Persist an entry to the disk tier, if enabled"""
+        if not self.disk_dir:
+            return
+        json_path, rendered_path = self._disk_paths(key)
+        try:
+            # Net growth: rewriting a key (or a rendering after a disk promotion) replaces its files
+            written = 0
+            if not rendered_only:
+                data = json.dumps(entry.detections).encode("utf-8")
+                written += len(data) - file_size(json_path)
+                with open(json_path, "wb") as f:
+                    f.write(data)
+            if entry.rendered is not None:
+                written += len(entry.rendered) - file_size(rendered_path)
+                with open(rendered_path, "wb") as f:
+                    f.write(entry.rendered)
+        except OSError as e:
+            print(f"⚠️ Could not write cache entry {key[:12]}: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += written
+            over_limit = self._disk_bytes > self.disk_max_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Remove the oldest disk entries until under the disk limit"""
+        files = sorted(
+            (entry for entry in os.scandir(self.disk_dir) if entry.is_file()),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        total = sum(entry.stat().st_size for entry in files)
+        for entry in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+            total -= size
+            if entry.name.endswith(".json"):
+                self.counters["disk_evictions"] += 1
+        with self._lock:
+            self._disk_bytes = total
+
+    def info(self) -> Dict[str, Any]:
+        """Counters and current sizes"""
+        with self._lock:
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_dir": self.disk_dir,
+                "disk_bytes": self._disk_bytes if self.disk_dir else 0,
+                "disk_max_bytes": self.disk_max_bytes if self.disk_dir else 0,
+            }
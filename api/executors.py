@@ -0,0 +1,83 @@
+"""
+Executor layer that keeps blocking work off the asyncio event loop
+
+PIL decoding, drawing, JPEG encoding and disk writes go to a thread pool,
+model inference goes to its own dedicated pool, and every stage reports how
+long it waited for a worker and how long it ran (into the response stats and,
+when configured, the server metrics).
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+CPU_COUNT = os.cpu_count() or 1
+
+# Pool sizes (overridable via environment)
+PIL_POOL_SIZE = int(os.getenv("PIL_POOL_SIZE", str(min(4, CPU_COUNT))))
+# Each model version's MicroBatcher keeps one batch in flight, so this only
+# matters when several loaded versions serve traffic at once; parallelism
+# within a batch comes from the framework's own threads (OMP_NUM_THREADS etc.)
+INFERENCE_POOL_SIZE = int(os.getenv("INFERENCE_POOL_SIZE", "1"))
+
+
+class StageExecutors:
+    """Thread pools for image work and model inference"""
+
+    def __init__(self, pil_workers: int = PIL_POOL_SIZE, inference_workers: int = INFERENCE_POOL_SIZE, metrics=None):
+        self.pil_workers = pil_workers
+        self.metrics = metrics
+        self.inference_workers = inference_workers
+        self.pil = ThreadPoolExecutor(max_workers=pil_workers, thread_name_prefix="pil")
+        self.inference = ThreadPoolExecutor(max_workers=inference_workers, thread_name_prefix="inference")
+
+    async def run(
+        self,
+        stage: str,
+        fn: Callable[..., Any],
+        *args,
+        pool: Optional[ThreadPoolExecutor] = None,
+        stats: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> Any:
+        """Run fn in a pool and record its queue wait and run time under stats["stages"][stage]"""
+        submitted = time.perf_counter()
+        timing = {}
+
+        def timed_call():
+            started = time.perf_counter()
+            timing["queue_wait_ms"] = (started - submitted) * 1000.0
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timing["run_ms"] = (time.perf_counter() - started) * 1000.0
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool or self.pil, timed_call)
+        finally:
+            if timing:
+                queue_wait_ms, run_ms = timing.get("queue_wait_ms", 0.0), timing.get("run_ms", 0.0)
+                if stats is not None:
+                    record_stage(stats, stage, queue_wait_ms, run_ms)
+                if self.metrics is not None:
+                    self.metrics.observe_stage(stage, run_ms, queue_wait_ms)
+
+    def shutdown(self):
+        """Stop accepting work and wait for running jobs"""
+        self.pil.shutdown(wait=True)
+        self.inference.shutdown(wait=True)
+
+    def info(self) -> Dict[str, int]:
+        """Configured pool sizes"""
+        return {"pil_workers": self.pil_workers, "inference_workers": self.inference_workers}
+
+
+def record_stage(stats: Dict[str, Any], stage: str, queue_wait_ms: float, run_ms: float):
+    """Store a stage's timings in a response stats dict"""
+    stats.setdefault("stages", {})[stage] = {
+        "queue_wait_ms": round(queue_wait_ms, 2),
+        "run_ms": round(run_ms, 2),
+    }
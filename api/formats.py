@@ -0,0 +1,153 @@
+"""
+Response encodings for detection results, negotiated from the Accept header
+
+  application/json          (default) the DetectionResponse JSON, serialized in
+                            one pass by pydantic-core instead of
+                            jsonable_encoder + json.dumps
+  application/msgpack       the same fields, but boxes as compact
+                            [x, y, width, height, confidence, class_id] rows and
+                            the annotated image as raw bytes instead of base64
+                            (needs the optional msgpack package)
+  application/x-detections  packed little-endian binary for high-frequency
+                            polling: a 12-byte header, 24 bytes per box, then
+                            the annotated image if there is one
+
+Packed layout:
+  header  "<4sBBHI": magic b"SDET", version 1, flags (bit 0: image follows),
+          reserved, box count
+  boxes   count x 6 float32: x, y, width, height, confidence, class_id
+  image   uint32 length + encoded image bytes (only with flag bit 0)
+
+Binary responses also carry the result id in X-Result-Id and the media type
+of the image in X-Image-Type; the packed one has the stats block as JSON in
+X-Detection-Stats.
+"""
+
+import importlib.util
+import json
+import struct
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException, Response
+
+# msgpack is optional and imported on first use
+MSGPACK_AVAILABLE = importlib.util.find_spec("msgpack") is not None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+PACKED = "application/x-detections"
+# Accepted spellings of each format
+MEDIA_TYPES = {
+    JSON: JSON,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    PACKED: PACKED,
+}
+
+PACKED_MAGIC = b"SDET"
+PACKED_VERSION = 1
+PACKED_HEADER = struct.Struct("<4sBBHI")
+PACKED_IMAGE_LENGTH = struct.Struct("<I")
+FLAG_IMAGE = 1
+
+
+def available(media_type: str) -> bool:
+    return media_type != MSGPACK or MSGPACK_AVAILABLE
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Best supported response format for an Accept header (406 if none is acceptable)"""
+    if not accept:
+        return JSON
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_range, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, position, media_range.lower()))
+    for _, _, media_range in sorted(candidates):
+        if media_range in ("*/*", "application/*"):
+            return JSON
+        media_type = MEDIA_TYPES.get(media_range)
+        if media_type is not None and available(media_type):
+            return media_type
+    supported = [JSON, PACKED] + ([MSGPACK] if MSGPACK_AVAILABLE else [])
+    raise HTTPException(status_code=406, detail=f"Cannot produce {accept}; supported: {', '.join(supported)}")
+
+
+def detection_rows(detections: List[Any]) -> np.ndarray:
+    """(N, 6) float32 rows of x, y, width, height, confidence, class_id"""
+    return np.array(
+        [(d.bbox.x, d.bbox.y, d.bbox.width, d.bbox.height, d.confidence, d.class_id) for d in detections],
+        dtype="<f4",
+    ).reshape(-1, 6)
+
+
+def encode_json(response: Any) -> bytes:
+    # Faster than orjson.dumps(model_dump()), which needs a dict pass first (benchmarks/response-formats.py)
+    return response.model_dump_json().encode("utf-8")
+
+
+def encode_msgpack(response: Any, image: Optional[bytes]) -> bytes:
+    import msgpack
+
+    rows = [[d.bbox.x, d.bbox.y, d.bbox.width, d.bbox.height, d.confidence, d.class_id] for d in response.detections]
+    # Floats as float32: 5 bytes each instead of 9, and the model is not more precise than that
+    return msgpack.packb(
+        {
+            "detections": rows,
+            "processed_image": image,
+            "image_type": response.image_type,
+            "result_id": response.result_id,
+            "stats": response.stats,
+        },
+        use_single_float=True,
+    )
+
+
+def encode_packed(detections: List[Any], image: Optional[bytes]) -> bytes:
+    rows = detection_rows(detections)
+    parts = [PACKED_HEADER.pack(PACKED_MAGIC, PACKED_VERSION, FLAG_IMAGE if image else 0, 0, len(rows)), rows.tobytes()]
+    if image:
+        parts += [PACKED_IMAGE_LENGTH.pack(len(image)), image]
+    return b"".join(parts)
+
+
+def decode_packed(data: bytes) -> Tuple[np.ndarray, Optional[bytes]]:
+    """Client side of application/x-detections: ((N, 6) rows, image bytes or None)"""
+    magic, version, flags, _, count = PACKED_HEADER.unpack_from(data)
+    if magic != PACKED_MAGIC or version != PACKED_VERSION:
+        raise ValueError(f"Not a version {PACKED_VERSION} packed detection payload")
+    offset = PACKED_HEADER.size
+    rows = np.frombuffer(data, dtype="<f4", count=count * 6, offset=offset).reshape(-1, 6)
+    offset += rows.nbytes
+    image = None
+    if flags & FLAG_IMAGE:
+        (length,) = PACKED_IMAGE_LENGTH.unpack_from(data, offset)
+        offset += PACKED_IMAGE_LENGTH.size
+        image = data[offset:offset + length]
+    return rows, image
+
+
+def encode_response(response: Any, media_type: str, image: Optional[bytes] = None) -> Response:
+    """HTTP response for a DetectionResponse in the negotiated format; image is the raw annotated image"""
+    headers = {"Vary": "Accept"}
+    if media_type == JSON:
+        return Response(content=encode_json(response), media_type=JSON, headers=headers)
+    if response.result_id:
+        headers["X-Result-Id"] = response.result_id
+    if image and response.image_type:
+        headers["X-Image-Type"] = response.image_type
+    if media_type == MSGPACK:
+        return Response(content=encode_msgpack(response, image), media_type=MSGPACK, headers=headers)
+    headers["X-Detection-Stats"] = json.dumps(response.stats, separators=(",", ":"))
+    return Response(content=encode_packed(response.detections, image), media_type=PACKED, headers=headers)
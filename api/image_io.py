@@ -0,0 +1,105 @@
+"""
+Image ingestion helpers shared by the detection servers
+
+Handles the legacy base64-in-JSON payload as well as raw binary uploads
+(multipart/form-data or application/octet-stream), which skip the base64
+inflation and the extra copy. Image decoding itself is left to the caller so
+cache hits never pay for it.
+
+The model only ever sees a ~640px image, so the inference decode path asks
+libjpeg for a reduced-size draft (DCT scaling by 1/2, 1/4 or 1/8) and then
+downscales to the model input size; the returned scale maps detections back
+to original pixels. Full-resolution decoding is only needed for rendering.
+"""
+
+import base64
+import io
+import os
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from PIL import Image
+
+# Longest side the model needs; larger images are decoded/downscaled to it (0 = off)
+DECODE_TARGET_SIZE = int(os.getenv("DECODE_TARGET_SIZE", "640"))
+
+Scale = Tuple[float, float]
+
+
+def decode_image_bytes(image_data: bytes) -> Image.Image:
+    """Decode encoded image bytes into a fully loaded PIL image"""
+    # BytesIO shares the bytes buffer instead of copying it
+    image = Image.open(io.BytesIO(image_data))
+    image.load()
+    return image
+
+
+def inference_size(size: Tuple[int, int], target_size: int) -> Optional[Tuple[int, int]]:
+    """Size with the longest side at target_size, or None if no downscale is needed"""
+    width, height = size
+    if not target_size or max(width, height) <= target_size:
+        return None
+    ratio = target_size / max(width, height)
+    return max(1, round(width * ratio)), max(1, round(height * ratio))
+
+
+def downscale_for_inference(image: Image.Image, target_size: int = DECODE_TARGET_SIZE) -> Tuple[Image.Image, Scale]:
+    """Shrink a decoded image to the model input size; returns (image, original / new scale)"""
+    new_size = inference_size(image.size, target_size)
+    if new_size is None:
+        return image, (1.0, 1.0)
+    resized = image.resize(new_size, Image.BILINEAR, reducing_gap=2.0)
+    return resized, (image.width / resized.width, image.height / resized.height)
+
+
+def decode_for_inference(image_data: bytes, target_size: int = DECODE_TARGET_SIZE) -> Tuple[Image.Image, Scale]:
+    """Decode only as many pixels as the model needs; returns (image, original / decoded scale)"""
+    image = Image.open(io.BytesIO(image_data))
+    original_width, original_height = image.size
+    new_size = inference_size(image.size, target_size)
+    if new_size is not None and image.format == "JPEG":
+        # Let libjpeg skip DCT coefficients; keeps both sides >= the requested size
+        image.draft("RGB", new_size)
+    image.load()
+
+    image, _ = downscale_for_inference(image, target_size)
+    return image, (original_width / image.width, original_height / image.height)
+
+
+def read_file(file: BinaryIO) -> bytes:
+    """Read an uploaded file from the start"""
+    file.seek(0)
+    return file.read()
+
+
+def decode_base64(image_base64: str) -> bytes:
+    """Decode a base64 payload into the encoded image bytes"""
+    return base64.b64decode(image_base64)
+
+
+async def read_upload(
+    request: Request,
+    stage_executors,
+    stats: Dict[str, Any],
+    filename: Optional[str] = None,
+) -> Tuple[bytes, str]:
+    """Read a binary upload; returns (encoded image bytes, filename)"""
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        try:
+            upload = form.get("image") or form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Multipart upload needs an 'image' file field")
+            # The spooled upload file may live on disk, so read it in the pool
+            image_data = await stage_executors.run("read", read_file, upload.file, stats=stats)
+            return image_data, filename or upload.filename or "upload"
+        finally:
+            await form.close()
+
+    body = await request.body()
+    if not body:
+        raise HTTPException(status_code=400, detail="Empty request body")
+    filename = filename or request.headers.get("x-filename") or "upload"
+    return body, filename
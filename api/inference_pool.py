@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Shared-memory inference worker pool
+
+Runs the model in a fixed number of inference processes that any number of
+HTTP worker processes share, so model memory is capped by the pool size
+instead of growing with every uvicorn worker, and HTTP handling and inference
+scale independently:
+
+  python api/inference_pool.py --workers 2                # owns the model
+  INFERENCE_BACKEND=pool HTTP_WORKERS=4 python api/main.py  # no torch / onnxruntime
+
+The pool process listens on a local socket (INFERENCE_POOL_ADDRESS). Each
+HTTP process opens a few slots; a slot is one connection plus one shared
+memory buffer. A batch is sent by copying the decoded RGB pixels into the
+slot's buffer and sending only the image sizes over the socket, so pixel
+data is never pickled. Inference processes map the buffer, run the batch and
+reply with one packed float32 (N, 6) array of x1, y1, x2, y2, conf, cls per
+image. On the HTTP side the pool looks like any other backend (PoolDetector).
+
+The pool serves the models it was started with (default: the paths in
+MODELS); a dead inference process is restarted, and requests it was running
+time out after INFERENCE_POOL_TIMEOUT_S.
+"""
+
+import argparse
+import atexit
+import itertools
+import os
+import queue
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import get_context, resource_tracker
+from multiprocessing.connection import Client, Connection, Listener
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from batching import BATCH_MAX_SIZE  # noqa: E402
+from image_io import DECODE_TARGET_SIZE  # noqa: E402
+from onnx_backend import BoxArrays  # noqa: E402
+
+DEFAULT_ADDRESS = (
+    r"\\.\pipe\spacecraft-inference" if sys.platform == "win32"
+    else os.path.join(tempfile.gettempdir(), "spacecraft-inference.sock")
+)
+
+# Pool settings (overridable via environment)
+INFERENCE_POOL_ADDRESS = os.getenv("INFERENCE_POOL_ADDRESS", DEFAULT_ADDRESS)
+INFERENCE_POOL_AUTHKEY = os.getenv("INFERENCE_POOL_AUTHKEY", "spacecraft-inference").encode("utf-8")
+INFERENCE_POOL_SLOTS = int(os.getenv("INFERENCE_POOL_SLOTS", "2"))  # concurrent batches per HTTP process
+INFERENCE_POOL_TIMEOUT_S = float(os.getenv("INFERENCE_POOL_TIMEOUT_S", "60"))
+
+# Initial slot buffer: one full batch at the decode size (grows for larger batches)
+SLOT_BYTES = BATCH_MAX_SIZE * (DECODE_TARGET_SIZE or 640) ** 2 * 3
+# Shared memory segments an inference process keeps mapped
+MAX_ATTACHED = 64
+
+ImageSize = Tuple[int, int]
+
+
+def pack_boxes(xyxy, conf, cls) -> bytes:
+    """(xyxy, conf, cls) -> little-endian float32 rows of x1, y1, x2, y2, conf, cls"""
+    rows = np.column_stack([
+        np.asarray(xyxy, dtype=np.float32).reshape(-1, 4),
+        np.asarray(conf, dtype=np.float32).reshape(-1),
+        np.asarray(cls, dtype=np.float32).reshape(-1),
+    ])
+    return rows.astype("<f4").tobytes()
+
+
+def unpack_boxes(data: bytes) -> BoxArrays:
+    rows = np.frombuffer(data, dtype="<f4").reshape(-1, 6)
+    return rows[:, :4], rows[:, 4], rows[:, 5].astype(np.int64)
+
+
+def attach(name: str) -> SharedMemory:
+    """Map a segment created by an HTTP process without taking ownership of it"""
+    segment = SharedMemory(name=name)
+    # Before Python 3.13 attaching registers the segment with this process's resource tracker,
+    # which would unlink it (and warn) when the pool exits; the HTTP process owns it
+    try:
+        resource_tracker.unregister(segment._name, "shared_memory")
+    except Exception:
+        pass
+    return segment
+
+
+def images_from_buffer(buffer: memoryview, sizes: Sequence[ImageSize]) -> List[Image.Image]:
+    """RGB images laid out back to back in a shared buffer, without copying the pixels"""
+    images, offset = [], 0
+    for width, height in sizes:
+        pixels = np.frombuffer(buffer, dtype=np.uint8, count=width * height * 3, offset=offset)
+        # Safe to share: the client does not touch the buffer again until it has the reply
+        images.append(Image.fromarray(pixels.reshape(height, width, 3), "RGB"))
+        offset += pixels.nbytes
+    return images
+
+
+def worker_main(index: int, model_paths: List[str], backend: str, threads: int, tasks, results):
+    """Inference process: load every served model once, then run batches from the task queue"""
+    # Must be set before torch / onnxruntime are imported, or every process grabs every core
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "ONNX_INTRA_OP_THREADS"):
+        os.environ[name] = str(threads)
+    from backends import load_detector
+
+    detectors, infos = {}, {}
+    try:
+        for path in model_paths:
+            # Keyed by absolute path: HTTP processes may spell the same file differently
+            key = os.path.abspath(path)
+            detectors[key], infos[key] = load_detector(path, backend)
+    except Exception as e:
+        results.put((None, ("failed", index, f"{type(e).__name__}: {e}")))
+        sys.exit(1)
+    results.put((None, ("ready", index, infos)))
+
+    attached: "OrderedDict[str, SharedMemory]" = OrderedDict()
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        conn_id, (model_path, segment_name, sizes) = task
+        try:
+            segment = attached.get(segment_name)
+            if segment is None:
+                segment = attached[segment_name] = attach(segment_name)
+                if len(attached) > MAX_ATTACHED:
+                    attached.popitem(last=False)[1].close()
+            attached.move_to_end(segment_name)
+            detector = detectors.get(os.path.abspath(model_path))
+            if detector is None:
+                raise KeyError(f"Model {model_path} is not served by this pool")
+            images = images_from_buffer(segment.buf, sizes)
+            started = time.perf_counter()
+            outputs = detector(images)
+            inference_s = time.perf_counter() - started
+            # Drop the views into the buffer so the segment can be closed on eviction
+            del images
+            payload = ("ok", [pack_boxes(*output) for output in outputs], inference_s)
+        except Exception as e:
+            payload = ("error", f"{type(e).__name__}: {e}")
+        results.put((conn_id, payload))
+    for segment in attached.values():
+        segment.close()
+
+
+class InferencePoolServer:
+    """Owns the inference processes and relays batches between them and the HTTP processes"""
+
+    def __init__(self, model_paths: List[str], backend: str, workers: int, threads_per_worker: int, address: str = INFERENCE_POOL_ADDRESS):
+        self.model_paths = model_paths
+        self.backend = backend
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker
+        self.address = address
+        self.context = get_context("spawn")
+        self.tasks = self.context.Queue()
+        self.results = self.context.Queue()
+        self.processes: Dict[int, Any] = {}
+        self.infos: Dict[str, Dict[str, Any]] = {}
+        self.connections: Dict[int, Connection] = {}
+        self._conn_ids = itertools.count()
+        self._ready = threading.Event()
+        self._ready_workers = set()
+        self._load_error: Optional[str] = None
+        self._stopping = False
+
+    def _spawn(self, index: int):
+        process = self.context.Process(
+            target=worker_main,
+            args=(index, self.model_paths, self.backend, self.threads_per_worker, self.tasks, self.results),
+            name=f"inference-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+
+    def _dispatch(self):
+        """Route results from the inference processes back to their connections"""
+        while True:
+            conn_id, payload = self.results.get()
+            if conn_id is None:
+                if payload[0] == "ready":
+                    _, index, infos = payload
+                    self.infos.update(infos)
+                    self._ready_workers.add(index)
+                    print(f"✅ Inference process {index} ready")
+                    if len(self._ready_workers) == self.workers:
+                        self._ready.set()
+                elif payload[0] == "failed":
+                    _, index, error = payload
+                    self._load_error = error
+                    print(f"❌ Inference process {index} could not load its models: {error}")
+                continue
+            conn = self.connections.get(conn_id)
+            if conn is None:
+                continue
+            try:
+                conn.send(payload)
+            except OSError:
+                self.connections.pop(conn_id, None)
+
+    def _monitor(self):
+        """Restart inference processes that died; the batch one was running is lost (its client times out)"""
+        while not self._stopping:
+            for index, process in list(self.processes.items()):
+                if not process.is_alive() and not self._stopping:
+                    print(f"⚠️ Inference process {index} exited with {process.exitcode}, restarting")
+                    self._ready_workers.discard(index)
+                    self._spawn(index)
+            time.sleep(1.0)
+
+    def _serve_connection(self, conn_id: int, conn: Connection):
+        """One slot of an HTTP process: at most one request outstanding at a time"""
+        try:
+            while True:
+                message = conn.recv()
+                op = message[0]
+                if op == "detect":
+                    self.tasks.put((conn_id, message[1:]))
+                elif op == "info":
+                    info = self.infos.get(os.path.abspath(message[1]))
+                    if info is None:
+                        conn.send(("error", f"Model {message[1]} is not served by this pool (serving {self.model_paths})"))
+                    else:
+                        conn.send(("ok", {**info, "pool": self.describe()}))
+                else:
+                    conn.send(("error", f"Unknown operation {op!r}"))
+        except (EOFError, OSError):
+            pass
+        finally:
+            self.connections.pop(conn_id, None)
+            conn.close()
+
+    def describe(self) -> Dict[str, Any]:
+        """Pool layout, reported to HTTP processes with the model info"""
+        return {
+            "address": self.address,
+            "backend": self.backend,
+            "workers": self.workers,
+            "threads_per_worker": self.threads_per_worker,
+        }
+
+    def _bind(self) -> Listener:
+        if sys.platform != "win32" and os.path.exists(self.address):
+            try:
+                Client(self.address, authkey=INFERENCE_POOL_AUTHKEY).close()
+            except (OSError, EOFError):
+                os.remove(self.address)  # stale socket from a pool that did not shut down cleanly
+            else:
+                raise SystemExit(f"❌ An inference pool is already listening on {self.address}")
+        return Listener(self.address, authkey=INFERENCE_POOL_AUTHKEY)
+
+    def _wait_ready(self):
+        """Block until every process has loaded its models; exit if one fails or dies first"""
+        while not self._ready.wait(0.5):
+            dead = {index: process.exitcode for index, process in self.processes.items() if not process.is_alive()}
+            if self._load_error is None and not dead:
+                continue
+            self._stop_workers()
+            reason = self._load_error or ", ".join(f"process {index} exited with {code}" for index, code in dead.items())
+            raise SystemExit(f"❌ Inference pool failed to start: {reason}")
+
+    def _stop_workers(self):
+        self._stopping = True
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def serve_forever(self):
+        for index in range(self.workers):
+            self._spawn(index)
+        threading.Thread(target=self._dispatch, name="pool-dispatch", daemon=True).start()
+        print(f"⏳ Loading {self.model_paths} in {self.workers} inference processes...")
+        self._wait_ready()
+        threading.Thread(target=self._monitor, name="pool-monitor", daemon=True).start()
+        listener = self._bind()
+        # Shut down cleanly on SIGTERM too (process managers, docker stop)
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        print(f"🚀 Inference pool ready on {self.address}")
+        try:
+            while True:
+                try:
+                    conn = listener.accept()
+                except (OSError, EOFError) as e:
+                    # Bad authkey or a client that went away during the handshake
+                    print(f"⚠️ Rejected pool connection: {e}")
+                    continue
+                conn_id = next(self._conn_ids)
+                self.connections[conn_id] = conn
+                threading.Thread(target=self._serve_connection, args=(conn_id, conn), name=f"pool-conn-{conn_id}", daemon=True).start()
+        except KeyboardInterrupt:
+            print("🛑 Shutting down inference pool")
+        finally:
+            listener.close()
+            self._stop_workers()
+
+
+class PoolSlot:
+    """One connection to the pool plus the shared buffer its batches travel in"""
+
+    def __init__(self, address: str, size: int):
+        self.conn = Client(address, authkey=INFERENCE_POOL_AUTHKEY)
+        self.segment = SharedMemory(create=True, size=size)
+
+    def request(self, message: tuple, timeout: float) -> Any:
+        self.conn.send(message)
+        if not self.conn.poll(timeout):
+            raise TimeoutError(f"Inference pool did not answer within {timeout:.0f} s")
+        status, *payload = self.conn.recv()
+        if status != "ok":
+            raise RuntimeError(payload[0])
+        return payload
+
+    def detect(self, model_path: str, images: List[Image.Image], timeout: float) -> Tuple[List[BoxArrays], float]:
+        arrays = [np.asarray(image if image.mode == "RGB" else image.convert("RGB")) for image in images]
+        needed = sum(array.nbytes for array in arrays)
+        if needed > self.segment.size:
+            # Bigger batch than ever before: replace the buffer (the pool maps segments by name)
+            self.segment.close()
+            self.segment.unlink()
+            self.segment = SharedMemory(create=True, size=needed)
+        offset = 0
+        for array in arrays:
+            self.segment.buf[offset:offset + array.nbytes] = array.reshape(-1)
+            offset += array.nbytes
+        sizes = [(array.shape[1], array.shape[0]) for array in arrays]
+        packed, inference_s = self.request(("detect", model_path, self.segment.name, sizes), timeout)
+        return [unpack_boxes(data) for data in packed], inference_s
+
+    def close(self):
+        self.conn.close()
+        self.segment.close()
+        try:
+            self.segment.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class PoolDetector:
+    """Detector backed by the shared inference pool (same interface as the in-process backends)"""
+
+    def __init__(
+        self,
+        model_path: str,
+        address: str = INFERENCE_POOL_ADDRESS,
+        slots: int = INFERENCE_POOL_SLOTS,
+        slot_bytes: int = SLOT_BYTES,
+        timeout: float = INFERENCE_POOL_TIMEOUT_S,
+    ):
+        self.model_path = model_path
+        self.address = address
+        self.slot_bytes = slot_bytes
+        self.timeout = timeout
+        self._slots: "queue.Queue[Optional[PoolSlot]]" = queue.Queue()
+        first = PoolSlot(address, slot_bytes)
+        try:
+            (self.info,) = first.request(("info", model_path), timeout)
+        except Exception:
+            first.close()
+            raise
+        self._slots.put(first)
+        # The rest connect on first use
+        for _ in range(max(1, slots) - 1):
+            self._slots.put(None)
+        self.names = dict(enumerate(self.info["labels"]))
+        self.imgsz = self.info["input_shape"][-1]
+        # Unlink the shared buffers even if the registry never releases this detector
+        atexit.register(self.close)
+
+    def __call__(self, images: List[Image.Image]) -> List[BoxArrays]:
+        slot = self._slots.get()
+        try:
+            if slot is None:
+                slot = PoolSlot(self.address, self.slot_bytes)
+            outputs, _ = slot.detect(self.model_path, images, self.timeout)
+            return outputs
+        except (OSError, EOFError, TimeoutError):
+            # The connection may still get a late reply: never reuse it
+            if slot is not None:
+                slot.close()
+            slot = None
+            raise
+        finally:
+            self._slots.put(slot)
+
+    def close(self):
+        while not self._slots.empty():
+            slot = self._slots.get_nowait()
+            if slot is not None:
+                slot.close()
+
+
+def main():
+    from registry import MODELS, parse_model_specs
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1, help="Inference processes (each holds one copy of every model)")
+    parser.add_argument("--threads-per-worker", type=int, help="Inference threads per process (default: cores / workers)")
+    parser.add_argument("--model", action="append", help="Weights file to serve (repeatable, default: the paths in MODELS)")
+    parser.add_argument("--backend", default=os.getenv("INFERENCE_BACKEND", "ultralytics").lower())
+    parser.add_argument("--address", default=INFERENCE_POOL_ADDRESS)
+    args = parser.parse_args()
+
+    if args.backend == "pool":
+        raise SystemExit("❌ The pool needs an in-process backend (ultralytics, onnx, onnx-int8 or mock)")
+    model_paths = args.model or [path for _, _, path in parse_model_specs(MODELS)]
+    threads = args.threads_per_worker or max(1, (os.cpu_count() or 1) // args.workers)
+    InferencePoolServer(list(dict.fromkeys(model_paths)), args.backend, args.workers, threads, args.address).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
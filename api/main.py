@@ -0,0 +1,672 @@
+"""
+Spacecraft detection API server
+
+One server for every deployment: the inference backend (ultralytics, onnx,
+onnx-int8, pool or mock) is picked by INFERENCE_BACKEND, see api/backends.py.
+Run with: python api/main.py (HTTP_WORKERS=N for several HTTP processes;
+with INFERENCE_BACKEND=pool they share the model in api/inference_pool.py,
+with python api/preload.py they share it copy-on-write)
+"""
+
+import time
+IMPORT_STARTED = time.perf_counter()  # startup timings are measured from here
+
+from fastapi import BackgroundTasks, FastAPI, Header, HTTPException, Request, Response, WebSocket
+from fastapi.responses import JSONResponse
+from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel, PrivateAttr, TypeAdapter
+import asyncio
+import base64
+from PIL import Image
+import os
+from functools import partial
+from typing import List, Dict, Any, Optional
+
+from batching import MicroBatcher
+from executors import StageExecutors, record_stage
+from formats import JSON, encode_response, negotiate
+from image_io import DECODE_TARGET_SIZE, decode_base64, decode_for_inference, decode_image_bytes, downscale_for_inference, read_upload
+from output_image import DEFAULT_OUTPUT, OutputOptions, decode_for_output, encode_image, fit_output, output_boxes, output_options
+from results import ResultStore
+from cache import CACHE_ENABLED, DetectionCache
+from postprocess import build_detections, detections_to_arrays, scale_detections
+from writer import ResultWriter
+from metrics import CONTENT_TYPE, DetectionMetrics, MetricsMiddleware
+from realtime import run_detection_session
+from backends import INFERENCE_BACKEND, load_detector
+from batch import BATCH_CONCURRENCY, detect_batch, is_archive, is_multipart, iter_archive_images, iter_form_images
+from registry import MODELS, ModelRegistry, ModelVersion, parse_model_specs
+from startup import ModelLifecycle, run_warmup
+from tiling import TILE_GLOBAL_PASS, TILE_MAX_TILES, TILE_MERGE_BOXES, TILE_MERGE_METRIC, TILE_MERGE_THRESHOLD, TILE_OVERLAP, TILE_SIZE, merge_tile_outputs, prepare_tiles
+from video import FrameStride, NDJSONStreamingResponse, detect_mjpeg_stream, detect_video_file, is_mjpeg, remove_file, spool_to_tempfile
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+
+# Bind address (overridable via environment)
+SERVER_HOST = os.getenv("HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("PORT", "8000"))
+HTTP_WORKERS = int(os.getenv("HTTP_WORKERS", "1"))  # each process loads its own model unless INFERENCE_BACKEND=pool
+
+app = FastAPI(title="Spacecraft Detection API", version="1.0.0")
+
+# Prometheus metrics (stage histograms, request counts, queue depths) served at /metrics
+metrics = DetectionMetrics()
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Request model
+class DetectionRequest(BaseModel):
+    image: str  # base64 encoded image
+    filename: str
+    file_size: int
+    return_image: bool = True  # set to False to get detections only (see GET /results/{result_id})
+    model: Optional[str] = None  # "name" or "name:version" (default: DEFAULT_MODEL)
+    tile: bool = False  # tiled full-resolution inference for small objects in large images (see api/tiling.py)
+    # Annotated image encoding, server defaults when unset (see api/output_image.py)
+    image_format: Optional[str] = None  # jpeg, webp or png
+    image_quality: Optional[int] = None
+    image_max_size: Optional[int] = None  # longest side, 0 = original resolution
+
+class ModelLoadRequest(BaseModel):
+    name: str
+    path: str
+    version: Optional[str] = None  # defaults to a fingerprint of the weights file
+    activate: bool = True  # hot-swap: route new requests for name to this version once warmed up
+
+# Response models
+class BoundingBox(BaseModel):
+    x: float
+    y: float
+    width: float
+    height: float
+
+class Detection(BaseModel):
+    class_id: int
+    confidence: float
+    bbox: BoundingBox
+
+class DetectionResponse(BaseModel):
+    detections: List[Detection]
+    processed_image: Optional[str] = None  # base64 encoded processed image (when requested)
+    image_type: Optional[str] = None  # media type of the processed image
+    result_id: Optional[str] = None  # fetch the annotated image later via GET /results/{result_id} (None: too large to keep)
+    stats: Dict[str, Any] = {}  # batching / timing information for this request
+    _image: Optional[bytes] = PrivateAttr(default=None)  # raw annotated image, sent as is by the binary formats
+
+# Validates a whole list of detections in one call
+detections_adapter = TypeAdapter(List[Detection])
+
+def draw_detections_on_image(image: Image.Image, detections: List[Detection], renderer, scale=(1.0, 1.0)) -> Image.Image:
+    """Draw bounding boxes and labels onto the image (in place); scale is original / image pixels"""
+    return renderer.draw_boxes(image, output_boxes(detections, scale), in_place=True)
+
+def run_inference_batch(version: ModelVersion, images: List[Image.Image]) -> List[List[Detection]]:
+    """Run one batched YOLO forward pass and split the results per image"""
+    metrics.batch_size.observe(len(images))
+    results = version.model(images)
+    
+    started = time.perf_counter()
+    detections = [build_detections(xyxy, conf, cls, detections_adapter) for xyxy, conf, cls in results]
+    metrics.observe_stage("box_conversion", (time.perf_counter() - started) * 1000.0)
+    return detections
+
+def create_batcher(version: ModelVersion) -> MicroBatcher:
+    """Batching scheduler in front of one model version"""
+    return MicroBatcher(partial(run_inference_batch, version), executor=stage_executors.inference)
+
+def load_models():
+    """Load every configured model version; they are warmed up together afterwards"""
+    for name, version, path in parse_model_specs(MODELS):
+        loaded = registry.load(name, path, version, warm=False)
+        if "framework_import_s" in loaded.info and "framework_import_s" not in lifecycle.timings:
+            lifecycle.mark("framework_import_s", loaded.info["framework_import_s"])
+
+def warmup_models(images: List[Image.Image]):
+    """Dummy inference so the first real request does not pay for kernel selection"""
+    for version in registry.versions():
+        version.model(images)
+
+def warm_version(version: ModelVersion):
+    """Warm up a hot-loaded version before it takes traffic"""
+    run_warmup(version.model, lifecycle.sizes, lifecycle.runs)
+
+def on_model_ready(timings: Dict[str, float]):
+    metrics.model_load_seconds.set(timings.get("model_load_s", 0.0))
+    metrics.startup_seconds.set(timings.get("ready_after_s", 0.0))
+
+# Model loading and warm-up run in the background; readiness is tracked here
+lifecycle = ModelLifecycle(load_models, warmup_models, IMPORT_STARTED, on_ready=on_model_ready)
+lifecycle.mark("imports_s", IMPORT_SECONDS)
+metrics.gauge("detection_ready", "1 once the model is loaded and warmed up", lambda: int(lifecycle.ready))
+
+# Thread pools for image work and inference
+stage_executors = StageExecutors(metrics=metrics)
+
+# Loaded model versions (each with its own batcher), hot-swappable via /models
+registry = ModelRegistry(load_detector, create_batcher, warm_version)
+
+# Persists processed images off the request path
+result_writer = ResultWriter(metrics=metrics)
+
+# Recent results for lazy annotated-image retrieval
+result_store = ResultStore()
+
+# Content-addressed cache so resubmitted images skip inference
+detection_cache = DetectionCache(rendered_suffix=DEFAULT_OUTPUT.suffix) if CACHE_ENABLED else None
+
+metrics.gauge("detection_batch_queue_depth", "Images waiting for an inference batch", lambda: registry.queue_depth())
+metrics.gauge("detection_save_queue_depth", "Processed images waiting to be written to disk", lambda: result_writer.queue_depth)
+
+def tile_size_for(version: ModelVersion) -> int:
+    return TILE_SIZE or version.info["input_shape"][-1]
+
+def cache_lookup(image_data: bytes, version: ModelVersion, tile: bool = False):
+    """Hash the image bytes and look them up in the detection cache"""
+    params = {"input_shape": version.info["input_shape"], "decode_size": DECODE_TARGET_SIZE}
+    if detection_cache.cache_rendered:
+        # Cached renderings are only valid for the output options they were made with
+        params["output"] = [DEFAULT_OUTPUT.format, DEFAULT_OUTPUT.quality, DEFAULT_OUTPUT.max_size]
+    if tile:
+        params["tiling"] = [tile_size_for(version), TILE_OVERLAP, TILE_MAX_TILES, TILE_GLOBAL_PASS, TILE_MERGE_METRIC, TILE_MERGE_THRESHOLD, TILE_MERGE_BOXES]
+    key = DetectionCache.make_key(image_data, version.info["model_version"], params)
+    return key, detection_cache.get(key)
+
+@app.on_event("startup")
+async def startup_event():
+    """Start loading the model in the background; liveness answers immediately"""
+    lifecycle.start()
+    result_writer.start()
+
+def require_ready():
+    """Reject detection requests until the model is loaded and warmed up"""
+    if not lifecycle.ready:
+        raise HTTPException(status_code=503, detail=f"Model not ready ({lifecycle.phase})", headers={"Retry-After": "5"})
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drain the worker pools and pending writes on shutdown"""
+    stage_executors.shutdown()
+    result_writer.stop()
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    return {
+        "status": "healthy" if lifecycle.ready else lifecycle.phase,
+        "model_loaded": registry.default is not None,
+        "ready": lifecycle.ready,
+        "pools": stage_executors.info()
+    }
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving HTTP"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: model loaded and warmed up (503 until then)"""
+    return JSONResponse(status_code=200 if lifecycle.ready else 503, content=lifecycle.status())
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics"""
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/info")
+async def get_model_info():
+    """Default model information, plus every loaded model version with its memory footprint"""
+    default = registry.default
+    if default is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    return {**default.describe(active=True), "models": registry.describe()}
+
+@app.get("/models")
+async def list_models():
+    """Loaded model versions (active, pinned-only and draining)"""
+    return {"default": registry.default_model, "models": registry.describe()}
+
+@app.post("/models")
+async def load_model_version(request: ModelLoadRequest):
+    """Load and warm up a model version next to the running ones; activate=true then hot-swaps it in"""
+    if not os.path.exists(request.path):
+        raise HTTPException(status_code=404, detail=f"Model file not found at {request.path}")
+    loop = asyncio.get_running_loop()
+    try:
+        version = await loop.run_in_executor(
+            None, registry.load, request.name, request.path, request.version, request.activate
+        )
+    except Exception as e:
+        print(f"❌ Error loading model {request.name}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return version.describe(active=request.activate)
+
+@app.post("/models/{name}/{version}/activate")
+async def activate_model_version(name: str, version: str):
+    """Route new requests for name to an already loaded version (e.g. roll back)"""
+    try:
+        registry.activate(name, version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return {"name": name, "version": version, "active": True}
+
+@app.delete("/models/{name}/{version}")
+async def unload_model_version(name: str, version: str):
+    """Unload a version; its weights are freed once its in-flight requests finish"""
+    try:
+        registry.unload(name, version)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    return {"name": name, "version": version, "unloaded": True}
+
+def acquire_model(spec: Optional[str]) -> ModelVersion:
+    """Pin the requested model version for one request (404 if it is not loaded)"""
+    try:
+        return registry.acquire(spec)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+def hold_model(version: ModelVersion) -> BackgroundTasks:
+    """Response teardown that keeps a model version pinned until a streamed response is finished"""
+    teardown = BackgroundTasks()
+    teardown.add_task(registry.release, version)
+    return teardown
+
+async def infer_image(image: Image.Image, stats: Dict[str, Any], version: ModelVersion) -> List[Detection]:
+    """Run one image through the version's batching scheduler"""
+    detections, batch_stats = await version.batcher.submit(image)
+    stats["batch_size"] = batch_stats.batch_size
+    stats["batch_queue_wait_ms"] = round(batch_stats.queue_wait_ms, 2)
+    stats["inference_ms"] = round(batch_stats.inference_ms, 2)
+    record_stage(stats, "inference", batch_stats.queue_wait_ms, batch_stats.inference_ms)
+    metrics.observe_stage("inference", batch_stats.inference_ms, batch_stats.queue_wait_ms)
+    print(f"📦 Batch of {batch_stats.batch_size}, waited {batch_stats.queue_wait_ms:.1f} ms")
+    return detections
+
+def merge_tile_detections(tile_detections: List[List[Detection]], offsets) -> List[Detection]:
+    """Merge per-tile detections into detections in original image pixels"""
+    xyxy, conf, cls = merge_tile_outputs([detections_to_arrays(detections) for detections in tile_detections], offsets)
+    return build_detections(xyxy, conf, cls, detections_adapter)
+
+async def infer_tiled(image: Image.Image, stats: Dict[str, Any], version: ModelVersion) -> List[Detection]:
+    """Tiled inference on the full-resolution image; the tiles share micro-batches on the version's batcher"""
+    crops, offsets = await stage_executors.run("tile", prepare_tiles, image, tile_size_for(version), stats=stats)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(version.batcher.submit(crop) for crop in crops))
+    wall_ms = (time.perf_counter() - started) * 1000.0
+    # Tiles may span several batches: report the wait for the first one and the wall time of all of them
+    queue_wait_ms = min(batch_stats.queue_wait_ms for _, batch_stats in results)
+    stats["tiles"] = len(crops)
+    stats["batch_size"] = max(batch_stats.batch_size for _, batch_stats in results)
+    stats["batch_queue_wait_ms"] = round(queue_wait_ms, 2)
+    stats["inference_ms"] = round(wall_ms - queue_wait_ms, 2)
+    record_stage(stats, "inference", queue_wait_ms, wall_ms - queue_wait_ms)
+    metrics.observe_stage("inference", wall_ms - queue_wait_ms, queue_wait_ms)
+    print(f"🧩 {len(crops)} tiles in {wall_ms:.1f} ms")
+    return await stage_executors.run("tile_merge", merge_tile_detections, [detections for detections, _ in results], offsets, stats=stats)
+
+async def render_result(
+    image: Image.Image,
+    scale,
+    detections: List[Detection],
+    renderer,
+    stats: Dict[str, Any],
+    output: OutputOptions = DEFAULT_OUTPUT,
+) -> bytes:
+    """Draw and encode the annotated image and queue it for saving; returns the encoded bytes
+
+    scale maps image pixels back to the original (detections are in original pixels).
+    """
+    # Shrink first so drawing and encoding only touch the output pixels
+    if output.max_size and max(image.size) > output.max_size:
+        image, scale = await stage_executors.run("resize", fit_output, image, scale, output, stats=stats)
+    
+    # The decoded image is not reused afterwards, so draw on it directly
+    processed_image = await stage_executors.run("render", draw_detections_on_image, image, detections, renderer, scale, stats=stats)
+    
+    # Encode the processed image
+    image_bytes = await stage_executors.run("encode", encode_image, processed_image, output, stats=stats)
+    
+    # Hand the encoded bytes to the background writer (sampled, bounded queue)
+    output_path = result_writer.submit(image_bytes, output.suffix)
+    if output_path:
+        print(f"💾 Queued processed image for: {output_path}")
+    
+    return image_bytes
+
+async def run_detection(
+    image_data: bytes,
+    filename: str,
+    stats: Dict[str, Any],
+    return_image: bool = True,
+    model: Optional[str] = None,
+    tile: bool = False,
+    inline_image: bool = True,
+    output: OutputOptions = DEFAULT_OUTPUT,
+) -> DetectionResponse:
+    """Run detection on the requested model version, pinned until the response is built"""
+    version = acquire_model(model)
+    stats["model"] = version.key
+    try:
+        return await detect_with_version(version, image_data, filename, stats, return_image, tile, inline_image, output)
+    finally:
+        registry.release(version)
+
+async def detect_with_version(
+    version: ModelVersion,
+    image_data: bytes,
+    filename: str,
+    stats: Dict[str, Any],
+    return_image: bool = True,
+    tile: bool = False,
+    inline_image: bool = True,
+    output: OutputOptions = DEFAULT_OUTPUT,
+) -> DetectionResponse:
+    """Run inference on one encoded image and render the annotated output if requested
+
+    inline_image=False leaves processed_image empty and only keeps the raw image (response._image).
+    Rendered images are cached only for the default output options.
+    """
+    print(f"📸 Processing image: {filename} ({len(image_data)} bytes)")
+    
+    # Skip inference (and decoding, when possible) for images we have already seen
+    cache_key, cached = None, None
+    if detection_cache is not None:
+        cache_key, cached = await stage_executors.run("cache_lookup", cache_lookup, image_data, version, tile, stats=stats)
+    
+    default_output = output == DEFAULT_OUTPUT
+    reuse_rendered = return_image and default_output and cached is not None and cached.rendered is not None
+    
+    # Full resolution is only decoded for tiling; rendering decodes at the output size
+    image, image_scale = None, (1.0, 1.0)
+    if tile and cached is None:
+        image = await stage_executors.run("decode", decode_image_bytes, image_data, stats=stats)
+        print(f"📐 Image size: {image.size}")
+    elif return_image and not reuse_rendered:
+        image, image_scale = await stage_executors.run("decode", decode_for_output, image_data, output, stats=stats)
+        print(f"📐 Output size: {image.size}")
+    # An output-size image only serves inference if it is at least as large as the model input
+    covers_inference = not output.max_size or (DECODE_TARGET_SIZE and output.max_size >= DECODE_TARGET_SIZE)
+    
+    if cached is not None:
+        print("♻️ Cache hit, skipping inference")
+        stats["cache"] = "hit"
+        detections = detections_adapter.validate_python(cached.detections)
+    else:
+        stats["cache"] = "miss" if detection_cache is not None else "disabled"
+        
+        if tile:
+            # Small objects: the model sees full-resolution tiles instead of one downscaled frame
+            detections = await infer_tiled(image, stats, version)
+        else:
+            # The model only needs ~640px: reduced-size JPEG decode, or downscale the decoded image
+            if image is not None and covers_inference:
+                inference_image, scale = await stage_executors.run("downscale", downscale_for_inference, image, stats=stats)
+                scale = (scale[0] * image_scale[0], scale[1] * image_scale[1])
+            else:
+                stage = "decode" if image is None else "decode_inference"
+                inference_image, scale = await stage_executors.run(stage, decode_for_inference, image_data, stats=stats)
+            print(f"📐 Inference size: {inference_image.size}")
+            detections = scale_detections(await infer_image(inference_image, stats, version), scale)
+        
+        if cache_key is not None:
+            cached_detections = [detection.model_dump() for detection in detections]
+            await stage_executors.run("cache_store", detection_cache.put, cache_key, cached_detections, stats=stats)
+    
+    print(f"✅ Found {len(detections)} detections")
+    
+    # Keep the source so the annotated image can be rendered on demand
+    result_id = result_store.put(image_data, detections, renderer=version.renderer)
+    if result_id is None:
+        print(f"⚠️ {filename} is larger than RESULT_STORE_MAX_BYTES, no result_id for later retrieval")
+    
+    image_bytes = None
+    processed_image_base64 = None
+    if return_image:
+        if reuse_rendered:
+            image_bytes = cached.rendered
+        else:
+            image_bytes = await render_result(image, image_scale, detections, version.renderer, stats, output)
+            if cache_key is not None and default_output:
+                await stage_executors.run("cache_store", detection_cache.set_rendered, cache_key, image_bytes)
+        if default_output:
+            result_store.set_rendered(result_id, image_bytes)
+        if inline_image:
+            processed_image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+    
+    response = DetectionResponse(
+        detections=detections,
+        processed_image=processed_image_base64,
+        image_type=output.media_type if return_image else None,
+        result_id=result_id,
+        stats=stats
+    )
+    response._image = image_bytes
+    
+    return response
+
+def encode_detection_response(response: DetectionResponse, media_type: str) -> Response:
+    """Serialize a detection response in the negotiated format (see api/formats.py)"""
+    started = time.perf_counter()
+    http_response = encode_response(response, media_type, response._image)
+    metrics.observe_stage("serialize", (time.perf_counter() - started) * 1000.0)
+    return http_response
+
+@app.post("/detect")
+async def detect_objects(request: DetectionRequest, accept: Optional[str] = Header(None)):
+    """Detect spacecraft components in the image
+    
+    Accept: application/json (default), application/msgpack or application/x-detections (packed binary).
+    The annotated image is a downscaled preview unless image_max_size says otherwise.
+    """
+    require_ready()
+    media_type = negotiate(accept)
+    output = output_options(request.image_format, request.image_quality, request.image_max_size)
+    try:
+        stats = {}
+
+        # Decode base64 payload off the event loop
+        image_data = await stage_executors.run("base64_decode", decode_base64, request.image, stats=stats)
+        
+        response = await run_detection(
+            image_data, request.filename, stats, request.return_image, request.model, request.tile, media_type == JSON, output
+        )
+        return encode_detection_response(response, media_type)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error during detection: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/detect/upload")
+async def detect_objects_upload(
+    request: Request,
+    filename: Optional[str] = None,
+    return_image: bool = False,
+    model: Optional[str] = None,
+    tile: bool = False,
+    image_format: Optional[str] = None,
+    image_quality: Optional[int] = None,
+    image_max_size: Optional[int] = None,
+    accept: Optional[str] = Header(None),
+):
+    """Detect spacecraft components in a raw image upload (multipart/form-data or application/octet-stream)
+    
+    Responds in the format negotiated from Accept, like /detect; the binary formats carry the image raw.
+    """
+    require_ready()
+    media_type = negotiate(accept)
+    output = output_options(image_format, image_quality, image_max_size)
+    try:
+        stats = {}
+
+        # Take the uploaded bytes without a base64 round trip
+        image_data, filename = await read_upload(request, stage_executors, stats, filename)
+        
+        response = await run_detection(image_data, filename, stats, return_image, model, tile, media_type == JSON, output)
+        return encode_detection_response(response, media_type)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"❌ Error during detection: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/detect/video")
+async def detect_video(request: Request, stride: int = 1, max_frames: Optional[int] = None, model: Optional[str] = None):
+    """Stream per-frame detections as NDJSON for a video file or an MJPEG frame stream
+
+    stride=N runs every Nth frame, stride=0 adapts the stride to inference time vs. frame rate.
+    """
+    require_ready()
+    content_type = request.headers.get("content-type", "")
+    frame_stride = FrameStride(stride)
+    # The whole stream runs on one model version, even if a new one is swapped in meanwhile
+    version = acquire_model(model)
+    teardown = hold_model(version)
+    
+    async def detect(image: Image.Image) -> List[Detection]:
+        return await infer_image(image, {}, version)
+    
+    try:
+        if is_mjpeg(content_type):
+            print("🎞️ Streaming MJPEG detection...")
+            frames = detect_mjpeg_stream(request.stream(), detect, stage_executors, frame_stride, max_frames)
+        else:
+            # Containers like mp4 need random access, so spool the body to disk (never to memory)
+            video_path = await spool_to_tempfile(request.stream())
+            teardown.add_task(remove_file, video_path)
+            print(f"🎞️ Running video detection on {os.path.getsize(video_path)} bytes...")
+            frames = detect_video_file(video_path, detect, stage_executors, frame_stride, max_frames)
+    except BaseException:
+        await teardown()
+        raise
+    
+    return NDJSONStreamingResponse(frames, background=teardown)
+
+@app.post("/detect/batch")
+async def detect_image_batch(
+    request: Request,
+    return_image: bool = False,
+    model: Optional[str] = None,
+    concurrency: int = BATCH_CONCURRENCY,
+    tile: bool = False,
+    image_format: Optional[str] = None,
+    image_quality: Optional[int] = None,
+    image_max_size: Optional[int] = None,
+):
+    """Detect on many images (multipart files or a zip/tar archive), streaming one NDJSON line per image
+    
+    Each line is a DetectionResponse plus the image's index and filename, in completion order;
+    the last line is a summary. return_image=false (default) skips rendering, fetch images later
+    via GET /results/{result_id}. A multipart upload is received in full before the first image
+    is processed; an archive is spooled to disk the same way, then read member by member.
+    """
+    require_ready()
+    content_type = request.headers.get("content-type", "")
+    if not (is_multipart(content_type) or is_archive(content_type)):
+        raise HTTPException(status_code=415, detail="Send multipart/form-data image files or a zip/tar archive")
+    output = output_options(image_format, image_quality, image_max_size)
+    # The whole batch runs on one model version, even if a new one is swapped in meanwhile
+    version = acquire_model(model)
+    teardown = hold_model(version)
+    
+    async def detect(filename: str, image_data: bytes) -> Dict[str, Any]:
+        stats = {"model": version.key}
+        response = await detect_with_version(version, image_data, filename, stats, return_image, tile, output=output)
+        return response.model_dump()
+    
+    try:
+        if is_multipart(content_type):
+            images = iter_form_images(request, stage_executors)
+        else:
+            # Archives are read member by member from disk, never held in memory as a whole
+            archive_path = await spool_to_tempfile(request.stream(), suffix=".archive")
+            teardown.add_task(remove_file, archive_path)
+            print(f"🗂️ Running batch detection on a {os.path.getsize(archive_path)} byte archive...")
+            images = iter_archive_images(archive_path, stage_executors)
+    except BaseException:
+        await teardown()
+        raise
+    
+    return NDJSONStreamingResponse(detect_batch(images, detect, concurrency), background=teardown)
+
+@app.websocket("/ws/detect")
+async def detect_websocket(websocket: WebSocket, model: Optional[str] = None):
+    """Low-latency detection session: send binary frames, receive detections (latest frame wins)"""
+    if not lifecycle.ready:
+        # 1013 = try again later
+        await websocket.close(code=1013)
+        return
+    try:
+        version = registry.acquire(model)
+    except KeyError:
+        # 1008 = policy violation (unknown model)
+        await websocket.close(code=1008)
+        return
+    
+    async def detect(image: Image.Image, stats: Dict[str, Any]) -> List[Detection]:
+        return await infer_image(image, stats, version)
+    
+    print(f"🔌 WebSocket session opened on {version.key}")
+    try:
+        await run_detection_session(websocket, detect, stage_executors)
+    finally:
+        registry.release(version)
+
+@app.get("/cache")
+async def get_cache_stats():
+    """Detection cache counters and sizes"""
+    if detection_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **detection_cache.info()}
+
+@app.get("/storage")
+async def get_storage_stats():
+    """Background writer counters and retention settings"""
+    return result_writer.info()
+
+@app.get("/results/{result_id}")
+async def get_result_image(
+    result_id: str,
+    image_format: Optional[str] = None,
+    image_quality: Optional[int] = None,
+    image_max_size: Optional[int] = None,
+):
+    """Annotated image for a previous detection, rendered on first request (default options are kept)"""
+    output = output_options(image_format, image_quality, image_max_size)
+    entry = result_store.get(result_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    
+    image_bytes = entry.rendered if output == DEFAULT_OUTPUT else None
+    if image_bytes is None:
+        stats = {}
+        image, scale = await stage_executors.run("decode", decode_for_output, entry.source, output, stats=stats)
+        image_bytes = await render_result(image, scale, entry.detections, entry.renderer, stats, output)
+        if output == DEFAULT_OUTPUT:
+            result_store.set_rendered(result_id, image_bytes)
+    
+    return Response(content=image_bytes, media_type=output.media_type)
+
+def main():
+    import uvicorn
+    print(f"🚀 Starting Spacecraft Detection API with the {INFERENCE_BACKEND} backend "
+          f"(imports took {IMPORT_SECONDS:.2f} s, model loads in the background)...")
+    if HTTP_WORKERS > 1:
+        # Worker processes import the app themselves, so it has to be given by name
+        uvicorn.run("main:app", host=SERVER_HOST, port=SERVER_PORT, workers=HTTP_WORKERS, app_dir=os.path.dirname(os.path.abspath(__file__)))
+    else:
+        uvicorn.run(app, host=SERVER_HOST, port=SERVER_PORT)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Prometheus metrics for the detection servers
+
+A small in-process registry (counters, gauges, histograms) rendered in the
+Prometheus text exposition format at /metrics. Observing a value is a
+bisect plus a few integer increments under an uncontended lock, so the
+instrumentation can stay on in production; gauges backed by callbacks
+(queue depths, in-flight requests) are only evaluated when scraped.
+"""
+
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Stage durations range from sub-millisecond (cache lookups) to seconds (CPU inference)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter, optionally labelled"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge:
+    """Current value, either set explicitly or read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, callback: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def samples(self) -> Iterable[str]:
+        value = self.value
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception:
+                return
+        yield f"{self.name} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally labelled"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.labelnames = tuple(labelnames)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+class MetricsRegistry:
+    """Holds the metrics of one server and renders them for Prometheus"""
+
+    def __init__(self):
+        self._metrics: List = []
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, callback: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._register(Gauge(name, help_text, callback))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float], labelnames: Sequence[str] = ()) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets, labelnames))
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class DetectionMetrics(MetricsRegistry):
+    """The metrics every detection server exposes"""
+
+    def __init__(self):
+        super().__init__()
+        self.stage_seconds = self.histogram(
+            "detection_stage_duration_seconds", "Run time of each pipeline stage", STAGE_BUCKETS, ("stage",)
+        )
+        self.stage_wait_seconds = self.histogram(
+            "detection_stage_queue_wait_seconds", "Time each stage waited for a pool worker", STAGE_BUCKETS, ("stage",)
+        )
+        self.batch_size = self.histogram("detection_batch_size", "Images per inference batch", BATCH_SIZE_BUCKETS)
+        self.requests = self.counter(
+            "detection_requests_total", "HTTP requests by handler and outcome", ("handler", "outcome")
+        )
+        self.request_seconds = self.histogram(
+            "detection_request_duration_seconds", "HTTP request latency by handler", REQUEST_BUCKETS, ("handler",)
+        )
+        self.in_flight = self.gauge("detection_requests_in_flight", "HTTP requests currently being served")
+        self.model_load_seconds = self.gauge("detection_model_load_seconds", "Time the last model load took")
+        self.startup_seconds = self.gauge("detection_startup_seconds", "Time from process start until ready")
+
+    def observe_stage(self, stage: str, run_ms: float, queue_wait_ms: Optional[float] = None):
+        """Record one stage execution (milliseconds, as reported in response stats)"""
+        self.stage_seconds.observe(run_ms / 1000.0, stage)
+        if queue_wait_ms is not None:
+            self.stage_wait_seconds.observe(queue_wait_ms / 1000.0, stage)
+
+
+def outcome_for(status: int) -> str:
+    if status < 400:
+        return "success"
+    if status < 500:
+        return "client_error"
+    return "server_error"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware counting HTTP requests by handler and outcome
+
+    The handler label is the endpoint function name (bounded cardinality,
+    unlike raw paths such as /results/<id>); unmatched paths count as "none".
+    """
+
+    def __init__(self, app, metrics: DetectionMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.metrics.in_flight.dec()
+            endpoint = scope.get("endpoint")
+            handler = getattr(endpoint, "__name__", "none")
+            self.metrics.requests.inc(handler, outcome_for(status))
+            self.metrics.request_seconds.observe(time.perf_counter() - started, handler)
@@ -0,0 +1,258 @@
+"""
+ONNX Runtime inference backend for the YOLO detector
+
+Serves an ONNX export of public/models/best.pt on CPU without importing
+torch or ultralytics at runtime. Pre- and post-processing are done here in
+NumPy: letterbox resize to the model input, decoding of the (4 + classes)
+x anchors output, confidence filtering and class-aware vectorized NMS, then
+mapping boxes back to original image coordinates.
+
+The export is produced once with ultralytics and cached next to the weights
+(best.pt -> best.onnx); it is redone only when the .pt file is newer or a
+different input size is asked for. An INT8 variant (best.int8.onnx) is built
+from it by api/quantize.py. Both carry their input size in the ultralytics
+metadata ("imgsz"), which the detector serves at by default.
+"""
+
+import ast
+import importlib.util
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+# onnxruntime is imported when a session is created, not at server import time
+ONNX_AVAILABLE = importlib.util.find_spec("onnxruntime") is not None
+
+# Inference settings (overridable via environment); defaults match ultralytics predict()
+ONNX_CONF_THRESHOLD = float(os.getenv("ONNX_CONF_THRESHOLD", "0.25"))
+ONNX_IOU_THRESHOLD = float(os.getenv("ONNX_IOU_THRESHOLD", "0.7"))
+ONNX_MAX_DETECTIONS = int(os.getenv("ONNX_MAX_DETECTIONS", "300"))
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 = onnxruntime default
+
+DEFAULT_IMGSZ = 640
+LETTERBOX_COLOR = (114, 114, 114)
+# Offset that separates classes in the shared NMS pass (same trick as ultralytics)
+CLASS_OFFSET = 7680.0
+
+BoxArrays = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def onnx_path_for(model_path: str) -> str:
+    return os.path.splitext(model_path)[0] + ".onnx"
+
+
+def int8_path_for(model_path: str) -> str:
+    """Where api/quantize.py writes the INT8 variant (best.pt -> best.int8.onnx)"""
+    return os.path.splitext(model_path)[0] + ".int8.onnx"
+
+
+def metadata_imgsz(metadata: Dict[str, str]) -> Optional[int]:
+    """Input size from the "imgsz" metadata ultralytics writes into the export ("[640, 640]")"""
+    try:
+        value = ast.literal_eval(metadata.get("imgsz", "None"))
+    except (ValueError, SyntaxError):
+        return None
+    if isinstance(value, (list, tuple)) and value:
+        value = max(value)
+    return int(value) if isinstance(value, (int, float)) else None
+
+
+def exported_imgsz(onnx_path: str) -> Optional[int]:
+    """Input size an ONNX file was exported (or calibrated) at, None if it does not say"""
+    import onnx
+
+    model = onnx.load(onnx_path, load_external_data=False)
+    return metadata_imgsz({prop.key: prop.value for prop in model.metadata_props})
+
+
+def export_onnx(model_path: str, imgsz: Optional[int] = None) -> str:
+    """Export best.pt to ONNX once and cache it next to the weights
+
+    imgsz=None takes the cached export at whatever size it was made (640 for a
+    new one); a given imgsz re-exports if the cached file has another size.
+    """
+    onnx_path = onnx_path_for(model_path)
+    cached = os.path.exists(onnx_path) and (
+        not os.path.exists(model_path) or os.path.getmtime(onnx_path) >= os.path.getmtime(model_path)
+    )
+    if cached and imgsz is not None:
+        cached_imgsz = exported_imgsz(onnx_path) or DEFAULT_IMGSZ
+        if cached_imgsz != imgsz:
+            print(f"📦 Cached export is {cached_imgsz} px, {imgsz} px requested")
+            cached = False
+    if cached:
+        return onnx_path
+
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"{model_path} not found, cannot re-export {onnx_path} at {imgsz} px")
+    imgsz = imgsz or DEFAULT_IMGSZ
+    print(f"📦 Exporting {model_path} to ONNX at {imgsz} px (one-time)...")
+    from ultralytics import YOLO
+
+    exported = YOLO(model_path).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=False)
+    if os.path.abspath(exported) != os.path.abspath(onnx_path):
+        os.replace(exported, onnx_path)
+    print(f"✅ ONNX model cached at {onnx_path}")
+    return onnx_path
+
+
+def letterbox(image: Image.Image, size: int) -> Tuple[np.ndarray, float, Tuple[int, int]]:
+    """Resize keeping aspect ratio and pad to size x size; returns (HWC uint8, scale, (pad_x, pad_y))"""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    width, height = image.size
+    scale = min(size / width, size / height)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+    if (new_width, new_height) != (width, height):
+        image = image.resize((new_width, new_height), Image.BILINEAR)
+
+    pad_x = int(round((size - new_width) / 2 - 0.1))
+    pad_y = int(round((size - new_height) / 2 - 0.1))
+    canvas = np.empty((size, size, 3), dtype=np.uint8)
+    canvas[...] = LETTERBOX_COLOR
+    canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = np.asarray(image)
+    return canvas, scale, (pad_x, pad_y)
+
+
+def box_iou(box: np.ndarray, boxes: np.ndarray) -> np.ndarray:
+    """IoU of one xyxy box against many"""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    return intersection / np.maximum(area + areas - intersection, 1e-9)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float, max_detections: Optional[int] = None) -> np.ndarray:
+    """Greedy NMS; each step suppresses against all remaining boxes at once"""
+    order = np.argsort(-scores, kind="stable")
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        if max_detections and len(keep) >= max_detections:
+            break
+        if order.size == 1:
+            break
+        ious = box_iou(boxes[best], boxes[order[1:]])
+        order = order[1:][ious <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def batched_nms(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, iou_threshold: float, max_detections: Optional[int] = None) -> np.ndarray:
+    """Class-aware NMS: boxes of different classes never suppress each other"""
+    if boxes.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    offset_boxes = boxes + (classes.astype(np.float32) * CLASS_OFFSET)[:, None]
+    return nms(offset_boxes, scores, iou_threshold, max_detections)
+
+
+def decode_predictions(
+    prediction: np.ndarray,
+    conf_threshold: float,
+    iou_threshold: float,
+    max_detections: int,
+) -> BoxArrays:
+    """(4 + classes, anchors) YOLOv8 output -> (xyxy, conf, cls) in input-image pixels"""
+    prediction = prediction.T  # (anchors, 4 + classes)
+    class_scores = prediction[:, 4:]
+    classes = class_scores.argmax(axis=1)
+    confidences = class_scores[np.arange(len(classes)), classes]
+    mask = confidences > conf_threshold
+    if not mask.any():
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+
+    centers = prediction[mask, :4]
+    confidences = confidences[mask]
+    classes = classes[mask]
+    xyxy = np.empty_like(centers)
+    xyxy[:, :2] = centers[:, :2] - centers[:, 2:] / 2
+    xyxy[:, 2:] = centers[:, :2] + centers[:, 2:] / 2
+
+    keep = batched_nms(xyxy, confidences, classes, iou_threshold, max_detections)
+    return xyxy[keep], confidences[keep].astype(np.float32), classes[keep].astype(np.int64)
+
+
+def scale_boxes(xyxy: np.ndarray, scale: float, pad: Tuple[int, int], image_size: Tuple[int, int]) -> np.ndarray:
+    """Undo letterboxing and clip to the original image"""
+    boxes = xyxy.copy()
+    boxes[:, [0, 2]] -= pad[0]
+    boxes[:, [1, 3]] -= pad[1]
+    boxes /= scale
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, image_size[0])
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, image_size[1])
+    return boxes
+
+
+class OnnxDetector:
+    """YOLOv8 detector running on ONNX Runtime (CPU by default)"""
+
+    def __init__(
+        self,
+        onnx_path: str,
+        imgsz: Optional[int] = None,
+        providers: Sequence[str] = ("CPUExecutionProvider",),
+        conf_threshold: float = ONNX_CONF_THRESHOLD,
+        iou_threshold: float = ONNX_IOU_THRESHOLD,
+        max_detections: int = ONNX_MAX_DETECTIONS,
+        intra_op_threads: int = ONNX_INTRA_OP_THREADS,
+    ):
+        if not ONNX_AVAILABLE:
+            raise RuntimeError("onnxruntime is not installed")
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=list(providers))
+        self.onnx_path = onnx_path
+        # Default: the size the model was exported / calibrated at
+        self.imgsz = imgsz or metadata_imgsz(self.session.get_modelmeta().custom_metadata_map) or DEFAULT_IMGSZ
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_type = np.float16 if "float16" in model_input.type else np.float32
+        # Exports with dynamic=True have a symbolic batch dimension
+        self.dynamic_batch = not isinstance(model_input.shape[0], int)
+        self.names = self._read_names()
+
+    def _read_names(self) -> Dict[int, str]:
+        """Class names from the metadata ultralytics writes into the export"""
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        try:
+            return {int(k): v for k, v in ast.literal_eval(metadata.get("names", "{}")).items()}
+        except (ValueError, SyntaxError):
+            return {}
+
+    def predict(self, images: List[Image.Image]) -> List[BoxArrays]:
+        """Detect objects in a batch of images; returns (xyxy, conf, cls) per image"""
+        letterboxed = [letterbox(image, self.imgsz) for image in images]
+        batch = np.stack([canvas for canvas, _, _ in letterboxed])
+        batch = np.ascontiguousarray(batch.transpose(0, 3, 1, 2)).astype(self.input_type) / 255.0
+
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: batch})[0]
+        else:
+            outputs = np.concatenate([
+                self.session.run(None, {self.input_name: batch[i:i + 1]})[0] for i in range(len(images))
+            ])
+
+        results = []
+        for image, (_, scale, pad), prediction in zip(images, letterboxed, outputs):
+            xyxy, conf, cls = decode_predictions(
+                prediction.astype(np.float32), self.conf_threshold, self.iou_threshold, self.max_detections
+            )
+            results.append((scale_boxes(xyxy, scale, pad, image.size), conf, cls))
+        return results
+
+    def __call__(self, images: List[Image.Image]) -> List[BoxArrays]:
+        return self.predict(images)
@@ -0,0 +1,117 @@
+"""
+Output options for the annotated image: format, quality and size
+
+The annotated image used to be a full-resolution JPEG at quality 95, which
+costs more to decode, draw and encode than the detection itself on large
+photos. By default it is now a preview: the longest side is capped at
+OUTPUT_MAX_SIZE, and the whole chain runs at that size. JPEG sources are
+decoded with libjpeg DCT scaling (see image_io.decode_for_inference), boxes
+are drawn on the small image and only the small image is encoded.
+
+Per request (body fields on /detect, query parameters elsewhere):
+  image_format    jpeg | webp | png
+  image_quality   1-100 (JPEG / WebP; PNG is lossless and ignores it)
+  image_max_size  longest side in pixels, 0 = original resolution
+
+The image is base64-inlined only in JSON responses; the binary response
+formats (api/formats.py) and GET /results/{id} send the raw bytes.
+"""
+
+import io
+import os
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from PIL import Image
+
+from image_io import decode_for_inference, decode_image_bytes, downscale_for_inference
+
+# Defaults for the annotated image (overridable via environment)
+OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "jpeg")
+OUTPUT_QUALITY = int(os.getenv("OUTPUT_QUALITY", "80"))
+# 0 = original resolution; 960 lets libjpeg decode 1920 px sources at 1/2 and 3840-4000 px ones at 1/4
+OUTPUT_MAX_SIZE = int(os.getenv("OUTPUT_MAX_SIZE", "960"))
+# Encoder effort: WebP method 0 (fastest) - 6, PNG zlib level 0 - 9
+WEBP_METHOD = int(os.getenv("WEBP_METHOD", "0"))
+PNG_COMPRESS_LEVEL = int(os.getenv("PNG_COMPRESS_LEVEL", "1"))
+
+# format -> (PIL format, media type, file suffix)
+FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", ".jpg"),
+    "webp": ("WEBP", "image/webp", ".webp"),
+    "png": ("PNG", "image/png", ".png"),
+}
+FORMAT_ALIASES = {"jpg": "jpeg"}
+
+Scale = Tuple[float, float]
+
+
+@dataclass(frozen=True)
+class OutputOptions:
+    """How the annotated image is encoded"""
+    format: str = OUTPUT_FORMAT
+    quality: int = OUTPUT_QUALITY
+    max_size: int = OUTPUT_MAX_SIZE
+
+    @property
+    def media_type(self) -> str:
+        return FORMATS[self.format][1]
+
+    @property
+    def suffix(self) -> str:
+        return FORMATS[self.format][2]
+
+
+def output_options(image_format: Optional[str] = None, quality: Optional[int] = None, max_size: Optional[int] = None) -> OutputOptions:
+    """Request options on top of the server defaults (400 for invalid values)"""
+    image_format = (image_format or OUTPUT_FORMAT).lower()
+    image_format = FORMAT_ALIASES.get(image_format, image_format)
+    if image_format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown image format {image_format}; supported: {', '.join(FORMATS)}")
+    quality = OUTPUT_QUALITY if quality is None else quality
+    if not 1 <= quality <= 100:
+        raise HTTPException(status_code=400, detail="image_quality must be between 1 and 100")
+    max_size = OUTPUT_MAX_SIZE if max_size is None else max_size
+    if max_size < 0:
+        raise HTTPException(status_code=400, detail="image_max_size must be >= 0 (0 = original resolution)")
+    return OutputOptions(image_format, quality, max_size)
+
+
+DEFAULT_OUTPUT = output_options()
+
+
+def decode_for_output(image_data: bytes, options: OutputOptions) -> Tuple[Image.Image, Scale]:
+    """Decode only as many pixels as the output needs; returns (image, original / decoded scale)"""
+    if not options.max_size:
+        return decode_image_bytes(image_data), (1.0, 1.0)
+    return decode_for_inference(image_data, options.max_size)
+
+
+def fit_output(image: Image.Image, scale: Scale, options: OutputOptions) -> Tuple[Image.Image, Scale]:
+    """Downscale an already decoded image to the output size; scale is accumulated"""
+    if not options.max_size:
+        return image, scale
+    image, (resize_x, resize_y) = downscale_for_inference(image, options.max_size)
+    return image, (scale[0] * resize_x, scale[1] * resize_y)
+
+
+def output_boxes(detections: List[Any], scale: Scale) -> Iterator[Sequence[float]]:
+    """(x1, y1, x2, y2, confidence, class_id) rows in output pixels (detections are left untouched)"""
+    scale_x, scale_y = scale
+    for d in detections:
+        x1, y1 = d.bbox.x / scale_x, d.bbox.y / scale_y
+        yield x1, y1, x1 + d.bbox.width / scale_x, y1 + d.bbox.height / scale_y, d.confidence, d.class_id
+
+
+def encode_image(image: Image.Image, options: OutputOptions) -> bytes:
+    """Encode the annotated image in the requested format"""
+    buffer = io.BytesIO()
+    pil_format = FORMATS[options.format][0]
+    if pil_format == "JPEG":
+        image.save(buffer, format=pil_format, quality=options.quality)
+    elif pil_format == "WEBP":
+        image.save(buffer, format=pil_format, quality=options.quality, method=WEBP_METHOD)
+    else:
+        image.save(buffer, format=pil_format, compress_level=PNG_COMPRESS_LEVEL)
+    return buffer.getvalue()
@@ -0,0 +1,75 @@
+"""
+Vectorized conversion of YOLO outputs into response objects
+
+Pulls the whole (N, 6) box tensor to the host in one transfer, does the
+xyxy -> xywh arithmetic in NumPy and turns the rows into response objects
+with a single pydantic-core validation call for the whole list instead of
+constructing and validating a BoundingBox/Detection per box in Python.
+"""
+
+from typing import Any, List, Sequence, Tuple
+
+import numpy as np
+from pydantic import TypeAdapter
+
+
+def boxes_to_arrays(boxes) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split an ultralytics Boxes object into (xyxy, conf, cls) NumPy arrays"""
+    # boxes.data is [x1, y1, x2, y2, (track_id,) conf, cls]; one device -> host copy
+    data = boxes.data if boxes is not None else np.zeros((0, 6), np.float32)
+    if hasattr(data, "cpu"):
+        data = data.cpu().numpy()
+    data = np.asarray(data, dtype=np.float32)
+    if data.size == 0:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+    return data[:, :4], data[:, -2], data[:, -1].astype(np.int64)
+
+
+def xyxy_to_xywh(xyxy: np.ndarray) -> np.ndarray:
+    """Corner boxes to top-left + width/height boxes"""
+    xywh = np.array(xyxy, dtype=np.float32, copy=True)
+    xywh[:, 2:] -= xywh[:, :2]
+    return xywh
+
+
+def detection_dicts(xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray) -> List[dict]:
+    """Plain Detection-shaped dicts from box arrays"""
+    xywh = xyxy_to_xywh(xyxy).tolist()
+    confidences = np.asarray(conf, dtype=np.float32).tolist()
+    class_ids = np.asarray(cls).astype(np.int64).tolist()
+    return [
+        {
+            "class_id": class_id,
+            "confidence": confidence,
+            "bbox": {"x": x, "y": y, "width": width, "height": height},
+        }
+        for (x, y, width, height), confidence, class_id in zip(xywh, confidences, class_ids)
+    ]
+
+
+def build_detections(xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray, adapter: TypeAdapter) -> List[Any]:
+    """Detection objects from box arrays; adapter is a TypeAdapter(List[Detection])"""
+    return adapter.validate_python(detection_dicts(xyxy, conf, cls))
+
+
+def scale_detections(detections: List[Any], scale: Sequence[float]) -> List[Any]:
+    """Map detections from a downscaled image back to original pixels (in place)"""
+    scale_x, scale_y = scale
+    if scale_x == 1.0 and scale_y == 1.0:
+        return detections
+    for detection in detections:
+        detection.bbox.x *= scale_x
+        detection.bbox.y *= scale_y
+        detection.bbox.width *= scale_x
+        detection.bbox.height *= scale_y
+    return detections
+
+
+def detections_to_arrays(detections: List[Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(xyxy, conf, cls) arrays back from Detection objects"""
+    if not detections:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+    xyxy = np.array([[d.bbox.x, d.bbox.y, d.bbox.x + d.bbox.width, d.bbox.y + d.bbox.height] for d in detections], dtype=np.float32)
+    conf = np.array([d.confidence for d in detections], dtype=np.float32)
+    cls = np.array([d.class_id for d in detections], dtype=np.int64)
+    return xyxy, conf, cls
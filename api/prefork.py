@@ -0,0 +1,196 @@
+"""
+Pre-forking launcher: load the model once, fork the HTTP workers from it
+
+With HTTP_WORKERS=N every uvicorn worker imports the framework and loads its
+own copy of the weights. The preload launcher (python api/preload.py) loads
+and warms the model in the parent process instead, binds the listening
+socket, and only then forks the workers: the weights, the imported framework
+and everything else built at startup are shared copy-on-write, so each
+worker only pays for the pages it writes to.
+
+Fork safety:
+  - gc.freeze() right before forking moves every existing object to the
+    permanent generation, so garbage collection in the workers does not write
+    to (and thereby copy) the shared pages
+  - thread pools do not survive fork: the parent runs inference with one
+    thread (OMP / MKL / ONNX Runtime intra-op = 1), so no OpenMP or ONNX
+    Runtime pool exists before the fork; the workers then size torch's pool
+    with torch.set_num_threads. ONNX Runtime fixes its pool size at session
+    creation, so its workers stay single-threaded (run one worker per core)
+  - the parent checks that it is single-threaded when it forks and warns
+    about any thread that would be missing in the workers
+
+The parent stays alive as a supervisor: it re-forks a worker that dies (from
+the same preloaded state, so without reloading) and stops the workers on
+SIGTERM / SIGINT. POSIX only.
+
+memory_usage() reads RSS / PSS / USS from /proc/<pid>/smaps_rollup (Linux);
+benchmarks/fork-memory.py compares both launch modes with it.
+"""
+
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Respawn throttling: a worker that dies at startup must not turn into a fork loop
+RESPAWN_DELAY_S = 1.0
+
+
+def single_threaded_env():
+    """Keep framework thread pools from starting before the fork (call before importing torch / onnxruntime)"""
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "ONNX_INTRA_OP_THREADS"):
+        os.environ[name] = "1"
+
+
+def native_threads() -> List[str]:
+    """Names of the OS threads of this process other than the calling one (Linux)"""
+    try:
+        tasks = os.listdir("/proc/self/task")
+    except OSError:
+        return []
+    names = []
+    for task in tasks:
+        if int(task) == threading.get_native_id():
+            continue
+        try:
+            with open(f"/proc/self/task/{task}/comm") as f:
+                names.append(f.read().strip())
+        except OSError:
+            continue
+    return names
+
+
+def memory_usage(pid: int) -> Dict[str, int]:
+    """RSS, PSS and USS (private pages) of a process in bytes, from /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Listening socket shared by all workers (the kernel spreads accepts across them)"""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkServer:
+    """Supervisor that forks uvicorn workers from a process with the model already loaded"""
+
+    def __init__(self, app: Any, workers: int, host: str, port: int, threads_per_worker: Optional[int] = None,
+                 on_fork: Optional[Callable[[], None]] = None):
+        self.app = app
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+        self.on_fork = on_fork
+        self.children: Dict[int, int] = {}  # pid -> worker index
+        self._stopping = False
+
+    def _child(self, index: int, sock: socket.socket):
+        """Runs in the forked worker; never returns"""
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            torch = sys.modules.get("torch")
+            if torch is not None:
+                # Safe: the parent never started a multi-threaded pool
+                torch.set_num_threads(self.threads_per_worker)
+            if self.on_fork is not None:
+                self.on_fork()
+            import uvicorn
+
+            print(f"👶 Worker {index} (pid {os.getpid()}) serving")
+            config = uvicorn.Config(self.app, log_level="info")
+            uvicorn.Server(config).run(sockets=[sock])
+        except BaseException as e:
+            print(f"❌ Worker {index} failed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _fork(self, index: int, sock: socket.socket):
+        pid = os.fork()
+        if pid == 0:
+            self._child(index, sock)
+        self.children[pid] = index
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def memory(self) -> Dict[str, Dict[str, int]]:
+        """Memory of the supervisor and every worker"""
+        usage = {"supervisor": memory_usage(os.getpid())}
+        for pid, index in sorted(self.children.items(), key=lambda item: item[1]):
+            try:
+                usage[f"worker-{index}"] = memory_usage(pid)
+            except OSError:
+                continue
+        return usage
+
+    def print_memory(self, *_):
+        """Memory table of the process tree (send SIGUSR1 to the supervisor)"""
+        usage = self.memory()
+        print(f"{'process':>12}{'RSS MB':>10}{'PSS MB':>10}{'USS MB':>10}")
+        for name, values in usage.items():
+            print(f"{name:>12}" + "".join(f"{values[key] / 2**20:>10.1f}" for key in ("rss", "pss", "uss")))
+        print(f"{'total':>12}{'':>10}{sum(v['pss'] for v in usage.values()) / 2**20:>10.1f}")
+
+    def run(self):
+        if not hasattr(os, "fork"):
+            raise SystemExit("❌ The preload launcher needs os.fork (POSIX); use HTTP_WORKERS with api/main.py instead")
+        sock = bind_socket(self.host, self.port)
+        threads = native_threads()
+        if threads:
+            print(f"⚠️ {len(threads)} threads running at fork time ({', '.join(sorted(set(threads)))}); "
+                  "they will not exist in the workers")
+        # Everything built so far is shared read-only from here on
+        gc.collect()
+        gc.freeze()
+        print(f"🍴 Forking {self.workers} workers on {self.host}:{self.port} ({self.threads_per_worker} inference threads each)")
+        for index in range(self.workers):
+            self._fork(index, sock)
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGUSR1, self.print_memory)
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            index = self.children.pop(pid, None)
+            if index is None or self._stopping:
+                continue
+            print(f"⚠️ Worker {index} (pid {pid}) exited with status {status}, re-forking")
+            time.sleep(RESPAWN_DELAY_S)
+            if not self._stopping:
+                self._fork(index, sock)
+        sock.close()
+        print("🛑 All workers stopped")
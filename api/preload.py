@@ -0,0 +1,25 @@
+"""
+Pre-forking entry point for the unified server (api/main.py)
+
+Loads and warms every configured model once, then forks HTTP_WORKERS uvicorn
+workers that share the weights copy-on-write, see api/prefork.py.
+Run with: HTTP_WORKERS=4 python api/preload.py
+"""
+
+from prefork import PreforkServer, single_threaded_env
+
+# Before main imports the backends: no framework thread pool may exist at fork time
+single_threaded_env()
+
+from main import HTTP_WORKERS, SERVER_HOST, SERVER_PORT, app, lifecycle  # noqa: E402
+
+
+def main():
+    print(f"🚀 Preloading models before forking {HTTP_WORKERS} workers...")
+    if not lifecycle.run():
+        raise SystemExit(f"❌ Model startup failed: {lifecycle.error}")
+    PreforkServer(app, HTTP_WORKERS, SERVER_HOST, SERVER_PORT).run()
+
+
+if __name__ == "__main__":
+    main()
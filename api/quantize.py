@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+INT8 quantization of the ONNX detector, with an FP32 vs INT8 comparison report
+
+  build   Quantize best.onnx (exported from best.pt if needed) to best.int8.onnx.
+          --mode dynamic: INT8 weights, activations quantized at runtime
+                          (no calibration data needed).
+          --mode static:  INT8 weights and activations, ranges calibrated on a
+                          directory of sample images (QDQ format). The
+                          box/score decoding tail of the Detect head stays in
+                          FP32 since pixel coordinates and class scores share
+                          one output tensor.
+  report  Run both models over the same images and compare: detection
+          agreement (mAP@0.5 / precision / recall / mean IoU of INT8 against
+          the FP32 detections), latency percentiles, throughput and file size.
+
+Serve the result with INFERENCE_BACKEND=onnx-int8.
+
+Usage:
+  python api/quantize.py build --mode static --calibration-dir samples/ [--limit 100]
+  python api/quantize.py report --images samples/ [--json report.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from onnx_backend import (  # noqa: E402
+    DEFAULT_IMGSZ,
+    ONNX_AVAILABLE,
+    BoxArrays,
+    OnnxDetector,
+    box_iou,
+    export_onnx,
+    exported_imgsz,
+    int8_path_for,
+    letterbox,
+)
+
+MODEL_PATH = "public/models/best.pt"
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+AGREEMENT_IOU = 0.5
+
+
+def list_images(directory: str, limit: Optional[int] = None) -> List[Path]:
+    paths = sorted(p for p in Path(directory).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+    if not paths:
+        raise FileNotFoundError(f"No images found in {directory}")
+    return paths[:limit] if limit else paths
+
+
+def load_rgb(path: Path) -> Image.Image:
+    with Image.open(path) as image:
+        return image.convert("RGB")
+
+
+class ImageCalibrationReader:
+    """Feeds letterboxed sample images to the static quantizer, one at a time"""
+
+    def __init__(self, paths: List[Path], input_name: str, imgsz: int):
+        self.paths = paths
+        self.input_name = input_name
+        self.imgsz = imgsz
+        self._iterator: Optional[Iterator[Path]] = None
+
+    def get_next(self) -> Optional[Dict[str, np.ndarray]]:
+        if self._iterator is None:
+            self._iterator = iter(self.paths)
+        path = next(self._iterator, None)
+        if path is None:
+            return None
+        canvas, _, _ = letterbox(load_rgb(path), self.imgsz)
+        batch = canvas.transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+        return {self.input_name: np.ascontiguousarray(batch)}
+
+    def rewind(self):
+        self._iterator = None
+
+
+def head_nodes_to_exclude(onnx_model) -> List[str]:
+    """Non-Conv nodes of the last module (the Detect head's DFL/decode/concat tail)"""
+    pattern = re.compile(r"^/model\.(\d+)/")
+    indices = [int(m.group(1)) for m in (pattern.match(node.name) for node in onnx_model.graph.node) if m]
+    if not indices:
+        return []
+    prefix = f"/model.{max(indices)}/"
+    return [node.name for node in onnx_model.graph.node if node.name.startswith(prefix) and node.op_type != "Conv"]
+
+
+def copy_metadata(source_path: str, target_path: str):
+    """Carry the ultralytics metadata (class names, stride, ...) over to the quantized model"""
+    import onnx
+
+    source = onnx.load(source_path, load_external_data=False)
+    target = onnx.load(target_path)
+    existing = {prop.key for prop in target.metadata_props}
+    for prop in source.metadata_props:
+        if prop.key not in existing:
+            target.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(target, target_path)
+
+
+def build(args) -> str:
+    """Quantize the FP32 ONNX export to INT8"""
+    import onnx
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_dynamic, quantize_static
+
+    fp32_path = export_onnx(args.model, args.imgsz)
+    # Calibrate at the export's size: the server reads it back from the copied metadata
+    imgsz = exported_imgsz(fp32_path) or DEFAULT_IMGSZ
+    int8_path = args.output or int8_path_for(args.model)
+    print(f"🔧 Quantizing {fp32_path} -> {int8_path} ({args.mode}, {imgsz} px)")
+    start = time.perf_counter()
+
+    if args.mode == "dynamic":
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    else:
+        if not args.calibration_dir:
+            raise SystemExit("❌ --calibration-dir is required for static quantization")
+        paths = list_images(args.calibration_dir, args.limit)
+        print(f"📸 Calibrating on {len(paths)} images ({args.method})")
+        fp32_model = onnx.load(fp32_path)
+        input_name = fp32_model.graph.input[0].name
+        quantize_static(
+            fp32_path,
+            int8_path,
+            ImageCalibrationReader(paths, input_name, imgsz),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            calibrate_method={
+                "minmax": CalibrationMethod.MinMax,
+                "entropy": CalibrationMethod.Entropy,
+                "percentile": CalibrationMethod.Percentile,
+            }[args.method],
+            nodes_to_exclude=head_nodes_to_exclude(fp32_model),
+        )
+
+    copy_metadata(fp32_path, int8_path)
+    print(f"✅ INT8 model written in {time.perf_counter() - start:.1f} s")
+    print(f"📏 Size: {os.path.getsize(fp32_path) / 1e6:.1f} MB -> {os.path.getsize(int8_path) / 1e6:.1f} MB")
+    return int8_path
+
+
+def average_precision(recall: np.ndarray, precision: np.ndarray) -> float:
+    """Area under the precision/recall curve (all-point interpolation)"""
+    recall = np.concatenate(([0.0], recall, [1.0]))
+    precision = np.concatenate(([1.0], precision, [0.0]))
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    changes = np.where(recall[1:] != recall[:-1])[0]
+    return float(np.sum((recall[changes + 1] - recall[changes]) * precision[changes + 1]))
+
+
+def agreement(references: List[BoxArrays], candidates: List[BoxArrays], iou_threshold: float = AGREEMENT_IOU) -> Dict[str, float]:
+    """Score candidate (INT8) detections against reference (FP32) detections as if they were labels"""
+    classes = sorted({int(c) for _, _, cls in references for c in cls} | {int(c) for _, _, cls in candidates for c in cls})
+    per_class_ap = {}
+    matched_ious: List[float] = []
+    true_positives = total_candidates = total_references = 0
+
+    for class_id in classes:
+        scored = []  # (confidence, is_true_positive)
+        num_references = 0
+        for (ref_xyxy, _, ref_cls), (cand_xyxy, cand_conf, cand_cls) in zip(references, candidates):
+            ref_boxes = ref_xyxy[ref_cls == class_id]
+            num_references += len(ref_boxes)
+            used = np.zeros(len(ref_boxes), dtype=bool)
+            mask = cand_cls == class_id
+            for box, confidence in sorted(zip(cand_xyxy[mask], cand_conf[mask]), key=lambda item: -item[1]):
+                hit = False
+                if len(ref_boxes):
+                    ious = np.where(used, -1.0, box_iou(box, ref_boxes))
+                    best = int(np.argmax(ious))
+                    if ious[best] >= iou_threshold:
+                        used[best] = True
+                        matched_ious.append(float(ious[best]))
+                        hit = True
+                scored.append((float(confidence), hit))
+
+        total_references += num_references
+        total_candidates += len(scored)
+        true_positives += sum(hit for _, hit in scored)
+        if num_references == 0:
+            continue
+        if not scored:
+            per_class_ap[class_id] = 0.0
+            continue
+        scored.sort(key=lambda item: -item[0])
+        hits = np.cumsum([hit for _, hit in scored])
+        precision = hits / np.arange(1, len(scored) + 1)
+        recall = hits / num_references
+        per_class_ap[class_id] = average_precision(recall, precision)
+
+    return {
+        "map50": round(float(np.mean(list(per_class_ap.values()))), 4) if per_class_ap else 1.0,
+        "per_class_ap50": {str(k): round(v, 4) for k, v in per_class_ap.items()},
+        "precision": round(true_positives / total_candidates, 4) if total_candidates else 1.0,
+        "recall": round(true_positives / total_references, 4) if total_references else 1.0,
+        "mean_matched_iou": round(float(np.mean(matched_ious)), 4) if matched_ious else None,
+        "reference_detections": total_references,
+        "candidate_detections": total_candidates,
+    }
+
+
+def time_model(detector: OnnxDetector, images: List[Image.Image], warmup: int = 2):
+    """Per-image latency (batch of 1) and detections for every image"""
+    for image in images[:warmup]:
+        detector([image])
+    detections, latencies = [], []
+    for image in images:
+        start = time.perf_counter()
+        detections.append(detector([image])[0])
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    latencies = np.asarray(latencies)
+    timing = {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "mean_ms": round(float(latencies.mean()), 2),
+        "throughput_img_s": round(len(images) / (latencies.sum() / 1000.0), 2),
+    }
+    return detections, timing
+
+
+def report(args) -> Dict[str, object]:
+    """Compare the FP32 and INT8 models on the same image set"""
+    fp32_path = export_onnx(args.model)
+    int8_path = args.int8 or int8_path_for(args.model)
+    if not os.path.exists(int8_path):
+        raise SystemExit(f"❌ {int8_path} not found, run: python api/quantize.py build")
+
+    paths = list_images(args.images, args.limit)
+    images = [load_rgb(path) for path in paths]
+    print(f"📸 Comparing on {len(images)} images")
+
+    # Both models run at the INT8 model's (calibration) size unless --imgsz overrides it
+    int8_model = OnnxDetector(int8_path, imgsz=args.imgsz)
+    fp32_model = OnnxDetector(fp32_path, imgsz=int8_model.imgsz)
+    print(f"📐 Input size {int8_model.imgsz} px")
+    fp32_detections, fp32_timing = time_model(fp32_model, images)
+    int8_detections, int8_timing = time_model(int8_model, images)
+
+    result = {
+        "images": len(images),
+        "imgsz": int8_model.imgsz,
+        "fp32": {"path": fp32_path, "size_mb": round(os.path.getsize(fp32_path) / 1e6, 2), **fp32_timing},
+        "int8": {"path": int8_path, "size_mb": round(os.path.getsize(int8_path) / 1e6, 2), **int8_timing},
+        "speedup": round(fp32_timing["mean_ms"] / int8_timing["mean_ms"], 2),
+        "agreement": agreement(fp32_detections, int8_detections),
+    }
+
+    print("=" * 60)
+    print(f"{'':8}{'size MB':>10}{'p50 ms':>10}{'p95 ms':>10}{'img/s':>10}")
+    for name in ("fp32", "int8"):
+        row = result[name]
+        print(f"{name:8}{row['size_mb']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['throughput_img_s']:>10}")
+    print("=" * 60)
+    print(f"⚡ Speedup: {result['speedup']}x")
+    scores = result["agreement"]
+    print(f"🎯 Agreement vs FP32: mAP@0.5 {scores['map50']}, precision {scores['precision']}, "
+          f"recall {scores['recall']}, mean IoU {scores['mean_matched_iou']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"💾 Report written to {args.json}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=MODEL_PATH, help="PyTorch weights the ONNX export is made from")
+    parser.add_argument("--imgsz", type=int, help="build: export size (default: the cached export's, 640 for a new one); report: evaluation size")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = commands.add_parser("build", help="Produce the INT8 model")
+    build_parser.add_argument("--mode", choices=("dynamic", "static"), default="static")
+    build_parser.add_argument("--calibration-dir", help="Sample images for static calibration")
+    build_parser.add_argument("--method", choices=("minmax", "entropy", "percentile"), default="minmax")
+    build_parser.add_argument("--limit", type=int, default=200, help="Max calibration images")
+    build_parser.add_argument("--output", help="Defaults to best.int8.onnx next to the weights")
+
+    report_parser = commands.add_parser("report", help="Compare FP32 and INT8 on an image set")
+    report_parser.add_argument("--images", required=True, help="Directory of evaluation images")
+    report_parser.add_argument("--int8", help="Defaults to best.int8.onnx next to the weights")
+    report_parser.add_argument("--limit", type=int)
+    report_parser.add_argument("--json", help="Write the report as JSON")
+
+    args = parser.parse_args()
+    if not ONNX_AVAILABLE:
+        raise SystemExit("❌ onnxruntime not installed (pip install onnxruntime)")
+    if args.command == "build":
+        build(args)
+    else:
+        report(args)
+
+
+if __name__ == "__main__":
+    main()
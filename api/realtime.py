@@ -0,0 +1,130 @@
+"""
+WebSocket detection sessions for AR clients
+
+A client keeps one WebSocket open and sends each camera frame as a binary
+message (encoded JPEG/PNG bytes). Frames are numbered in arrival order
+starting at 0, and each reply carries that number so the client can match
+it to its own send time for end-to-end latency.
+
+Backpressure is latest-frame-wins: while a frame is being processed only the
+newest incoming frame is kept, older pending ones are dropped and counted,
+so latency stays bounded by one inference no matter how fast frames arrive.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+from PIL import Image
+
+from image_io import decode_for_inference
+from postprocess import scale_detections
+
+DetectFn = Callable[[Image.Image, Dict[str, Any]], Awaitable[List[Any]]]
+
+
+class DetectionSession:
+    """Per-connection state reused across frames"""
+
+    def __init__(self):
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.latency_ms_ema: Optional[float] = None
+        self._pending: Optional[Tuple[int, bytes, float]] = None
+        self._ready = asyncio.Event()
+        self.closed = False
+
+    def offer(self, frame: bytes):
+        """Accept a new frame, replacing any frame still waiting"""
+        if self._pending is not None:
+            self.dropped += 1
+        self._pending = (self.received, frame, time.perf_counter())
+        self.received += 1
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def next_frame(self) -> Optional[Tuple[int, bytes, float]]:
+        """Wait for the newest pending frame (None once the client is gone)"""
+        while self._pending is None:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        frame, self._pending = self._pending, None
+        return frame
+
+    def record_latency(self, latency_ms: float):
+        self.processed += 1
+        if self.latency_ms_ema is None:
+            self.latency_ms_ema = latency_ms
+        else:
+            self.latency_ms_ema = 0.9 * self.latency_ms_ema + 0.1 * latency_ms
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "latency_ms_avg": round(self.latency_ms_ema, 2) if self.latency_ms_ema is not None else None,
+        }
+
+
+async def _receive_frames(websocket: WebSocket, session: DetectionSession):
+    """Reader: push binary frames into the session until the client disconnects"""
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                session.offer(message["bytes"])
+            elif message.get("text") == "stats":
+                await websocket.send_json({"stats": session.summary()})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        session.close()
+
+
+async def run_detection_session(websocket: WebSocket, detect: DetectFn, stage_executors):
+    """Serve one WebSocket client until it disconnects"""
+    await websocket.accept()
+    session = DetectionSession()
+    reader = asyncio.create_task(_receive_frames(websocket, session))
+    try:
+        while True:
+            frame = await session.next_frame()
+            if frame is None:
+                break
+            index, frame_bytes, received_at = frame
+
+            stats: Dict[str, Any] = {}
+            try:
+                image, scale = await stage_executors.run("decode", decode_for_inference, frame_bytes, stats=stats)
+                detections = scale_detections(await detect(image, stats), scale)
+            except Exception as e:
+                await websocket.send_json({"frame": index, "error": str(e)})
+                continue
+
+            latency_ms = (time.perf_counter() - received_at) * 1000.0
+            session.record_latency(latency_ms)
+            await websocket.send_json({
+                "frame": index,
+                "width": round(image.width * scale[0]),
+                "height": round(image.height * scale[1]),
+                "detections": [detection.model_dump() for detection in detections],
+                "latency_ms": round(latency_ms, 2),
+                "dropped": session.dropped,
+                "stats": stats,
+            })
+    except (WebSocketDisconnect, RuntimeError):
+        # Client went away while we were sending
+        pass
+    finally:
+        reader.cancel()
+        print(f"🔌 WebSocket session closed: {session.summary()}")
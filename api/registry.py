@@ -0,0 +1,267 @@
+"""
+Model registry: several model versions side by side, with atomic hot-swap
+
+Each loaded version has its own batcher and renderer (class labels) and a
+count of requests currently using it. Requests pick a model by name (the
+active version) or by "name:version". Activating a new version swaps the
+name over atomically: new requests go to the new version, requests already
+running finish on the old one, and the old weights are released as soon as
+the last of them is done.
+
+Models are configured with MODELS, a comma-separated list of
+name[:version]=path entries (default: "default=public/models/best.pt").
+"""
+
+import gc
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from renderer import AnnotationRenderer
+
+# Registry settings (overridable via environment)
+MODELS = os.getenv("MODELS", "default=public/models/best.pt")
+DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "default")
+
+
+def parse_model_specs(spec: str) -> List[Tuple[str, Optional[str], str]]:
+    """'a=x.pt,b:v2=y.pt' -> [("a", None, "x.pt"), ("b", "v2", "y.pt")]"""
+    models = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        key, _, path = part.strip().partition("=")
+        name, _, version = key.partition(":")
+        models.append((name, version or None, path))
+    return models
+
+
+def default_version(path: str) -> str:
+    """Short content-derived version id for a weights file"""
+    try:
+        stat = os.stat(path)
+        source = f"{os.path.abspath(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+    except OSError:
+        source = path
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:8]
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process (0 where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def weight_bytes(model: Any) -> Optional[int]:
+    """Size of the model weights: torch parameters + buffers, or the ONNX file"""
+    if model is None:
+        return None
+    network = getattr(model, "model", None)
+    if network is not None and hasattr(network, "parameters"):
+        tensors = list(network.parameters()) + list(network.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    onnx_path = getattr(model, "onnx_path", None)
+    if onnx_path and os.path.exists(onnx_path):
+        return os.path.getsize(onnx_path)
+    return None
+
+
+def free_accelerator_memory():
+    """Return cached GPU memory to the driver if torch is already in use"""
+    import sys
+
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+class ModelVersion:
+    """One loaded model version and everything that is specific to it"""
+
+    def __init__(self, name: str, version: str, path: str, model: Any, info: Dict[str, Any]):
+        self.name = name
+        self.version = version
+        self.path = path
+        self.model = model
+        self.info = info
+        self.renderer = AnnotationRenderer(info.get("labels"))
+        self.batcher = None
+        self.in_flight = 0
+        self.retired = False
+        self.loaded_at = time.time()
+        self.memory: Dict[str, Optional[int]] = {}
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}:{self.version}"
+
+    def describe(self, active: bool) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "version": self.version,
+            "active": active,
+            "retired": self.retired,
+            "in_flight": self.in_flight,
+            "loaded_at": self.loaded_at,
+            "memory": self.memory,
+            **self.info,
+        }
+
+
+class ModelRegistry:
+    """Loaded model versions by name, with one active version per name"""
+
+    def __init__(
+        self,
+        loader: Callable[[str], Tuple[Any, Dict[str, Any]]],
+        batcher_factory: Callable[[ModelVersion], Any],
+        warmup: Optional[Callable[[ModelVersion], None]] = None,
+        default_model: str = DEFAULT_MODEL,
+    ):
+        self.loader = loader
+        self.batcher_factory = batcher_factory
+        self.warmup = warmup
+        self.default_model = default_model
+        self._versions: Dict[str, Dict[str, ModelVersion]] = {}
+        self._active: Dict[str, str] = {}
+        # Retired versions still finishing in-flight requests
+        self._draining: List[ModelVersion] = []
+        self._lock = threading.Lock()
+        # Loads are serialized so RSS deltas are attributable and memory peaks do not stack
+        self._load_lock = threading.Lock()
+
+    def load(self, name: str, path: str, version: Optional[str] = None, activate: bool = True, warm: bool = True) -> ModelVersion:
+        """Load (and warm up) a model version; blocking, so call it from a worker thread"""
+        version = version or default_version(path)
+        with self._load_lock:
+            rss_before = current_rss_bytes()
+            started = time.perf_counter()
+            model, info = self.loader(path)
+            entry = ModelVersion(name, version, path, model, info)
+            entry.batcher = self.batcher_factory(entry)
+            load_s = time.perf_counter() - started
+
+            if warm and self.warmup is not None:
+                started = time.perf_counter()
+                self.warmup(entry)
+                entry.info["warmup_s"] = round(time.perf_counter() - started, 3)
+
+            entry.info["load_s"] = round(load_s, 3)
+            entry.memory = {
+                "weights_bytes": weight_bytes(model),
+                "rss_delta_bytes": max(0, current_rss_bytes() - rss_before) if rss_before else None,
+            }
+
+        with self._lock:
+            previous = self._versions.setdefault(name, {}).get(version)
+            self._versions[name][version] = entry
+            if previous is not None:
+                self._retire(previous)
+        print(f"📦 Loaded model {entry.key} from {path} in {load_s:.2f} s")
+
+        if activate:
+            self.activate(name, version)
+        return entry
+
+    def activate(self, name: str, version: str):
+        """Atomically route new requests for name to version"""
+        with self._lock:
+            if version not in self._versions.get(name, {}):
+                raise KeyError(f"Model {name}:{version} is not loaded")
+            previous = self._active.get(name)
+            self._active[name] = version
+            if previous is not None and previous != version:
+                self._retire(self._versions[name][previous])
+        print(f"🔀 Model {name} now serves version {version}")
+
+    def unload(self, name: str, version: str):
+        """Drop a version (it finishes its in-flight requests first)"""
+        with self._lock:
+            entry = self._versions.get(name, {}).get(version)
+            if entry is None:
+                raise KeyError(f"Model {name}:{version} is not loaded")
+            if self._active.get(name) == version:
+                del self._active[name]
+            self._retire(entry)
+
+    def _retire(self, entry: ModelVersion):
+        """Mark a version for release; called with the lock held"""
+        entry.retired = True
+        versions = self._versions.get(entry.name, {})
+        if versions.get(entry.version) is entry:
+            del versions[entry.version]
+        if entry.in_flight == 0:
+            self._release(entry)
+        else:
+            self._draining.append(entry)
+
+    def _release(self, entry: ModelVersion):
+        """Free a retired version's weights (no request is using it any more)"""
+        if entry.batcher is not None:
+            entry.batcher.close()
+        # Detectors holding outside resources (pool connections, shared memory) release them here
+        close = getattr(entry.model, "close", None)
+        if close is not None:
+            close()
+        entry.model = None
+        entry.batcher = None
+        # Collect in the background: this can run under the registry lock on the request path
+        threading.Thread(target=self._collect, name="model-release", daemon=True).start()
+        print(f"🗑️ Released model {entry.key}")
+
+    @staticmethod
+    def _collect():
+        gc.collect()
+        free_accelerator_memory()
+
+    def resolve(self, spec: Optional[str] = None) -> ModelVersion:
+        """'name' -> its active version, 'name:version' -> that version, None -> the default model"""
+        name, _, version = (spec or self.default_model).partition(":")
+        versions = self._versions.get(name, {})
+        version = version or self._active.get(name)
+        entry = versions.get(version) if version else None
+        if entry is None:
+            raise KeyError(f"Model {spec or self.default_model} is not loaded")
+        return entry
+
+    def acquire(self, spec: Optional[str] = None) -> ModelVersion:
+        """Pin a model version for one request; pair with release()"""
+        with self._lock:
+            entry = self.resolve(spec)
+            entry.in_flight += 1
+            return entry
+
+    def release(self, entry: ModelVersion):
+        with self._lock:
+            entry.in_flight -= 1
+            if entry.retired and entry.in_flight == 0:
+                if entry in self._draining:
+                    self._draining.remove(entry)
+                self._release(entry)
+
+    def versions(self) -> List[ModelVersion]:
+        with self._lock:
+            return [entry for versions in self._versions.values() for entry in versions.values()]
+
+    @property
+    def default(self) -> Optional[ModelVersion]:
+        try:
+            return self.resolve()
+        except KeyError:
+            return None
+
+    def queue_depth(self) -> int:
+        return sum(entry.batcher.queue_depth for entry in self.versions() if entry.batcher is not None)
+
+    def describe(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            loaded = [entry for versions in self._versions.values() for entry in versions.values()]
+            return [
+                entry.describe(not entry.retired and self._active.get(entry.name) == entry.version)
+                for entry in loaded + self._draining
+            ]
@@ -0,0 +1,114 @@
+"""
+Annotation renderer with cached font, palette and label sprites
+
+Created once per server: the font is resolved a single time, and each
+"label (confidence)" tag is rendered once per (class, confidence bucket) into
+a small sprite that is pasted for every later box with the same tag.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Colors for different classes
+DEFAULT_COLORS = [
+    (255, 0, 0),    # Red - fire extinguisher
+    (0, 255, 0),    # Green - toolbox
+    (0, 0, 255),    # Blue - oxygen tank
+    (255, 255, 0),  # Yellow
+    (255, 0, 255),  # Magenta
+    (0, 255, 255),  # Cyan
+    (255, 165, 0),  # Orange
+    (128, 0, 128),  # Purple
+]
+
+# Fonts to try, in order, before falling back to PIL's bitmap font
+FONT_CANDIDATES = ["arial.ttf", "DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"]
+
+
+def load_font(size: int = 16):
+    """Resolve the label font once"""
+    for candidate in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(candidate, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+
+class AnnotationRenderer:
+    """Draws detection boxes and label tags onto images"""
+
+    def __init__(self, labels: Optional[Sequence[str]] = None, colors: Sequence[Tuple[int, int, int]] = DEFAULT_COLORS, font_size: int = 16):
+        self.font = load_font(font_size)
+        self.colors = list(colors)
+        self.labels: List[str] = list(labels or [])
+        self._sprites: Dict[Tuple[int, str], Image.Image] = {}
+        self._lock = threading.Lock()
+
+    def color_for(self, class_id: int) -> Tuple[int, int, int]:
+        return self.colors[class_id % len(self.colors)]
+
+    def label_for(self, class_id: int) -> str:
+        if 0 <= class_id < len(self.labels):
+            return self.labels[class_id]
+        return f"Class {class_id}"
+
+    def sprite(self, class_id: int, confidence: float) -> Image.Image:
+        """Pre-rendered label tag for a class and confidence bucket (2 decimals)"""
+        confidence_text = f"{confidence:.2f}"
+        key = (class_id, confidence_text)
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            return sprite
+
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is None:
+                label_text = f"{self.label_for(class_id)} ({confidence_text})"
+                measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+                text_bbox = measure.textbbox((0, 0), label_text, font=self.font)
+                text_width = text_bbox[2] - text_bbox[0]
+                text_height = text_bbox[3] - text_bbox[1]
+
+                # Background box plus text, same layout as the original per-box drawing
+                sprite = Image.new("RGB", (text_width + 11, text_height + 6), self.color_for(class_id))
+                ImageDraw.Draw(sprite).text((5, 2), label_text, fill=(255, 255, 255), font=self.font)
+                self._sprites[key] = sprite
+        return sprite
+
+    def draw(self, image: Image.Image, detections: List[Any], in_place: bool = False) -> Image.Image:
+        """Draw bounding boxes and labels; copies the image unless in_place is set"""
+        boxes = (
+            (d.bbox.x, d.bbox.y, d.bbox.x + d.bbox.width, d.bbox.y + d.bbox.height, d.confidence, d.class_id)
+            for d in detections
+        )
+        return self.draw_boxes(image, boxes, in_place=in_place)
+
+    def draw_boxes(self, image: Image.Image, boxes: Iterable[Sequence[float]], in_place: bool = False) -> Image.Image:
+        """Same as draw() for plain (x1, y1, x2, y2, confidence, class_id) rows"""
+        if image.mode != "RGB":
+            # Conversion already produces a new image
+            result_image = image.convert("RGB")
+        else:
+            result_image = image if in_place else image.copy()
+        draw = ImageDraw.Draw(result_image)
+
+        for x1, y1, x2, y2, confidence, class_id in boxes:
+            class_id = int(class_id)
+
+            # Draw bounding box
+            draw.rectangle([x1, y1, x2, y2], outline=self.color_for(class_id), width=3)
+
+            # Paste the cached label tag above the box (or inside it at the top edge)
+            sprite = self.sprite(class_id, confidence)
+            text_y = y1 - sprite.height + 1
+            if text_y < 0:
+                text_y = y1 + 5
+            result_image.paste(sprite, (int(round(x1)), int(round(text_y))))
+
+        return result_image
+
+    def info(self) -> Dict[str, Any]:
+        return {"font": getattr(self.font, "path", "default"), "cached_sprites": len(self._sprites)}
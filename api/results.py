@@ -0,0 +1,88 @@
+"""
+Short-lived store of recent detection results
+
+Keeps the encoded source image and its detections for each request so the
+annotated image can be rendered lazily by GET /results/{id}, and caches the
+rendered image (default output options) once someone has asked for it.
+"""
+
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+# Store limits (overridable via environment)
+RESULT_STORE_MAX_ENTRIES = int(os.getenv("RESULT_STORE_MAX_ENTRIES", "256"))
+RESULT_STORE_MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+@dataclass
+class StoredResult:
+    """Source image bytes, detections and (once rendered) the annotated image"""
+    source: bytes
+    detections: List[Any]
+    rendered: Optional[bytes] = None
+    renderer: Any = None  # labels of the model version that produced the detections
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.source) + (len(self.rendered) if self.rendered else 0)
+
+
+class ResultStore:
+    """Bounded LRU of recent results, limited by entry count and bytes"""
+
+    def __init__(self, max_entries: int = RESULT_STORE_MAX_ENTRIES, max_bytes: int = RESULT_STORE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, StoredResult]" = OrderedDict()
+        self._bytes = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def put(self, source: bytes, detections: List[Any], rendered: Optional[bytes] = None, renderer: Any = None) -> Optional[str]:
+        """Store a result and return its id, or None if it alone exceeds max_bytes (it would be evicted at once)"""
+        entry = StoredResult(source=source, detections=detections, rendered=rendered, renderer=renderer)
+        if entry.nbytes > self.max_bytes:
+            with self._lock:
+                self.rejected += 1
+            return None
+        result_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[result_id] = entry
+            self._bytes += entry.nbytes
+            self._evict()
+        return result_id
+
+    def get(self, result_id: str) -> Optional[StoredResult]:
+        """Look up a result and mark it as recently used"""
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is not None:
+                self._entries.move_to_end(result_id)
+            return entry
+
+    def set_rendered(self, result_id: Optional[str], rendered: bytes):
+        """Attach the rendered image to an existing result (skipped if that would push it over max_bytes)"""
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is None or entry.rendered is not None or entry.nbytes + len(rendered) > self.max_bytes:
+                return
+            # Most recently used, so its own growth does not evict it
+            self._entries.move_to_end(result_id)
+            entry.rendered = rendered
+            self._bytes += len(rendered)
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until within limits (lock held)"""
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self._bytes -= entry.nbytes
+
+    def info(self):
+        """Current size of the store"""
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "rejected": self.rejected}
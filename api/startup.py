@@ -0,0 +1,121 @@
+"""
+Background model loading, warm-up and readiness tracking
+
+The server starts answering liveness checks right away while the model is
+imported, loaded and warmed up in a background thread. Warm-up runs a few
+dummy inferences at the expected input sizes so kernel selection and
+allocator growth happen before the first real request. Readiness only turns
+true once all of that is done, so a load balancer or autoscaler never routes
+traffic to a cold instance.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+# Warm-up settings (overridable via environment)
+# Sizes are the images handed to the model, i.e. already downscaled to the decode target
+WARMUP_SIZES = os.getenv("WARMUP_SIZES", "640x480,480x640,640x640")
+WARMUP_RUNS = int(os.getenv("WARMUP_RUNS", "2"))
+
+def parse_sizes(spec: str) -> List[Tuple[int, int]]:
+    """'640x480,480x640' -> [(640, 480), (480, 640)]"""
+    sizes = []
+    for part in spec.split(","):
+        if part.strip():
+            width, height = (int(v) for v in part.strip().lower().split("x"))
+            sizes.append((width, height))
+    return sizes
+
+
+def warmup_images(sizes: List[Tuple[int, int]]) -> List[Image.Image]:
+    """Mid-grey dummy frames (no detections, but the full forward pass runs)"""
+    return [Image.new("RGB", size, (114, 114, 114)) for size in sizes]
+
+
+def run_warmup(warmup: Callable[[List[Image.Image]], Any], sizes: List[Tuple[int, int]], runs: int = WARMUP_RUNS):
+    """Call warmup with one dummy frame per size, runs times over"""
+    images = warmup_images(sizes)
+    for _ in range(runs):
+        for image in images:
+            warmup([image])
+
+
+class ModelLifecycle:
+    """Loads and warms the model in a background thread and tracks readiness"""
+
+    def __init__(
+        self,
+        load: Callable[[], Any],
+        warmup: Callable[[List[Image.Image]], Any],
+        process_started: float,
+        sizes: str = WARMUP_SIZES,
+        runs: int = WARMUP_RUNS,
+        on_ready: Optional[Callable[[Dict[str, float]], None]] = None,
+    ):
+        self.load = load
+        self.warmup = warmup
+        self.process_started = process_started
+        self.sizes = parse_sizes(sizes)
+        self.runs = runs
+        self.on_ready = on_ready
+        self.phase = "starting"  # -> loading -> warming_up -> ready (or failed)
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def mark(self, name: str, seconds: float):
+        self.timings[name] = round(seconds, 3)
+
+    def start(self):
+        """Begin loading in the background (idempotent)"""
+        if self._thread is None and not self.ready:
+            self._thread = threading.Thread(target=self._run, name="model-loader", daemon=True)
+            self._thread.start()
+
+    def run(self) -> bool:
+        """Load and warm up in the calling thread (for launchers that need the model before forking)"""
+        self._run()
+        return self.ready
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def _run(self):
+        try:
+            self.phase = "loading"
+            started = time.perf_counter()
+            self.load()
+            self.mark("model_load_s", time.perf_counter() - started)
+
+            if self.runs > 0 and self.sizes:
+                self.phase = "warming_up"
+                started = time.perf_counter()
+                run_warmup(self.warmup, self.sizes, self.runs)
+                self.mark("warmup_s", time.perf_counter() - started)
+                print(f"🔥 Warm-up done: {self.runs} x {len(self.sizes)} sizes in {self.timings['warmup_s']:.2f} s")
+
+            self.mark("ready_after_s", time.perf_counter() - self.process_started)
+            self.phase = "ready"
+            self._ready.set()
+            print(f"✅ Ready after {self.timings['ready_after_s']:.2f} s: {self.timings}")
+            if self.on_ready is not None:
+                self.on_ready(self.timings)
+        except Exception as e:
+            self.phase = "failed"
+            self.error = str(e)
+            print(f"❌ Model startup failed: {e}")
+
+    def status(self) -> Dict[str, Any]:
+        status = {"ready": self.ready, "phase": self.phase, "timings": dict(self.timings)}
+        if self.error:
+            status["error"] = self.error
+        return status
@@ -0,0 +1,177 @@
+"""
+Tiled inference for images much larger than the model input
+
+Downscaling a 4000 px capture to the 640 px model input shrinks small parts
+(valves, extinguisher tags) to a few pixels. In tiled mode the full-resolution
+image is cut into overlapping model-sized tiles, every tile goes through the
+model (the tiles of one image form a batch together), and the per-tile boxes
+are shifted back to image coordinates and merged:
+
+  - an optional downscaled pass over the whole image still catches objects
+    larger than a tile
+  - overlapping boxes of the same class are merged greedily, highest
+    confidence first; with the default "ios" metric (intersection over the
+    smaller box) a fragment cut off at a tile seam counts as a duplicate of
+    the box it belongs to, and the kept box grows to cover its fragments
+"""
+
+import math
+import os
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from image_io import downscale_for_inference
+from onnx_backend import BoxArrays
+
+# Tiling settings (overridable via environment)
+TILE_SIZE = int(os.getenv("TILE_SIZE", "0"))  # 0 = the model input size
+TILE_OVERLAP = float(os.getenv("TILE_OVERLAP", "0.2"))  # fraction of the tile shared with its neighbour
+TILE_MAX_TILES = int(os.getenv("TILE_MAX_TILES", "64"))  # larger images are downscaled until the grid fits
+TILE_GLOBAL_PASS = os.getenv("TILE_GLOBAL_PASS", "1") == "1"
+TILE_MERGE_METRIC = os.getenv("TILE_MERGE_METRIC", "ios").lower()  # "ios" or "iou"
+TILE_MERGE_THRESHOLD = float(os.getenv("TILE_MERGE_THRESHOLD", "0.5"))
+TILE_MERGE_BOXES = os.getenv("TILE_MERGE_BOXES", "1") == "1"  # grow kept boxes over the ones they suppress
+
+if TILE_MAX_TILES < 1:
+    raise ValueError(f"TILE_MAX_TILES must be at least 1, got {TILE_MAX_TILES}")
+
+Tile = Tuple[int, int, int, int]  # x1, y1, x2, y2 in image pixels
+TileOffset = Tuple[float, float, float, float]  # x, y, scale_x, scale_y: tile pixels -> image pixels
+
+
+def tile_starts(length: int, tile_size: int, overlap: float) -> List[int]:
+    """Evenly spread tile offsets along one axis, first and last flush with the edges"""
+    if length <= tile_size:
+        return [0]
+    stride = max(1, int(tile_size * (1.0 - overlap)))
+    count = math.ceil((length - tile_size) / stride) + 1
+    return [round(index * (length - tile_size) / (count - 1)) for index in range(count)]
+
+
+def tile_grid(size: Tuple[int, int], tile_size: int, overlap: float = TILE_OVERLAP) -> List[Tile]:
+    """Overlapping tiles covering an image of the given (width, height)"""
+    width, height = size
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in tile_starts(height, tile_size, overlap)
+        for x in tile_starts(width, tile_size, overlap)
+    ]
+
+
+def fit_tile_grid(
+    image: Image.Image, tile_size: int, overlap: float = TILE_OVERLAP, max_tiles: int = TILE_MAX_TILES
+) -> Tuple[Image.Image, float, List[Tile]]:
+    """Tile grid for the image, downscaling it first if it would need more than max_tiles; returns (image, scale, tiles)"""
+    if max_tiles < 1:
+        raise ValueError(f"max_tiles must be at least 1, got {max_tiles}")
+    tiles = tile_grid(image.size, tile_size, overlap)
+    scale = 1.0
+    while len(tiles) > max_tiles:
+        # Shrink by the missing factor per axis, then re-check (tile counts round up)
+        scale *= math.sqrt(max_tiles / len(tiles))
+        tiles = tile_grid((max(1, round(image.width * scale)), max(1, round(image.height * scale))), tile_size, overlap)
+    if scale != 1.0:
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.BILINEAR, reducing_gap=2.0)
+    return image, scale, tiles
+
+
+def crop_tiles(image: Image.Image, tiles: Sequence[Tile]) -> List[Image.Image]:
+    """Tile images for inference (fully loaded, so they are safe to hand to other threads)"""
+    crops = []
+    for tile in tiles:
+        crop = image.crop(tile)
+        crop.load()
+        crops.append(crop)
+    return crops
+
+
+def prepare_tiles(
+    image: Image.Image,
+    tile_size: int,
+    overlap: float = TILE_OVERLAP,
+    max_tiles: int = TILE_MAX_TILES,
+    global_pass: bool = TILE_GLOBAL_PASS,
+) -> Tuple[List[Image.Image], List[TileOffset]]:
+    """Model inputs for tiled inference and, per input, how to map its boxes back to the image"""
+    tiled_image, scale, tiles = fit_tile_grid(image, tile_size, overlap, max_tiles)
+    crops = crop_tiles(tiled_image, tiles)
+    offsets = [(x1 / scale, y1 / scale, 1.0 / scale, 1.0 / scale) for x1, y1, _, _ in tiles]
+    if global_pass and len(tiles) > 1:
+        overview, (scale_x, scale_y) = downscale_for_inference(image, tile_size)
+        crops.append(overview)
+        offsets.append((0.0, 0.0, scale_x, scale_y))
+    return crops, offsets
+
+
+def overlap_ratio(box: np.ndarray, boxes: np.ndarray, metric: str) -> np.ndarray:
+    """IoU or intersection-over-smaller of one xyxy box against many"""
+    x1 = np.maximum(box[0], boxes[:, 0])
+    y1 = np.maximum(box[1], boxes[:, 1])
+    x2 = np.minimum(box[2], boxes[:, 2])
+    y2 = np.minimum(box[3], boxes[:, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    if metric == "ios":
+        return intersection / np.maximum(np.minimum(area, areas), 1e-9)
+    return intersection / np.maximum(area + areas - intersection, 1e-9)
+
+
+def merge_boxes(
+    xyxy: np.ndarray,
+    conf: np.ndarray,
+    cls: np.ndarray,
+    metric: str = TILE_MERGE_METRIC,
+    threshold: float = TILE_MERGE_THRESHOLD,
+    grow: bool = TILE_MERGE_BOXES,
+) -> BoxArrays:
+    """Class-aware greedy merge of duplicate boxes from overlapping tiles"""
+    if metric not in ("ios", "iou"):
+        raise ValueError(f"Unknown merge metric {metric!r}, expected 'ios' or 'iou'")
+    merged_xyxy, merged_conf, merged_cls = [], [], []
+    # Per class instead of a coordinate offset: full-resolution coordinates have no fixed upper bound
+    for class_id in np.unique(cls):
+        indices = np.flatnonzero(cls == class_id)
+        boxes = xyxy[indices]
+        order = np.argsort(-conf[indices], kind="stable")
+        while order.size:
+            best = order[0]
+            overlaps = overlap_ratio(boxes[best], boxes[order[1:]], metric)
+            suppressed = order[1:][overlaps > threshold]
+            box = boxes[best].copy()
+            if grow and suppressed.size:
+                box[:2] = np.minimum(box[:2], boxes[suppressed, :2].min(axis=0))
+                box[2:] = np.maximum(box[2:], boxes[suppressed, 2:].max(axis=0))
+            merged_xyxy.append(box)
+            merged_conf.append(conf[indices[best]])
+            merged_cls.append(class_id)
+            order = order[1:][overlaps <= threshold]
+    if not merged_xyxy:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int64)
+    order = np.argsort(-np.asarray(merged_conf), kind="stable")
+    return (
+        np.asarray(merged_xyxy, dtype=np.float32)[order],
+        np.asarray(merged_conf, dtype=np.float32)[order],
+        np.asarray(merged_cls, dtype=np.int64)[order],
+    )
+
+
+def merge_tile_outputs(
+    outputs: Sequence[BoxArrays],
+    offsets: Sequence[TileOffset],
+    metric: str = TILE_MERGE_METRIC,
+    threshold: float = TILE_MERGE_THRESHOLD,
+    grow: bool = TILE_MERGE_BOXES,
+) -> BoxArrays:
+    """Map each tile's boxes into image pixels and merge them"""
+    shifted = [
+        np.asarray(xyxy, dtype=np.float32).reshape(-1, 4) * np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+        + np.array([x, y, x, y], dtype=np.float32)
+        for (xyxy, _, _), (x, y, scale_x, scale_y) in zip(outputs, offsets)
+    ]
+    xyxy = np.concatenate(shifted) if shifted else np.zeros((0, 4), np.float32)
+    conf = np.concatenate([np.asarray(c, dtype=np.float32).reshape(-1) for _, c, _ in outputs]) if outputs else np.zeros(0, np.float32)
+    cls = np.concatenate([np.asarray(k).astype(np.int64).reshape(-1) for _, _, k in outputs]) if outputs else np.zeros(0, np.int64)
+    return merge_boxes(xyxy, conf, cls, metric, threshold, grow)
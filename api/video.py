@@ -0,0 +1,353 @@
+"""
+Video and frame-stream detection helpers
+
+Frames are decoded one at a time and detections are streamed back as NDJSON
+(one JSON object per line), so neither the input nor the output is ever held
+in memory as a whole. Two sources are supported:
+
+  - MJPEG / concatenated JPEG streams (multipart/x-mixed-replace,
+    video/x-motion-jpeg, image/jpeg): frames are cut out of the request body
+    as it arrives by walking the JPEG marker segments from SOI to the EOI
+    that follows the entropy-coded data (an EXIF thumbnail has its own EOI).
+  - Video files (mp4, avi, ...): the body is spooled to a temporary file and
+    read with OpenCV, which ultralytics already depends on.
+
+A stride selects which frames are run through the model: every Nth frame, or
+(stride=0) an adaptive stride that follows inference time vs. frame rate.
+"""
+
+import importlib.util
+import json
+import math
+import os
+import tempfile
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from PIL import Image
+from starlette.responses import StreamingResponse
+
+from image_io import Scale, decode_for_inference
+from postprocess import scale_detections
+
+# OpenCV is only imported once a video file is actually opened
+CV2_AVAILABLE = importlib.util.find_spec("cv2") is not None
+
+# Stream settings (overridable via environment)
+MAX_FRAME_BYTES = int(os.getenv("MAX_FRAME_BYTES", str(16 * 1024 * 1024)))
+MAX_ADAPTIVE_STRIDE = int(os.getenv("MAX_ADAPTIVE_STRIDE", "30"))
+
+MJPEG_CONTENT_TYPES = ("multipart/x-mixed-replace", "video/x-motion-jpeg", "video/mjpeg", "image/jpeg")
+
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+
+DetectFn = Callable[[Image.Image], Awaitable[List[Any]]]
+
+
+def is_mjpeg(content_type: str) -> bool:
+    return content_type.split(";")[0].strip().lower() in MJPEG_CONTENT_TYPES
+
+
+class FrameStride:
+    """Decides which frames get inference: fixed every-Nth, or adaptive (stride=0)"""
+
+    def __init__(self, stride: int = 1, max_stride: int = MAX_ADAPTIVE_STRIDE):
+        self.adaptive = stride <= 0
+        self.stride = max(1, stride)
+        self.max_stride = max_stride
+        self.frame_interval_s: Optional[float] = None
+        self.inference_s: Optional[float] = None
+        self._next_index = 0
+        self._last_arrival: Optional[float] = None
+
+    def set_fps(self, fps: float):
+        """Known source frame rate (video files)"""
+        if fps and fps > 0:
+            self.frame_interval_s = 1.0 / fps
+
+    def observe_arrival(self, arrival_s: float):
+        """Estimate the frame interval of a live stream from arrival times"""
+        if self._last_arrival is not None:
+            interval = max(arrival_s - self._last_arrival, 1e-4)
+            if self.frame_interval_s is None:
+                self.frame_interval_s = interval
+            else:
+                self.frame_interval_s = 0.8 * self.frame_interval_s + 0.2 * interval
+        self._last_arrival = arrival_s
+
+    def observe_inference(self, seconds: float):
+        """Feed back how long the last processed frame took"""
+        self.inference_s = seconds if self.inference_s is None else 0.8 * self.inference_s + 0.2 * seconds
+        if self.adaptive and self.frame_interval_s:
+            self.stride = min(self.max_stride, max(1, math.ceil(self.inference_s / self.frame_interval_s)))
+
+    def should_process(self, index: int) -> bool:
+        if index < self._next_index:
+            return False
+        self._next_index = index + self.stride
+        return True
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """Streaming response that leaves the request body to the endpoint
+
+    Starlette's StreamingResponse listens for client disconnects by calling
+    receive(), which would swallow request body chunks we are still reading
+    frame by frame. Disconnects surface as send errors instead.
+
+    The background task is the request's teardown (release the model version,
+    remove spooled files): it runs exactly once, even if the client is gone
+    before the body generator ever started and its own finally never runs.
+    """
+
+    media_type = "application/x-ndjson"
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            async for chunk in self.body_iterator:
+                if not isinstance(chunk, bytes):
+                    chunk = chunk.encode(self.charset)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await self.body_iterator.aclose()
+            background, self.background = self.background, None
+            if background is not None:
+                await background()
+
+
+def ndjson_line(payload: dict) -> bytes:
+    return (json.dumps(payload) + "\n").encode("utf-8")
+
+
+def scan_jpeg(buffer: bytearray, pos: int, in_scan: bool) -> Tuple[int, int, bool]:
+    """Walk JPEG markers from pos; returns (offset after the EOI or -1, resume pos, resume in_scan)
+
+    Marker segments are skipped by their length, so EOI bytes inside them (an
+    embedded EXIF thumbnail) do not end the frame. After SOS the entropy-coded
+    data is scanned for the next real marker (not FF00 stuffing or RSTn).
+    """
+    size = len(buffer)
+    while True:
+        if in_scan:
+            ff = buffer.find(b"\xff", pos)
+            if ff < 0 or ff + 1 >= size:
+                return -1, size if ff < 0 else ff, True
+            marker = buffer[ff + 1]
+            if marker == 0xFF:
+                pos = ff + 1  # fill byte
+            elif marker == 0x00 or 0xD0 <= marker <= 0xD7:
+                pos = ff + 2
+            else:
+                pos, in_scan = ff, False
+            continue
+        if pos + 2 > size:
+            return -1, pos, False
+        if buffer[pos] != 0xFF:
+            # Corrupt segment: resynchronize on the next marker
+            in_scan = True
+            continue
+        marker = buffer[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+        elif marker == JPEG_EOI[1]:
+            return pos + 2, pos + 2, False
+        elif marker == JPEG_SOI[1] and pos > 0:
+            # A new frame starts: this one was truncated, hand it over as is (it fails to decode)
+            return pos, pos, False
+        elif marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            pos += 2
+        else:
+            if pos + 4 > size:
+                return -1, pos, False
+            length = (buffer[pos + 2] << 8) | buffer[pos + 3]
+            if pos + 2 + length > size:
+                return -1, pos, False
+            pos += 2 + length
+            in_scan = marker == 0xDA  # SOS: entropy-coded data follows
+
+
+async def iter_mjpeg_frames(chunks: AsyncIterator[bytes], max_frame_bytes: int = MAX_FRAME_BYTES) -> AsyncIterator[bytes]:
+    """Cut complete JPEG frames out of a byte stream as they arrive"""
+    buffer = bytearray()
+    # While a frame is being assembled the buffer starts at its SOI and pos is where parsing resumes
+    in_frame, pos, in_scan = False, 0, False
+    async for chunk in chunks:
+        buffer += chunk
+        while True:
+            if not in_frame:
+                start = buffer.find(JPEG_SOI)
+                if start < 0:
+                    # Keep a trailing 0xFF in case the marker is split across chunks
+                    del buffer[:max(0, len(buffer) - 1)]
+                    break
+                del buffer[:start]
+                in_frame, pos, in_scan = True, len(JPEG_SOI), False
+            end, pos, in_scan = scan_jpeg(buffer, pos, in_scan)
+            if end < 0:
+                if len(buffer) > max_frame_bytes:
+                    raise ValueError(f"Frame larger than {max_frame_bytes} bytes")
+                break
+            yield bytes(buffer[:end])
+            del buffer[:end]
+            in_frame = False
+
+
+async def spool_to_tempfile(chunks: AsyncIterator[bytes], suffix: str = ".video") -> str:
+    """Write a request body to a temporary file chunk by chunk; returns its path (removed again if the upload fails)"""
+    handle = tempfile.NamedTemporaryFile(prefix="detect_video_", suffix=suffix, delete=False)
+    try:
+        async for chunk in chunks:
+            handle.write(chunk)
+    except BaseException:
+        handle.close()
+        remove_file(handle.name)
+        raise
+    handle.close()
+    return handle.name
+
+
+def remove_file(path: str):
+    """Remove a spooled file (response teardown; already gone is fine)"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class VideoFileReader:
+    """Sequential OpenCV frame reader; grab() skips cheaply, retrieve() decodes"""
+
+    def __init__(self, path: str):
+        if not CV2_AVAILABLE:
+            raise RuntimeError("OpenCV (cv2) is required for video files")
+        import cv2
+
+        self.cv2 = cv2
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise ValueError("Could not open video")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 0.0
+
+    def grab(self) -> bool:
+        return self.capture.grab()
+
+    def retrieve(self) -> Optional[Image.Image]:
+        ok, frame = self.capture.retrieve()
+        if not ok:
+            return None
+        return Image.fromarray(self.cv2.cvtColor(frame, self.cv2.COLOR_BGR2RGB))
+
+    def position_ms(self) -> float:
+        return self.capture.get(self.cv2.CAP_PROP_POS_MSEC)
+
+    def close(self):
+        self.capture.release()
+
+
+async def _detect_frame(
+    detect: DetectFn,
+    image: Image.Image,
+    stride: FrameStride,
+    index: int,
+    timestamp_ms: float,
+    skipped: int,
+    scale: Scale = (1.0, 1.0),
+) -> bytes:
+    """Run detection for one frame and format its NDJSON line (boxes in original frame pixels)"""
+    started = time.perf_counter()
+    detections = scale_detections(await detect(image), scale)
+    elapsed = time.perf_counter() - started
+    stride.observe_inference(elapsed)
+    return ndjson_line({
+        "frame": index,
+        "timestamp_ms": round(timestamp_ms, 2),
+        "width": round(image.width * scale[0]),
+        "height": round(image.height * scale[1]),
+        "skipped": skipped,
+        "stride": stride.stride,
+        "latency_ms": round(elapsed * 1000.0, 2),
+        "detections": [detection.model_dump() for detection in detections],
+    })
+
+
+async def detect_mjpeg_stream(
+    chunks: AsyncIterator[bytes],
+    detect: DetectFn,
+    stage_executors,
+    stride: FrameStride,
+    max_frames: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """NDJSON detections for an MJPEG / concatenated-JPEG stream; undecodable frames are skipped and counted"""
+    received = processed = skipped = failed = 0
+    stream_start = time.perf_counter()
+    try:
+        async for frame_bytes in iter_mjpeg_frames(chunks):
+            index = received
+            received += 1
+            now = time.perf_counter()
+            stride.observe_arrival(now)
+            if not stride.should_process(index):
+                # Skipped frames are never decoded
+                skipped += 1
+                continue
+            try:
+                image, scale = await stage_executors.run("decode", decode_for_inference, frame_bytes)
+                line = await _detect_frame(detect, image, stride, index, (now - stream_start) * 1000.0, skipped, scale)
+            except Exception as e:
+                failed += 1
+                print(f"⚠️ Skipping frame {index}: {e}")
+                continue
+            yield line
+            processed += 1
+            skipped = 0
+            if max_frames and processed >= max_frames:
+                break
+    except Exception as e:
+        yield ndjson_line({"error": str(e)})
+    yield ndjson_line({"done": True, "frames_received": received, "frames_processed": processed, "frames_failed": failed})
+
+
+async def detect_video_file(
+    path: str,
+    detect: DetectFn,
+    stage_executors,
+    stride: FrameStride,
+    max_frames: Optional[int] = None,
+) -> AsyncIterator[bytes]:
+    """NDJSON detections for a spooled video file (failed frames are skipped and counted)"""
+    received = processed = skipped = failed = 0
+    reader = None
+    try:
+        reader = await stage_executors.run("open_video", VideoFileReader, path)
+        stride.set_fps(reader.fps)
+        while True:
+            if not await stage_executors.run("grab", reader.grab):
+                break
+            index = received
+            received += 1
+            if not stride.should_process(index):
+                skipped += 1
+                continue
+            image = await stage_executors.run("decode", reader.retrieve)
+            if image is None:
+                break
+            try:
+                line = await _detect_frame(detect, image, stride, index, reader.position_ms(), skipped)
+            except Exception as e:
+                failed += 1
+                print(f"⚠️ Skipping frame {index}: {e}")
+                continue
+            yield line
+            processed += 1
+            skipped = 0
+            if max_frames and processed >= max_frames:
+                break
+    except Exception as e:
+        yield ndjson_line({"error": str(e)})
+    finally:
+        if reader is not None:
+            reader.close()
+    yield ndjson_line({"done": True, "frames_received": received, "frames_processed": processed, "frames_failed": failed})
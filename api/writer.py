@@ -0,0 +1,186 @@
+"""
+Background writer for processed images in output_results/
+
+Requests only enqueue the already-encoded image bytes; a single background
+thread writes them to disk. The queue is bounded (full -> the result is
+dropped and counted), a sampling rate controls which results are kept at all,
+and a retention policy (max files / max bytes / max age) evicts the oldest
+results so the volume never fills up. Retention runs when the thread starts,
+after writes, and every RETENTION_CHECK_INTERVAL_S while idle.
+"""
+
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+# Writer settings (overridable via environment)
+RESULTS_DIR = os.getenv("RESULTS_DIR", "output_results")
+SAVE_QUEUE_SIZE = int(os.getenv("SAVE_QUEUE_SIZE", "64"))
+SAVE_SAMPLE_RATE = float(os.getenv("SAVE_SAMPLE_RATE", "1.0"))
+RETENTION_MAX_FILES = int(os.getenv("RETENTION_MAX_FILES", "1000"))
+RETENTION_MAX_BYTES = int(os.getenv("RETENTION_MAX_BYTES", str(512 * 1024 * 1024)))
+RETENTION_MAX_AGE_S = float(os.getenv("RETENTION_MAX_AGE_S", str(7 * 24 * 3600)))
+RETENTION_CHECK_INTERVAL_S = float(os.getenv("RETENTION_CHECK_INTERVAL_S", "30"))
+
+RESULT_PREFIX = "result_"
+RESULT_SUFFIX = ".jpg"
+# Every suffix the writer produces (see output_image.FORMATS); retention covers them all
+RESULT_SUFFIXES = (".jpg", ".webp", ".png")
+
+
+class ResultWriter:
+    """Bounded queue + background thread that persists processed images"""
+
+    def __init__(
+        self,
+        output_dir: str = RESULTS_DIR,
+        queue_size: int = SAVE_QUEUE_SIZE,
+        sample_rate: float = SAVE_SAMPLE_RATE,
+        max_files: int = RETENTION_MAX_FILES,
+        max_bytes: int = RETENTION_MAX_BYTES,
+        max_age_s: float = RETENTION_MAX_AGE_S,
+        check_interval_s: float = RETENTION_CHECK_INTERVAL_S,
+        metrics=None,
+    ):
+        self.output_dir = output_dir
+        self.metrics = metrics
+        self.sample_rate = sample_rate
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.check_interval_s = check_interval_s
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._last_retention = 0.0
+        self.counters = {
+            "queued": 0,
+            "written": 0,
+            "sampled_out": 0,
+            "dropped": 0,
+            "failed": 0,
+            "evicted": 0,
+        }
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def start(self):
+        """Start the background thread (idempotent)"""
+        if self._thread is None or not self._thread.is_alive():
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, image_bytes: bytes, suffix: str = RESULT_SUFFIX) -> Optional[str]:
+        """Queue an encoded image for saving; returns the target path or None if skipped"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self._count("sampled_out")
+            return None
+
+        self.start()
+        output_path = os.path.join(self.output_dir, f"{RESULT_PREFIX}{uuid.uuid4().hex}{suffix}")
+        try:
+            self._queue.put_nowait((output_path, image_bytes))
+        except queue.Full:
+            self._count("dropped")
+            return None
+        self._count("queued")
+        return output_path
+
+    def stop(self, timeout: float = 10.0):
+        """Flush pending writes and stop the thread"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            # Never block the caller (the event loop on shutdown): queue the sentinel once the writer frees a slot
+            threading.Thread(target=self._queue.put, args=(None,), name="result-writer-stop", daemon=True).start()
+        self._thread.join(timeout)
+
+    def _run(self):
+        # Results left over from earlier runs may already be past their max age
+        self.enforce_retention()
+        while True:
+            try:
+                # Wake up while idle too, so results still age out on a quiet server
+                item = self._queue.get(timeout=max(self.check_interval_s, 1.0))
+            except queue.Empty:
+                self.enforce_retention()
+                continue
+            if item is None:
+                break
+            output_path, image_bytes = item
+            started = time.perf_counter()
+            try:
+                # Write to a temp name first so readers never see partial files
+                tmp_path = output_path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(image_bytes)
+                os.replace(tmp_path, output_path)
+                self._count("written")
+                if self.metrics is not None:
+                    self.metrics.observe_stage("disk_save", (time.perf_counter() - started) * 1000.0)
+            except OSError as e:
+                self._count("failed")
+                print(f"❌ Could not save {output_path}: {e}")
+
+            if time.monotonic() - self._last_retention >= self.check_interval_s:
+                self.enforce_retention()
+
+    def enforce_retention(self):
+        """Evict results that are too old, then the oldest until within file/byte limits"""
+        self._last_retention = time.monotonic()
+        try:
+            files = [
+                entry for entry in os.scandir(self.output_dir)
+                if entry.is_file() and entry.name.startswith(RESULT_PREFIX) and entry.name.endswith(RESULT_SUFFIXES)
+            ]
+        except OSError:
+            return
+
+        files = [(entry.stat(), entry.path) for entry in files]
+        files.sort(key=lambda item: item[0].st_mtime)
+        total_bytes = sum(stat.st_size for stat, _ in files)
+        remaining = len(files)
+        cutoff = time.time() - self.max_age_s
+        evicted = 0
+
+        for stat, path in files:
+            too_old = stat.st_mtime < cutoff
+            over_limit = remaining > self.max_files or total_bytes > self.max_bytes
+            if not (too_old or over_limit):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            remaining -= 1
+            total_bytes -= stat.st_size
+            evicted += 1
+
+        if evicted:
+            self._count("evicted", evicted)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "queue_depth": self._queue.qsize(),
+            "output_dir": self.output_dir,
+            "sample_rate": self.sample_rate,
+            "max_files": self.max_files,
+            "max_bytes": self.max_bytes,
+            "max_age_s": self.max_age_s,
+        }
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: per-box vs vectorized YOLO box conversion
+
+Compares the original per-box loop (int(box.cls[0]), float(box.conf[0]),
+box.xyxy[0].cpu().numpy() and a validated BoundingBox/Detection per box)
+against the server's vectorized path (boxes_to_arrays + build_detections)
+at 10/100/1000 boxes.
+
+Uses real ultralytics Boxes on torch tensors when available, otherwise a
+NumPy stand-in with the same indexing interface.
+
+Usage: python benchmarks/box-conversion.py [--repeat 200]
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+class NumpyTensor(np.ndarray):
+    """ndarray with the .cpu()/.numpy() calls the legacy loop makes"""
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return np.asarray(self)
+
+
+class NumpyBoxes:
+    """Minimal stand-in for ultralytics.engine.results.Boxes"""
+
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=np.float32).view(NumpyTensor)
+
+    @property
+    def xyxy(self):
+        return self.data[:, :4]
+
+    @property
+    def conf(self):
+        return self.data[:, -2]
+
+    @property
+    def cls(self):
+        return self.data[:, -1]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        return (NumpyBoxes(self.data[i:i + 1]) for i in range(len(self.data)))
+
+
+class FakeResult:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+def make_boxes(n, seed=0):
+    """Random boxes in a 1280x720 frame, [x1, y1, x2, y2, conf, cls]"""
+    rng = np.random.default_rng(seed)
+    xy = rng.uniform(0, 1000, size=(n, 2))
+    wh = rng.uniform(10, 200, size=(n, 2))
+    conf = rng.uniform(0.25, 1.0, size=(n, 1))
+    cls = rng.integers(0, 3, size=(n, 1))
+    data = np.hstack([xy, xy + wh, conf, cls]).astype(np.float32)
+    try:
+        import torch
+        from ultralytics.engine.results import Boxes
+        return Boxes(torch.from_numpy(data), (720, 1280)), "torch"
+    except ImportError:
+        return NumpyBoxes(data), "numpy"
+
+
+def legacy_result_to_detections(result, Detection, BoundingBox):
+    """The original per-box conversion, kept here as the baseline"""
+    detections = []
+    boxes = result.boxes
+    if boxes is not None:
+        for box in boxes:
+            class_id = int(box.cls[0])
+            confidence = float(box.conf[0])
+            xyxy = box.xyxy[0].cpu().numpy()
+            x1, y1, x2, y2 = xyxy
+            bbox = BoundingBox(
+                x=float(x1),
+                y=float(y1),
+                width=float(x2 - x1),
+                height=float(y2 - y1)
+            )
+            detections.append(Detection(class_id=class_id, confidence=confidence, bbox=bbox))
+    return detections
+
+
+def time_per_call(fn, repeat):
+    """Best-of-3 mean time per call in microseconds"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Box conversion microbenchmark")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--sizes", default="10,100,1000")
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    sys.path.insert(0, str(REPO_ROOT / "api"))
+    spec = importlib.util.spec_from_file_location("bench_server", REPO_ROOT / "api" / "main.py")
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+    from postprocess import boxes_to_arrays, build_detections
+
+    def result_to_detections(result):
+        return build_detections(*boxes_to_arrays(result.boxes), server.detections_adapter)
+
+    print(f"{'boxes':>6}{'backend':>9}{'per-box us':>13}{'vectorized us':>15}{'speedup':>9}")
+    for n in (int(size) for size in args.sizes.split(",")):
+        boxes, backend = make_boxes(n)
+        result = FakeResult(boxes)
+
+        legacy = legacy_result_to_detections(result, server.Detection, server.BoundingBox)
+        fast = result_to_detections(result)
+        assert [d.model_dump() for d in legacy] == [d.model_dump() for d in fast], "conversion mismatch"
+
+        repeat = max(5, args.repeat * 10 // max(n, 10))
+        legacy_us = time_per_call(
+            lambda: legacy_result_to_detections(result, server.Detection, server.BoundingBox), repeat)
+        fast_us = time_per_call(lambda: result_to_detections(result), repeat)
+        print(f"{n:>6}{backend:>9}{legacy_us:>13.1f}{fast_us:>15.1f}{legacy_us / fast_us:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
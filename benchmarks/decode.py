@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full-resolution decode vs reduced-size draft decode for inference
+
+For each image (default: a synthetic 12MP JPEG) measures
+  - full:  Image.open + load at native resolution, then resize to 640 (old path)
+  - draft: decode_for_inference (JPEG DCT scaling + downscale to 640)
+
+Each variant runs in a fresh subprocess so its peak RSS is not polluted by
+the other one.
+
+Usage: python benchmarks/decode.py [image_path ...] [--repeat 10] [--size 4000x3000]
+"""
+
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "api"))
+
+from image_io import DECODE_TARGET_SIZE, decode_for_inference, decode_image_bytes, downscale_for_inference  # noqa: E402
+
+
+def decode_full(image_data: bytes):
+    """The original path: decode everything, let the model resize"""
+    return downscale_for_inference(decode_image_bytes(image_data), DECODE_TARGET_SIZE)
+
+
+VARIANTS = {"full": decode_full, "draft": decode_for_inference}
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process"""
+    # VmHWM starts fresh at exec; ru_maxrss would inherit the parent's peak on Linux
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def run_worker(variant: str, path: str, repeat: int):
+    """Child process: time one decode variant and report JSON on stdout"""
+    image_data = Path(path).read_bytes()
+    baseline_mb = peak_rss_mb()
+    decode = VARIANTS[variant]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        image, scale = decode(image_data)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    print(json.dumps({
+        "mean_ms": float(np.mean(timings)),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_delta_mb": peak_rss_mb() - baseline_mb,
+        "output_size": list(image.size),
+        "scale": [round(s, 3) for s in scale],
+    }))
+
+
+def synthetic_jpeg(size: str) -> str:
+    """Write a noisy photo-like JPEG of the given WxH to a temp file"""
+    width, height = (int(v) for v in size.lower().split("x"))
+    rng = np.random.default_rng(0)
+    # Smooth gradients plus noise, so the JPEG compresses like a real capture
+    base = np.linspace(0, 255, width, dtype=np.float32)[None, :, None] * np.ones((height, 1, 3), np.float32)
+    noise = rng.normal(0, 12, (height // 8, width // 8, 3)).astype(np.float32)
+    noise = np.asarray(Image.fromarray(np.clip(noise + 128, 0, 255).astype(np.uint8)).resize((width, height)), np.float32) - 128
+    pixels = np.clip(base + noise, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    handle = tempfile.NamedTemporaryFile(suffix=".jpg", delete=False)
+    handle.write(buffer.getvalue())
+    handle.close()
+    return handle.name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decode time and peak memory: full vs draft")
+    parser.add_argument("images", nargs="*", help="Images to decode (default: synthetic JPEG)")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--size", default="4000x3000", help="Synthetic image size when no images are given")
+    parser.add_argument("--worker", nargs=2, metavar=("VARIANT", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker[0], args.worker[1], args.repeat)
+        return
+
+    synthetic = None if args.images else synthetic_jpeg(args.size)
+    paths = args.images or [synthetic]
+    for path in paths:
+        with Image.open(path) as image:
+            print(f"\n🖼️ {path}: {image.size[0]}x{image.size[1]} {image.format}, {Path(path).stat().st_size / 1e6:.1f} MB")
+        print(f"{'variant':10}{'mean ms':>10}{'p50 ms':>10}{'peak RSS MB':>14}{'decoded':>12}")
+        results = {}
+        for variant in VARIANTS:
+            output = subprocess.run(
+                [sys.executable, __file__, "--worker", variant, path, "--repeat", str(args.repeat)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = results[variant] = json.loads(output)
+            decoded = "x".join(str(v) for v in result["output_size"])
+            print(f"{variant:10}{result['mean_ms']:>10.1f}{result['p50_ms']:>10.1f}{result['peak_rss_mb']:>14.1f}{decoded:>12}")
+        print(f"⚡ Speedup: {results['full']['mean_ms'] / results['draft']['mean_ms']:.1f}x, "
+              f"peak RSS -{results['full']['peak_rss_mb'] - results['draft']['peak_rss_mb']:.1f} MB")
+
+    if synthetic:
+        Path(synthetic).unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-worker memory with N HTTP workers, uvicorn workers vs preload + fork
+
+Starts the server twice with the same backend and worker count:
+  - workers: HTTP_WORKERS=N python api/main.py     (every worker loads its own model)
+  - preload: HTTP_WORKERS=N python api/preload.py  (loaded once, workers forked from it)
+
+waits until it is ready, sends some detection requests so the workers touch
+their pages like they would in service, then reads RSS, PSS and USS of every
+process in the server's tree from /proc/<pid>/smaps_rollup. USS is what each
+worker costs on its own; the PSS total is the real footprint of the tree.
+Linux only.
+
+Usage: INFERENCE_BACKEND=onnx python benchmarks/fork-memory.py [--workers 4] [--requests 50] [--image test_input.jpg]
+"""
+
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "api"))
+
+from prefork import memory_usage  # noqa: E402
+
+MODES = {"workers": "api/main.py", "preload": "api/preload.py"}
+
+
+def process_tree(root: int) -> List[int]:
+    """root and all of its descendants"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; the ppid follows the closing parenthesis
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, stack = [], [root]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, []))
+    return tree
+
+
+def command_line(pid: int) -> str:
+    with open(f"/proc/{pid}/cmdline", "rb") as f:
+        return f.read().replace(b"\0", b" ").decode(errors="replace")
+
+
+def wait_ready(url: str, workers: int, process: subprocess.Popen, timeout_s: float):
+    """Ready once enough consecutive readiness checks pass that every worker has likely answered"""
+    deadline = time.monotonic() + timeout_s
+    streak = 0
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"❌ Server exited with code {process.returncode}")
+        try:
+            streak = streak + 1 if httpx.get(f"{url}/health/ready", timeout=1.0).status_code == 200 else 0
+        except httpx.HTTPError:
+            streak = 0
+        if streak >= 4 * workers:
+            return
+        time.sleep(0.1)
+    raise SystemExit(f"❌ Server did not become ready within {timeout_s:.0f} s")
+
+
+def measure(mode: str, workers: int, port: int, image: bytes, requests: int, timeout_s: float) -> Dict[str, Dict[str, int]]:
+    env = dict(os.environ, HTTP_WORKERS=str(workers), PORT=str(port))
+    process = subprocess.Popen(
+        [sys.executable, MODES[mode]], cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(url, workers, process, timeout_s)
+        with httpx.Client(timeout=60.0) as client:
+            for index in range(requests):
+                # Unique bytes so the detection cache does not short-circuit inference
+                client.post(f"{url}/detect/upload", content=image + index.to_bytes(4, "little"),
+                            headers={"content-type": "application/octet-stream"}).raise_for_status()
+        usage = {}
+        for pid in process_tree(process.pid):
+            cmdline = command_line(pid)
+            if "resource_tracker" in cmdline:
+                continue
+            name = "parent" if pid == process.pid else f"worker {pid}"
+            usage[name] = memory_usage(pid)
+        return usage
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-worker USS / PSS: uvicorn workers vs preload + fork")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=50, help="Detection requests before measuring")
+    parser.add_argument("--image", default=str(REPO_ROOT / "test_input.jpg"))
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for readiness")
+    args = parser.parse_args()
+
+    image = Path(args.image).read_bytes()
+    totals = {}
+    for mode in MODES:
+        usage = measure(mode, args.workers, args.port, image, args.requests, args.timeout)
+        workers = {name: values for name, values in usage.items() if name != "parent"}
+        print(f"\n🧠 {mode}: {MODES[mode]} with {args.workers} workers ({os.getenv('INFERENCE_BACKEND', 'ultralytics')} backend)")
+        print(f"{'process':>14}{'RSS MB':>10}{'PSS MB':>10}{'USS MB':>10}")
+        for name, values in usage.items():
+            print(f"{name:>14}" + "".join(f"{values[key] / 2**20:>10.1f}" for key in ("rss", "pss", "uss")))
+        totals[mode] = {
+            "pss": sum(values["pss"] for values in usage.values()),
+            "worker_uss": sum(values["uss"] for values in workers.values()) / max(1, len(workers)),
+        }
+        print(f"{'total PSS':>14}{'':>10}{totals[mode]['pss'] / 2**20:>10.1f}")
+
+    print(f"\n⚡ Mean worker USS: {totals['workers']['worker_uss'] / 2**20:.1f} MB -> {totals['preload']['worker_uss'] / 2**20:.1f} MB, "
+          f"total PSS: {totals['workers']['pss'] / 2**20:.1f} MB -> {totals['preload']['pss'] / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+HTTP load test for the detection API
+
+Drives a running server with pooled async connections and reports
+throughput, latency percentiles, errors and the server-side stage breakdown
+(the "stats" block returned by /detect). Results can be written as JSON and
+diffed between runs.
+
+  --concurrency N   requests in flight at once (closed loop)
+  --rate R          open loop: start R requests/s, still capped by --concurrency
+  --sizes           image size mix, e.g. "640x480:3,1920x1080:1,4000x3000:1"
+  --mode            json (POST /detect, base64) | multipart | raw (POST /detect/upload)
+  --cache-bust      unique bytes per request, so the server cache never hits
+
+The mock backend runs the full pipeline with synthetic inference latency, so
+the HTTP/decode/render/encode overhead can be measured on its own:
+
+  INFERENCE_BACKEND=mock MOCK_LATENCY=lognormal:30,0.4 \
+      python benchmarks/load-test.py --spawn api/main.py --mode raw --cache-bust --duration 10
+
+Usage: python benchmarks/load-test.py [--url http://localhost:8000] [--concurrency 8]
+       [--rate 0] [--duration 30 | --requests N] [--sizes ...] [--images DIR]
+       [--mode json] [--return-image] [--cache-bust] [--spawn SCRIPT] [--json results.json]
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+try:
+    import httpx
+except ImportError:
+    raise SystemExit("❌ httpx not installed (pip install httpx)")
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png")
+
+
+def parse_sizes(spec: str) -> List[Tuple[int, int, float]]:
+    """'640x480:3,1920x1080:1' -> [(640, 480, 3.0), (1920, 1080, 1.0)]"""
+    sizes = []
+    for part in spec.split(","):
+        size, _, weight = part.strip().partition(":")
+        width, height = (int(v) for v in size.lower().split("x"))
+        sizes.append((width, height, float(weight or 1)))
+    return sizes
+
+
+def synthetic_jpeg(width: int, height: int, seed: int) -> bytes:
+    """Photo-like JPEG (smooth noise) so payload sizes and decode cost are realistic"""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (max(1, height // 16), max(1, width // 16), 3), dtype=np.uint8)
+    image = Image.fromarray(small).resize((width, height), Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def build_payloads(args) -> Tuple[List[Tuple[str, bytes]], List[float]]:
+    """Encoded images to send and their sampling weights"""
+    if args.images:
+        paths = sorted(p for p in Path(args.images).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+        if not paths:
+            raise SystemExit(f"❌ No images found in {args.images}")
+        return [(p.name, p.read_bytes()) for p in paths], [1.0] * len(paths)
+
+    payloads, weights = [], []
+    for index, (width, height, weight) in enumerate(parse_sizes(args.sizes)):
+        # A few distinct images per size so a server-side cache does not turn every request into a hit
+        for variant in range(args.variants):
+            payloads.append((f"{width}x{height}_{variant}.jpg", synthetic_jpeg(width, height, seed=index * 1000 + variant)))
+            weights.append(weight / args.variants)
+    return payloads, weights
+
+
+class RequestFactory:
+    """Pre-encodes request bodies once so the client measures the server, not base64"""
+
+    def __init__(self, mode: str, return_image: bool, payloads: List[Tuple[str, bytes]]):
+        self.mode = mode
+        self.return_image = return_image
+        self.payloads = payloads
+        self.requests = [self.build(name, data) for name, data in payloads]
+
+    def build(self, name: str, data: bytes) -> Dict[str, Any]:
+        if self.mode == "json":
+            body = json.dumps({
+                "image": base64.b64encode(data).decode("utf-8"),
+                "filename": name,
+                "file_size": len(data),
+                "return_image": self.return_image,
+            }).encode("utf-8")
+            return {"path": "/detect", "content": body, "headers": {"content-type": "application/json"}, "params": None}
+
+        params = {"filename": name, "return_image": str(self.return_image).lower()}
+        if self.mode == "multipart":
+            boundary = "loadtest-boundary"
+            body = (
+                f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"{name}\"\r\n"
+                f"Content-Type: image/jpeg\r\n\r\n"
+            ).encode("utf-8") + data + f"\r\n--{boundary}--\r\n".encode("utf-8")
+            headers = {"content-type": f"multipart/form-data; boundary={boundary}"}
+        else:
+            body = data
+            headers = {"content-type": "application/octet-stream"}
+        return {"path": "/detect/upload", "content": body, "headers": headers, "params": params}
+
+
+class Results:
+    """Collected per-request outcomes"""
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.stages: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+        self.server_values: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, latency_ms: float, status: Optional[int], sent: int, received: int, body: Optional[dict], error: Optional[str]):
+        self.bytes_sent += sent
+        if error is not None:
+            self.errors[error] += 1
+            return
+        self.statuses[status] += 1
+        self.bytes_received += received
+        if status != 200:
+            return
+        self.latencies_ms.append(latency_ms)
+        stats = (body or {}).get("stats") or {}
+        for stage, timing in (stats.get("stages") or {}).items():
+            for key, value in timing.items():
+                self.stages[stage][key].append(value)
+        for key in ("batch_size", "batch_queue_wait_ms", "inference_ms"):
+            if key in stats:
+                self.server_values[key].append(stats[key])
+        if "cache" in stats:
+            self.server_values[f"cache_{stats['cache']}"].append(1)
+
+
+async def send_one(client: httpx.AsyncClient, request: Dict[str, Any], results: Results):
+    start = time.perf_counter()
+    try:
+        response = await client.post(request["path"], content=request["content"], headers=request["headers"], params=request["params"])
+        content = response.content
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        body = None
+        if response.status_code == 200:
+            try:
+                body = json.loads(content)
+            except ValueError:
+                body = None
+        results.record(latency_ms, response.status_code, len(request["content"]), len(content), body, None)
+    except httpx.HTTPError as e:
+        results.record((time.perf_counter() - start) * 1000.0, None, len(request["content"]), 0, None, type(e).__name__)
+
+
+async def run_load(args, factory: RequestFactory, weights: List[float]) -> Tuple[Results, float]:
+    """Closed loop (workers back to back) or open loop (fixed start rate)"""
+    results = Results()
+    chooser = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    deadline = time.perf_counter() + args.duration if not args.requests else None
+    issued = 0
+
+    def next_request() -> Optional[Dict[str, Any]]:
+        nonlocal issued
+        if args.requests and issued >= args.requests:
+            return None
+        if deadline is not None and time.perf_counter() >= deadline:
+            return None
+        issued += 1
+        index = chooser.choices(range(len(factory.requests)), weights)[0]
+        if args.cache_bust:
+            # Bytes after the JPEG end marker change the content hash but not the image
+            name, data = factory.payloads[index]
+            return factory.build(name, data + issued.to_bytes(8, "little"))
+        return factory.requests[index]
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+        # Warm up connections and the server (not recorded)
+        await asyncio.gather(*(send_one(client, factory.requests[i % len(factory.requests)], Results()) for i in range(args.warmup)))
+
+        start = time.perf_counter()
+        if args.rate > 0:
+            in_flight = asyncio.Semaphore(args.concurrency)
+            tasks = []
+
+            async def limited(request):
+                async with in_flight:
+                    await send_one(client, request, results)
+
+            interval = 1.0 / args.rate
+            next_start = time.perf_counter()
+            while (request := next_request()) is not None:
+                tasks.append(asyncio.create_task(limited(request)))
+                next_start += interval
+                await asyncio.sleep(max(0.0, next_start - time.perf_counter()))
+            await asyncio.gather(*tasks)
+        else:
+            async def worker():
+                while (request := next_request()) is not None:
+                    await send_one(client, request, results)
+
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return results, elapsed
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)), 2) if values else None
+
+
+def summarize(args, results: Results, elapsed: float, payloads: List[Tuple[str, bytes]]) -> Dict[str, Any]:
+    completed = sum(results.statuses.values())
+    failed = completed - results.statuses.get(200, 0) + sum(results.errors.values())
+    total = completed + sum(results.errors.values())
+    latencies = results.latencies_ms
+    return {
+        "config": {
+            "url": args.url,
+            "mode": args.mode,
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "duration_s": args.duration if not args.requests else None,
+            "requests": args.requests,
+            "sizes": None if args.images else args.sizes,
+            "images": args.images,
+            "return_image": args.return_image,
+            "cache_bust": args.cache_bust,
+            "payload_bytes_mean": round(float(np.mean([len(data) for _, data in payloads]))),
+        },
+        "elapsed_s": round(elapsed, 3),
+        "requests": total,
+        "ok": results.statuses.get(200, 0),
+        "error_rate": round(failed / total, 4) if total else 0.0,
+        "statuses": {str(k): v for k, v in sorted(results.statuses.items())},
+        "errors": dict(results.errors),
+        "throughput_rps": round(results.statuses.get(200, 0) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(float(np.mean(latencies)), 2) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "max": round(max(latencies), 2) if latencies else None,
+        },
+        "wire_mb": {"sent": round(results.bytes_sent / 1e6, 2), "received": round(results.bytes_received / 1e6, 2)},
+        "server_stages_ms": {
+            stage: {key: {"mean": round(float(np.mean(v)), 2), "p95": percentile(v, 95)} for key, v in timings.items()}
+            for stage, timings in sorted(results.stages.items())
+        },
+        "server": {
+            key: (len(values) if key.startswith("cache_") else round(float(np.mean(values)), 2))
+            for key, values in sorted(results.server_values.items())
+        },
+    }
+
+
+def print_summary(summary: Dict[str, Any]):
+    latency = summary["latency_ms"]
+    print("=" * 64)
+    print(f"📊 {summary['requests']} requests in {summary['elapsed_s']} s "
+          f"({summary['config']['mode']}, concurrency {summary['config']['concurrency']})")
+    print(f"⚡ Throughput: {summary['throughput_rps']} req/s")
+    print(f"⏱️ Latency ms: mean {latency['mean']}  p50 {latency['p50']}  p95 {latency['p95']}  "
+          f"p99 {latency['p99']}  max {latency['max']}")
+    print(f"❌ Error rate: {summary['error_rate'] * 100:.2f}%  statuses {summary['statuses']}  errors {summary['errors']}")
+    print(f"📦 Wire: {summary['wire_mb']['sent']} MB sent, {summary['wire_mb']['received']} MB received")
+    if summary["server_stages_ms"]:
+        print(f"\n{'server stage':16}{'wait ms':>10}{'run ms':>10}{'run p95':>10}")
+        for stage, timings in summary["server_stages_ms"].items():
+            wait = timings.get("queue_wait_ms", {}).get("mean", "-")
+            run = timings.get("run_ms", {})
+            print(f"{stage:16}{wait:>10}{run.get('mean', '-'):>10}{run.get('p95', '-'):>10}")
+    if summary["server"]:
+        print(f"\n🖥️ Server: {summary['server']}")
+
+
+def spawn_server(script: str, url: str, timeout_s: float = 60.0) -> subprocess.Popen:
+    """Start a server script and wait until it reports ready"""
+    process = subprocess.Popen([sys.executable, script], cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"❌ {script} exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health/ready", timeout=1.0).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise SystemExit(f"❌ {script} did not become healthy within {timeout_s:.0f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the detection API")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0.0, help="Requests/s to start (0 = closed loop)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests instead of --duration")
+    parser.add_argument("--sizes", default="640x480:3,1920x1080:1", help="Synthetic image size mix WxH:weight,...")
+    parser.add_argument("--variants", type=int, default=4, help="Distinct synthetic images per size")
+    parser.add_argument("--images", help="Directory of images to send instead of synthetic ones")
+    parser.add_argument("--mode", choices=("json", "multipart", "raw"), default="json")
+    parser.add_argument("--return-image", action="store_true", help="Ask for the annotated image")
+    parser.add_argument("--cache-bust", action="store_true", help="Make every request body unique (defeats the detection cache)")
+    parser.add_argument("--warmup", type=int, default=4, help="Unrecorded requests sent first")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn", help="Start this server script for the run, e.g. api/main.py")
+    parser.add_argument("--json", help="Write results as JSON")
+    args = parser.parse_args()
+
+    payloads, weights = build_payloads(args)
+    factory = RequestFactory(args.mode, args.return_image, payloads)
+    print(f"🧪 {len(payloads)} payloads, mean {np.mean([len(d) for _, d in payloads]) / 1024:.0f} KB, target {args.url}")
+
+    server = spawn_server(args.spawn, args.url) if args.spawn else None
+    try:
+        results, elapsed = asyncio.run(run_load(args, factory, weights))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    summary = summarize(args, results, elapsed, payloads)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
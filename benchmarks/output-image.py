@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cost of the annotated image per output option
+
+For one image (default: a synthetic 12MP JPEG) and a set of boxes, times the
+whole annotated-image chain -- decode, draw, encode, base64 -- for
+  - legacy:      full-resolution decode, draw, JPEG quality 95 (the old path)
+  - full q80:    image_max_size=0, JPEG quality 80
+  - preview:     the server defaults (OUTPUT_FORMAT / OUTPUT_QUALITY / OUTPUT_MAX_SIZE)
+  - webp / png:  the default preview size in the other formats
+  - thumb:       JPEG at 320 px
+and reports the bytes returned inline (base64) and raw (binary formats).
+
+Usage: python benchmarks/output-image.py [image_path] [--boxes 20] [--repeat 10] [--size 4000x3000]
+"""
+
+import argparse
+import base64
+import importlib.util
+import io
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "api"))
+
+from image_io import decode_image_bytes  # noqa: E402
+from output_image import DEFAULT_OUTPUT, decode_for_output, encode_image, output_boxes, output_options  # noqa: E402
+from renderer import AnnotationRenderer  # noqa: E402
+
+# The synthetic-image helper of the decode benchmark
+decode_benchmark = importlib.util.spec_from_file_location("decode_benchmark", REPO_ROOT / "benchmarks" / "decode.py")
+synthetic = importlib.util.module_from_spec(decode_benchmark)
+decode_benchmark.loader.exec_module(synthetic)
+
+LABELS = ["fire extinguisher", "toolbox", "oxygen tank"]
+
+
+def legacy_chain(image_data: bytes, detections, renderer: AnnotationRenderer) -> bytes:
+    """The original path: full-resolution decode, draw, JPEG quality 95"""
+    image = renderer.draw(decode_image_bytes(image_data), detections, in_place=True)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=95)
+    return buffer.getvalue()
+
+
+def output_chain(options):
+    def run(image_data: bytes, detections, renderer: AnnotationRenderer) -> bytes:
+        image, scale = decode_for_output(image_data, options)
+        image = renderer.draw_boxes(image, output_boxes(detections, scale), in_place=True)
+        return encode_image(image, options)
+    return run
+
+
+def random_detections(count: int, width: int, height: int):
+    rng = np.random.default_rng(0)
+    detections = []
+    for _ in range(count):
+        w, h = rng.uniform(0.05, 0.3) * width, rng.uniform(0.05, 0.3) * height
+        bbox = SimpleNamespace(x=rng.uniform(0, width - w), y=rng.uniform(0, height - h), width=w, height=h)
+        detections.append(SimpleNamespace(bbox=bbox, confidence=float(rng.uniform(0.25, 1.0)), class_id=int(rng.integers(0, 3))))
+    return detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Annotated image time and size per output option")
+    parser.add_argument("image", nargs="?", help="Image to annotate (default: synthetic JPEG)")
+    parser.add_argument("--boxes", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--size", default="4000x3000", help="Synthetic image size when no image is given")
+    args = parser.parse_args()
+
+    path = args.image or synthetic.synthetic_jpeg(args.size)
+    image_data = Path(path).read_bytes()
+    with Image.open(path) as image:
+        width, height = image.size
+        print(f"🖼️ {path}: {width}x{height} {image.format}, {len(image_data) / 1e6:.1f} MB, {args.boxes} boxes")
+    detections = random_detections(args.boxes, width, height)
+    renderer = AnnotationRenderer(LABELS)
+
+    variants = {
+        "legacy": legacy_chain,
+        "full q80": output_chain(output_options("jpeg", 80, 0)),
+        "preview": output_chain(DEFAULT_OUTPUT),
+        "webp": output_chain(output_options("webp", DEFAULT_OUTPUT.quality)),
+        "png": output_chain(output_options("png")),
+        "thumb": output_chain(output_options("jpeg", DEFAULT_OUTPUT.quality, 320)),
+    }
+    print(f"   preview = {DEFAULT_OUTPUT.format}, quality {DEFAULT_OUTPUT.quality}, max {DEFAULT_OUTPUT.max_size} px")
+    print(f"{'variant':10}{'mean ms':>10}{'p50 ms':>10}{'raw KB':>10}{'base64 KB':>11}{'vs legacy':>11}")
+    baseline_ms = None
+    for name, chain in variants.items():
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            encoded = chain(image_data, detections, renderer)
+            inline = base64.b64encode(encoded)
+            timings.append((time.perf_counter() - start) * 1000.0)
+        mean_ms = float(np.mean(timings))
+        baseline_ms = baseline_ms or mean_ms
+        print(f"{name:10}{mean_ms:>10.1f}{np.percentile(timings, 50):>10.1f}{len(encoded) / 1024:>10.1f}"
+              f"{len(inline) / 1024:>11.1f}{baseline_ms / mean_ms:>10.1f}x")
+
+    if not args.image:
+        Path(path).unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Benchmark: base64-in-JSON vs binary uploads for /detect
+
+Reports bytes on the wire and server-side CPU time per request for
+  - POST /detect         (JSON with a base64 image)
+  - POST /detect/upload  (multipart/form-data)
+  - POST /detect/upload  (application/octet-stream)
+
+The server app is driven in-process through ASGI with pre-built request
+bodies, so the CPU numbers contain only server work (parsing, decoding,
+inference, rendering, encoding), never client-side encoding. The detection
+cache is turned off: every request repeats the same image, so all of them
+would be cache hits otherwise.
+
+Usage: python benchmarks/payload-modes.py [image_path] [--server api/main.py] [--requests 50]
+"""
+
+import argparse
+import asyncio
+import base64
+import importlib.util
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_server(server_path):
+    """Import a server script (file names contain dashes) and return its FastAPI app"""
+    sys.path.insert(0, str(Path(server_path).resolve().parent))
+    # The bodies repeat one image; with the cache on every timed request would skip inference
+    os.environ["CACHE_ENABLED"] = "0"
+    spec = importlib.util.spec_from_file_location("bench_server", server_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.app
+
+
+def build_requests(image_path):
+    """Build the three request variants as (name, path, headers, body)"""
+    raw = Path(image_path).read_bytes()
+    image_base64 = base64.b64encode(raw).decode("utf-8")
+
+    json_body = json.dumps({
+        "image": image_base64,
+        "filename": Path(image_path).name,
+        "file_size": len(raw),
+    }).encode("utf-8")
+
+    # Let requests build the exact multipart body a client would send
+    prepared = requests.Request(
+        "POST", "http://bench/detect/upload",
+        files={"image": (Path(image_path).name, raw, "image/jpeg")},
+    ).prepare()
+
+    return [
+        ("json+base64", "/detect", {"content-type": "application/json"}, json_body),
+        ("multipart", "/detect/upload?return_image=true", {"content-type": prepared.headers["Content-Type"]}, prepared.body),
+        ("octet-stream", "/detect/upload?return_image=true", {"content-type": "application/octet-stream"}, raw),
+    ]
+
+
+def wire_bytes(path, headers, body):
+    """Approximate HTTP/1.1 request size: request line + headers + body"""
+    lines = [f"POST {path} HTTP/1.1", "host: localhost:8000", f"content-length: {len(body)}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return len("\r\n".join(lines).encode("utf-8")) + 4 + len(body)
+
+
+async def call_asgi(app, path, headers, body, method="POST"):
+    """Send one request through the ASGI app and return the status code"""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode("utf-8"),
+        "query_string": query.encode("utf-8"),
+        "root_path": "",
+        "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+        "client": ("127.0.0.1", 0),
+        "server": ("localhost", 8000),
+    }
+    delivered = False
+    status = {}
+
+    async def receive():
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Never disconnect while the handler is running
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app(scope, receive, send)
+    return status.get("code")
+
+
+async def wait_ready(app, timeout_s=120.0):
+    """Poll /health/ready until the model has loaded in the background (servers without it count as ready)"""
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        code = await call_asgi(app, "/health/ready", {}, b"", method="GET")
+        if code in (200, 404):
+            return
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"Server did not become ready within {timeout_s:.0f} s")
+
+
+async def run(app, variants, n_requests):
+    """Measure each variant sequentially"""
+    await app.router.startup()
+    results = []
+    try:
+        await wait_ready(app)
+        for name, path, headers, body in variants:
+            # Warm-up request (first-call allocations, font loading, ...)
+            await call_asgi(app, path, headers, body)
+
+            cpu_start = time.process_time()
+            wall_start = time.perf_counter()
+            for _ in range(n_requests):
+                code = await call_asgi(app, path, headers, body)
+                if code != 200:
+                    raise RuntimeError(f"{name}: server returned {code}")
+            cpu_ms = (time.process_time() - cpu_start) * 1000.0 / n_requests
+            wall_ms = (time.perf_counter() - wall_start) * 1000.0 / n_requests
+
+            results.append({
+                "mode": name,
+                "body_bytes": len(body),
+                "wire_bytes": wire_bytes(path, headers, body),
+                "server_cpu_ms": round(cpu_ms, 2),
+                "wall_ms": round(wall_ms, 2),
+            })
+    finally:
+        await app.router.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare /detect payload modes")
+    parser.add_argument("image", nargs="?", default=str(REPO_ROOT / "test_input.jpg"))
+    parser.add_argument("--server", default=str(REPO_ROOT / "api" / "main.py"))
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    # Servers resolve public/ and output_results/ relative to the repo root
+    os.chdir(REPO_ROOT)
+    app = load_server(args.server)
+    results = asyncio.run(run(app, build_requests(args.image), args.requests))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"📊 {args.requests} requests per mode, image: {args.image}")
+    print(f"{'mode':<14}{'body bytes':>12}{'wire bytes':>12}{'cpu ms/req':>12}{'wall ms/req':>13}")
+    for row in results:
+        print(f"{row['mode']:<14}{row['body_bytes']:>12}{row['wire_bytes']:>12}"
+              f"{row['server_cpu_ms']:>12}{row['wall_ms']:>13}")
+
+
+if __name__ == "__main__":
+    main()
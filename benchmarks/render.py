@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark: original draw_detections_on_image vs the cached AnnotationRenderer
+
+Draws many boxes onto test_input.jpg with
+  - the original implementation (font lookup, colour table and textbbox per call/box)
+  - AnnotationRenderer.draw on a copy
+  - AnnotationRenderer.draw in place
+
+Usage: python benchmarks/render.py [image_path] [--boxes 200] [--repeat 20]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "api"))
+
+from renderer import AnnotationRenderer  # noqa: E402
+
+LABELS = ["fire extinguisher", "toolbox", "oxygen tank"]
+
+
+def legacy_draw(image, detections):
+    """The original per-call rendering, kept here as the baseline"""
+    result_image = image.copy()
+    draw = ImageDraw.Draw(result_image)
+    try:
+        font = ImageFont.truetype("arial.ttf", 16)
+    except OSError:
+        font = ImageFont.load_default()
+    colors = [
+        (255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0),
+        (255, 0, 255), (0, 255, 255), (255, 165, 0), (128, 0, 128),
+    ]
+    for detection in detections:
+        x1 = detection.bbox.x
+        y1 = detection.bbox.y
+        x2 = x1 + detection.bbox.width
+        y2 = y1 + detection.bbox.height
+        color = colors[detection.class_id % len(colors)]
+        draw.rectangle([x1, y1, x2, y2], outline=color, width=3)
+        label = LABELS[detection.class_id] if detection.class_id < len(LABELS) else f"Class {detection.class_id}"
+        label_text = f"{label} ({detection.confidence:.2f})"
+        text_bbox = draw.textbbox((0, 0), label_text, font=font)
+        text_width = text_bbox[2] - text_bbox[0]
+        text_height = text_bbox[3] - text_bbox[1]
+        text_x = x1
+        text_y = y1 - text_height - 5
+        if text_y < 0:
+            text_y = y1 + 5
+        draw.rectangle([text_x, text_y, text_x + text_width + 10, text_y + text_height + 5], fill=color)
+        draw.text((text_x + 5, text_y + 2), label_text, fill=(255, 255, 255), font=font)
+    return result_image
+
+
+def make_detections(n, size, seed=0):
+    """Random detections as attribute objects shaped like the API's Detection"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    detections = []
+    for _ in range(n):
+        w, h = rng.uniform(20, width / 4), rng.uniform(20, height / 4)
+        x, y = rng.uniform(0, width - w), rng.uniform(0, height - h)
+        detections.append(SimpleNamespace(
+            class_id=int(rng.integers(0, 3)),
+            confidence=float(rng.uniform(0.25, 1.0)),
+            bbox=SimpleNamespace(x=x, y=y, width=w, height=h),
+        ))
+    return detections
+
+
+def time_ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000.0 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Annotation rendering benchmark")
+    parser.add_argument("image", nargs="?", default=str(REPO_ROOT / "test_input.jpg"))
+    parser.add_argument("--boxes", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    image = Image.open(args.image).convert("RGB")
+    detections = make_detections(args.boxes, image.size)
+
+    renderer = AnnotationRenderer(LABELS)
+    renderer.draw(image, detections)  # warm the sprite cache, as a long-running server would be
+
+    legacy_ms = time_ms(lambda: legacy_draw(image, detections), args.repeat)
+    copy_ms = time_ms(lambda: renderer.draw(image, detections), args.repeat)
+    scratch = image.copy()
+    in_place_ms = time_ms(lambda: renderer.draw(scratch, detections, in_place=True), args.repeat)
+
+    print(f"🖼️ {args.image} {image.size}, {args.boxes} boxes, {args.repeat} runs")
+    print(f"   original renderer:         {legacy_ms:8.2f} ms")
+    print(f"   cached renderer (copy):    {copy_ms:8.2f} ms  ({legacy_ms / copy_ms:.1f}x)")
+    print(f"   cached renderer (in place):{in_place_ms:8.2f} ms  ({legacy_ms / in_place_ms:.1f}x)")
+    print(f"   cached sprites: {renderer.info()['cached_sprites']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark: detection response serialization time and payload size per format
+
+Builds a DetectionResponse with N boxes (optionally with an annotated image)
+and times, per response:
+  - fastapi:  jsonable_encoder + json.dumps, what returning the model did before
+  - pydantic: model_dump_json (pydantic-core, one pass), the default JSON path
+  - orjson:   orjson.dumps(model_dump()) (when installed), for comparison
+  - msgpack:  application/msgpack (when installed), image as raw bytes
+  - packed:   application/x-detections, 24 bytes per box, image as raw bytes
+
+Usage: python benchmarks/response-formats.py [--boxes 0,10,100,1000] [--image] [--repeat 200]
+"""
+
+import argparse
+import base64
+import importlib.util
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def time_per_call(fn, repeat: int) -> float:
+    """Best of 5 rounds, microseconds per call"""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response serialization time and size per format")
+    parser.add_argument("--boxes", default="0,10,100,1000")
+    parser.add_argument("--image", action="store_true", help="Include test_input.jpg as the annotated image")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    sys.path.insert(0, str(REPO_ROOT / "api"))
+    spec = importlib.util.spec_from_file_location("bench_server", REPO_ROOT / "api" / "main.py")
+    server = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(server)
+    from fastapi.encoders import jsonable_encoder
+    from formats import MSGPACK_AVAILABLE, encode_msgpack, encode_packed
+    from postprocess import build_detections
+
+    image = (REPO_ROOT / "test_input.jpg").read_bytes() if args.image else None
+    stats = {"model": "default:00000000", "cache": "miss", "batch_size": 4, "inference_ms": 23.5,
+             "stages": {"decode": {"queue_wait_ms": 0.1, "run_ms": 2.3}, "inference": {"queue_wait_ms": 4.2, "run_ms": 23.5}}}
+
+    variants = {
+        # What FastAPI's JSONResponse does with a returned model
+        "fastapi": lambda response: json.dumps(
+            jsonable_encoder(response), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8"),
+        "pydantic": lambda response: response.model_dump_json().encode("utf-8"),
+    }
+    if importlib.util.find_spec("orjson") is not None:
+        import orjson
+
+        variants["orjson"] = lambda response: orjson.dumps(response.model_dump())
+    if MSGPACK_AVAILABLE:
+        variants["msgpack"] = lambda response: encode_msgpack(response, image)
+    variants["packed"] = lambda response: encode_packed(response.detections, image)
+
+    rng = np.random.default_rng(0)
+    print(f"{'boxes':>6}{'format':>10}{'us':>10}{'bytes':>10}{'vs fastapi':>12}")
+    for n in (int(size) for size in args.boxes.split(",")):
+        xy = rng.uniform(0, 1800, (n, 2)).astype(np.float32)
+        xyxy = np.concatenate([xy, xy + rng.uniform(10, 200, (n, 2)).astype(np.float32)], axis=1)
+        detections = build_detections(xyxy, rng.uniform(0.25, 1.0, n), rng.integers(0, 3, n), server.detections_adapter)
+        response = server.DetectionResponse(
+            detections=detections,
+            processed_image=base64.b64encode(image).decode("ascii") if image else None,
+            result_id="f415d515ff39414f90b5227dbb500b11",
+            stats=stats,
+        )
+        repeat = max(5, args.repeat * 10 // max(n, 10))
+        baseline_us = None
+        for name, encode in variants.items():
+            size = len(encode(response))
+            us = time_per_call(lambda: encode(response), repeat)
+            baseline_us = baseline_us or us
+            print(f"{n:>6}{name:>10}{us:>10.1f}{size:>10}{baseline_us / us:>11.1f}x")
+
+
+if __name__ == "__main__":
+    main()
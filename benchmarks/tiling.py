@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tiled inference latency vs tile count
+
+Scales one image (default: test_input.jpg) to several capture sizes and, for
+each size, times
+  - untiled: downscale to the model input, one forward pass (the default path)
+  - tiled:   prepare_tiles + forward passes in batches of --batch-size + merge
+
+and reports the tile count, per-stage times, total latency and cost per tile,
+so the tile size / overlap / max-tiles settings can be picked for a latency
+budget. Runs on whatever backend is given (CPU for onnx / onnx-int8).
+
+Usage: python benchmarks/tiling.py [image_path] [--backend onnx] [--model public/models/best.pt]
+                                   [--sizes 1280x960,1920x1440,4000x3000] [--repeat 5]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "api"))
+
+from backends import load_detector  # noqa: E402
+from batching import BATCH_MAX_SIZE  # noqa: E402
+from image_io import downscale_for_inference  # noqa: E402
+from tiling import TILE_MAX_TILES, TILE_OVERLAP, merge_tile_outputs, prepare_tiles  # noqa: E402
+
+
+def run_tiled(detector, image, tile_size, overlap, max_tiles, batch_size):
+    """One tiled detection; returns (tiles, boxes, {stage: ms})"""
+    started = time.perf_counter()
+    crops, offsets = prepare_tiles(image, tile_size, overlap, max_tiles)
+    prepared = time.perf_counter()
+    outputs = []
+    for start in range(0, len(crops), batch_size):
+        outputs.extend(detector(crops[start:start + batch_size]))
+    inferred = time.perf_counter()
+    xyxy, _, _ = merge_tile_outputs(outputs, offsets)
+    merged = time.perf_counter()
+    return len(crops), len(xyxy), {
+        "tile_ms": (prepared - started) * 1000.0,
+        "inference_ms": (inferred - prepared) * 1000.0,
+        "merge_ms": (merged - inferred) * 1000.0,
+    }
+
+
+def run_untiled(detector, image, tile_size):
+    started = time.perf_counter()
+    small, _ = downscale_for_inference(image, tile_size)
+    prepared = time.perf_counter()
+    xyxy, _, _ = detector([small])[0]
+    inferred = time.perf_counter()
+    return 1, len(xyxy), {"tile_ms": (prepared - started) * 1000.0, "inference_ms": (inferred - prepared) * 1000.0, "merge_ms": 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiled inference latency vs tile count")
+    parser.add_argument("image", nargs="?", default=str(REPO_ROOT / "test_input.jpg"))
+    parser.add_argument("--model", default=str(REPO_ROOT / "public/models/best.pt"))
+    parser.add_argument("--backend", default="onnx")
+    parser.add_argument("--sizes", default="1280x960,1920x1440,2560x1920,4000x3000", help="Capture sizes to scale the image to")
+    parser.add_argument("--tile-size", type=int, help="Tile size (default: the model input size)")
+    parser.add_argument("--overlap", type=float, default=TILE_OVERLAP)
+    parser.add_argument("--max-tiles", type=int, default=TILE_MAX_TILES)
+    parser.add_argument("--batch-size", type=int, default=BATCH_MAX_SIZE, help="Tiles per forward pass")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    detector, info = load_detector(args.model, args.backend)
+    tile_size = args.tile_size or info["input_shape"][-1]
+    source = Image.open(args.image).convert("RGB")
+    # Warm-up so the first size does not pay for session / kernel setup
+    detector([source.resize((tile_size, tile_size))] * min(args.batch_size, 2))
+
+    print(f"\n🧩 {info['backend']} backend, {tile_size}px tiles, overlap {args.overlap}, batches of {args.batch_size}")
+    print(f"{'size':>11}{'mode':>9}{'tiles':>7}{'boxes':>7}{'tile ms':>10}{'infer ms':>10}{'merge ms':>10}{'total ms':>10}{'ms/tile':>9}")
+    for size in args.sizes.split(","):
+        width, height = (int(v) for v in size.lower().split("x"))
+        image = source.resize((width, height), Image.BILINEAR)
+        for mode in ("untiled", "tiled"):
+            runs = []
+            for _ in range(args.repeat):
+                if mode == "tiled":
+                    runs.append(run_tiled(detector, image, tile_size, args.overlap, args.max_tiles, args.batch_size))
+                else:
+                    runs.append(run_untiled(detector, image, tile_size))
+            tiles, boxes = runs[-1][0], runs[-1][1]
+            stages = {stage: float(np.median([run[2][stage] for run in runs])) for stage in runs[0][2]}
+            total_ms = sum(stages.values())
+            print(f"{size:>11}{mode:>9}{tiles:>7}{boxes:>7}{stages['tile_ms']:>10.1f}{stages['inference_ms']:>10.1f}"
+                  f"{stages['merge_ms']:>10.2f}{total_ms:>10.1f}{total_ms / tiles:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,7 +22,7 @@ def save_processed_image(base64_image, output_path):
         f.write(image_data)
     print(f"💾 Saved processed image to: {output_path}")
 
-def demo_detection(image_path):
+def demo_detection(image_path, raw_upload=False):
     """Demo the detection API"""
     print(f"🔍 Processing image: {image_path}")
     
@@ -32,20 +32,32 @@ def demo_detection(image_path):
         return
     
     try:
-        # Encode image
-        image_base64 = encode_image(image_path)
-        
-        # Prepare request
-        payload = {
-            "image": image_base64,
-            "filename": Path(image_path).name,
-            "file_size": len(image_base64)
-        }
-        
-        print("📤 Sending request to API...")
-        
-        # Make API request
-        response = requests.post("http://localhost:8000/detect", json=payload, timeout=30)
+        if raw_upload:
+            # Send the image bytes as-is (no base64 / JSON overhead)
+            print("📤 Sending raw upload to API...")
+            with open(image_path, "rb") as img_file:
+                response = requests.post(
+                    "http://localhost:8000/detect/upload",
+                    params={"filename": Path(image_path).name, "return_image": "true"},
+                    data=img_file,
+                    headers={"Content-Type": "application/octet-stream"},
+                    timeout=30
+                )
+        else:
+            # Encode image
+            image_base64 = encode_image(image_path)
+            
+            # Prepare request
+            payload = {
+                "image": image_base64,
+                "filename": Path(image_path).name,
+                "file_size": len(image_base64)
+            }
+            
+            print("📤 Sending request to API...")
+            
+            # Make API request
+            response = requests.post("http://localhost:8000/detect", json=payload, timeout=30)
         
         if response.status_code == 200:
             data = response.json()
@@ -79,7 +91,7 @@ def demo_detection(image_path):
             
     except requests.exceptions.ConnectionError:
         print("❌ Cannot connect to API server")
-        print("   Make sure the backend is running: python api/detect.py")
+        print("   Make sure the backend is running: python api/main.py")
     except Exception as e:
         print(f"❌ Error: {e}")
 
@@ -89,12 +101,15 @@ def main():
     print("=" * 40)
     
     # Check if image path provided
-    if len(sys.argv) < 2:
-        print("Usage: python demo.py <image_path>")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    if not args:
+        print("Usage: python demo.py <image_path> [--raw]")
         print("Example: python demo.py test_image.jpg")
+        print("  --raw  send the image as a binary upload instead of base64 JSON")
         return
     
-    image_path = sys.argv[1]
+    image_path = args[0]
+    raw_upload = "--raw" in sys.argv
     
     # Check if backend is running
     try:
@@ -104,14 +119,14 @@ def main():
             return
     except requests.exceptions.ConnectionError:
         print("❌ Backend server not running")
-        print("   Start it with: python api/detect.py")
+        print("   Start it with: python api/main.py")
         return
     
     print("✅ Backend server is running")
     print()
     
     # Run detection
-    demo_detection(image_path)
+    demo_detection(image_path, raw_upload)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
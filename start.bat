@@ -3,7 +3,7 @@ echo Starting Spacecraft AI Detector...
 echo.
 
 echo Starting Python Backend Server...
-start "Python Backend" cmd /k "python api/detect.py"
+start "Python Backend" cmd /k "python api/main.py"
 
 echo Waiting for backend to start...
 timeout /t 3 /nobreak > nul
@@ -4,7 +4,7 @@ echo "Starting Spacecraft AI Detector..."
 echo
 
 echo "Starting Python Backend Server..."
-python api/detect.py &
+python api/main.py &
 BACKEND_PID=$!
 
 echo "Waiting for backend to start..."
@@ -95,7 +95,7 @@ def test_api():
             
     except requests.exceptions.ConnectionError:
         print("❌ Cannot connect to API server")
-        print("   Make sure the backend is running: python api/simple-detect.py")
+        print("   Make sure the backend is running: INFERENCE_BACKEND=mock python api/main.py")
     except Exception as e:
         print(f"❌ Error: {e}")
 
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Parity test: ONNX Runtime backend vs the ultralytics backend on test_input.jpg
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api"))
+
+from onnx_backend import ONNX_AVAILABLE, OnnxDetector, box_iou, export_onnx
+
+MODEL_PATH = "public/models/best.pt"
+TEST_IMAGE = "test_input.jpg"
+
+# Tolerances: both backends see slightly different resizes, so allow small drift
+MIN_IOU = 0.9
+MAX_CONF_DELTA = 0.05
+
+def run_ultralytics(image):
+    """Detections from the PyTorch path as (xyxy, conf, cls)"""
+    from ultralytics import YOLO
+    model = YOLO(MODEL_PATH)
+    model(image, verbose=False)  # warm-up
+    start = time.perf_counter()
+    result = model(image, verbose=False)[0]
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    data = result.boxes.data.cpu().numpy()
+    return (data[:, :4], data[:, 4], data[:, 5].astype(np.int64)), elapsed_ms
+
+def run_onnx(image):
+    """Detections from the ONNX Runtime path as (xyxy, conf, cls)"""
+    detector = OnnxDetector(export_onnx(MODEL_PATH))
+    detector([image])  # warm-up
+    start = time.perf_counter()
+    detections = detector([image])[0]
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return detections, elapsed_ms
+
+def match_detections(reference, candidate):
+    """Greedily match every reference box to an unused candidate box of the same class"""
+    ref_xyxy, ref_conf, ref_cls = reference
+    cand_xyxy, cand_conf, cand_cls = candidate
+    used = set()
+    failures = []
+
+    for i in np.argsort(-ref_conf):
+        same_class = [j for j in range(len(cand_cls)) if cand_cls[j] == ref_cls[i] and j not in used]
+        if not same_class:
+            failures.append(f"class {ref_cls[i]} box {ref_xyxy[i].round(1).tolist()} missing")
+            continue
+        ious = box_iou(ref_xyxy[i], cand_xyxy[same_class])
+        best = int(np.argmax(ious))
+        j = same_class[best]
+        used.add(j)
+        conf_delta = abs(float(ref_conf[i]) - float(cand_conf[j]))
+        if ious[best] < MIN_IOU or conf_delta > MAX_CONF_DELTA:
+            failures.append(
+                f"class {ref_cls[i]}: IoU {ious[best]:.3f}, confidence {ref_conf[i]:.3f} vs {cand_conf[j]:.3f}"
+            )
+
+    extra = len(cand_cls) - len(used)
+    if extra:
+        failures.append(f"{extra} extra ONNX detection(s)")
+    return failures
+
+def main():
+    """Compare both backends on the same image"""
+    print("🧪 ONNX Runtime parity test")
+    print("=" * 50)
+
+    if not ONNX_AVAILABLE:
+        print("❌ onnxruntime not installed (pip install onnxruntime)")
+        return False
+    if not os.path.exists(MODEL_PATH):
+        print(f"❌ Model file not found: {MODEL_PATH}")
+        return False
+    if not os.path.exists(TEST_IMAGE):
+        print(f"❌ Test image not found: {TEST_IMAGE}")
+        return False
+
+    image = Image.open(TEST_IMAGE).convert("RGB")
+    reference, torch_ms = run_ultralytics(image)
+    candidate, onnx_ms = run_onnx(image)
+
+    print(f"🔍 ultralytics: {len(reference[2])} detections in {torch_ms:.1f} ms")
+    print(f"🔍 onnxruntime: {len(candidate[2])} detections in {onnx_ms:.1f} ms")
+
+    failures = match_detections(reference, candidate)
+    print("=" * 50)
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        return False
+
+    print("✅ Detections match (IoU >= {}, confidence within {})".format(MIN_IOU, MAX_CONF_DELTA))
+    return True
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -79,7 +79,7 @@ def test_backend_server():
             return False
     except requests.exceptions.ConnectionError:
         print("❌ Backend server not running")
-        print("   Start it with: python api/detect.py")
+        print("   Start it with: python api/main.py")
         return False
     except Exception as e:
         print(f"❌ Error testing backend: {e}")